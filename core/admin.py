@@ -4,7 +4,7 @@ from django.contrib.auth.admin import UserAdmin
 from django.utils.html import format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import User, Student, Counselor, GuidanceSession, Appointment, FollowUp, Interview, Report
+from .models import User, Student, Counselor, GuidanceSession, Appointment, FollowUp, Interview, Report, ReportJob, DailySessionStats
 
 class StudentInline(admin.StackedInline):
     model = Student
@@ -67,16 +67,16 @@ class StudentAdmin(admin.ModelAdmin):
     list_filter = ('year', 'course')
     search_fields = ('user__username', 'user__email', 'course')
     raw_id_fields = ('user',)
+    list_select_related = ('user',)
     inlines = [InterviewInline]
 
+    @admin.display(description='Total Sessions', ordering='session_count')
     def session_count(self, obj):
-        return obj.sessions.count()
-    session_count.short_description = 'Total Sessions'
+        return obj.session_count
 
+    @admin.display(description='Last Session', ordering='last_session_date')
     def last_session(self, obj):
-        last = obj.sessions.order_by('-date').first()
-        return last.date if last else '-'
-    last_session.short_description = 'Last Session'
+        return obj.last_session_date or '-'
 
 @admin.register(GuidanceSession)
 class GuidanceSessionAdmin(admin.ModelAdmin):
@@ -112,10 +112,10 @@ class AppointmentAdmin(admin.ModelAdmin):
 
 @admin.register(Report)
 class ReportAdmin(admin.ModelAdmin):
-    list_display = ('name', 'report_type', 'format', 'generated_by', 'generated_at', 'download_report')
-    list_filter = ('report_type', 'format', 'generated_at')
+    list_display = ('name', 'report_type', 'format', 'status', 'generated_by', 'generated_at', 'download_report')
+    list_filter = ('report_type', 'format', 'status', 'generated_at')
     search_fields = ('name', 'generated_by__username')
-    readonly_fields = ('generated_at', 'file')
+    readonly_fields = ('generated_at', 'file', 'status', 'progress', 'job')
 
     def download_report(self, obj):
         if obj.file:
@@ -123,5 +123,17 @@ class ReportAdmin(admin.ModelAdmin):
         return "-"
     download_report.short_description = 'Download'
 
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'status', 'attempts', 'created_at', 'started_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'attempts', 'error')
+
+@admin.register(DailySessionStats)
+class DailySessionStatsAdmin(admin.ModelAdmin):
+    list_display = ('day', 'source', 'counselor', 'session_type', 'status', 'count')
+    list_filter = ('source', 'status')
+    date_hierarchy = 'day'
+
 admin.site.register(Interview)
 admin.site.register(FollowUp)
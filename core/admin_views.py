@@ -5,45 +5,64 @@ from .models import User, Student, Counselor, Appointment
 from datetime import datetime
 from django.db.models import Q
 from .forms import UserForm
+from asgiref.sync import sync_to_async
+from .async_queries import gather_queries
+from .dashboard_cache import acached_dashboard, dashboard_cache_stats
+from .dashboard_stats import admin_stat_queries, merge_stats
+from .count_cache import rollup_estimate
+from .pagination import CachedCountPaginator, CursorPaginator
+from django.http import JsonResponse
+
+USERS_PER_PAGE = 20
+STUDENTS_PER_PAGE = 20
+COUNSELORS_PER_PAGE = 12
+APPOINTMENTS_PER_PAGE = 20
 
 def is_admin(user):
     return user.is_authenticated and (user.is_superuser or user.role == 'admin')
 
 @login_required
 @user_passes_test(is_admin)
-def admin_dashboard(request):
+async def admin_dashboard(request):
     try:
-        total_users = User.objects.count()
-        active_students = Student.objects.filter(user__is_active=True).count()
-        active_counselors = Counselor.objects.filter(user__is_active=True).count()
-        pending_approvals = User.objects.filter(approval_status='pending').count()
-        
-        # Get recent users
-        recent_users = User.objects.order_by('-date_joined')[:5]
-        
-        # Get upcoming appointments
-        upcoming_appointments = Appointment.objects.filter(
-            date__gte=datetime.now()
-        ).order_by('date')[:5]
-        
-        context = {
-            'total_users': total_users,
-            'active_students': active_students,
-            'active_counselors': active_counselors,
-            'pending_approvals': pending_approvals,
-            'recent_users': recent_users,
-            'upcoming_appointments': upcoming_appointments,
-        }
-        return render(request, 'admin/dashboard.html', context)
+        async def build():
+            # The totals and both lists are independent, so they run concurrently
+            *stats, recent_users, upcoming_appointments = await gather_queries(
+                *admin_stat_queries(),
+                lambda: list(User.objects.order_by('-date_joined')[:5]),
+                lambda: list(Appointment.objects.filter(
+                    date__gte=datetime.now()
+                ).select_related('student__user', 'counselor__user').order_by('date')[:5]),
+            )
+            return {
+                **merge_stats(stats),
+                'recent_users': recent_users,
+                'upcoming_appointments': upcoming_appointments,
+            }
+
+        context = await acached_dashboard('admin', await request.auser(), [], build)
+        return await sync_to_async(render)(request, 'admin/dashboard.html', context)
     except Exception as e:
         messages.error(request, f'Error loading dashboard: {str(e)}')
         return redirect('home')
 
+@login_required
+@user_passes_test(is_admin)
+def admin_dashboard_cache_stats(request):
+    return JsonResponse(dashboard_cache_stats())
+
 @login_required
 @user_passes_test(is_admin)
 def admin_users(request):
-    users = User.objects.all().order_by('-date_joined')
-    return render(request, 'admin/users.html', {'users': users})
+    users = User.objects.all().order_by('-date_joined', '-id')
+    paginator = CachedCountPaginator(users, USERS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    return render(request, 'admin/users.html', {
+        'users': page_obj,
+        'page_obj': page_obj,
+        'paginator': paginator,
+        'is_paginated': page_obj.has_other_pages(),
+    })
 
 @login_required
 @user_passes_test(is_admin)
@@ -97,23 +116,53 @@ def admin_approve_user(request, user_id):
     messages.success(request, f'User {user.username} has been approved')
     return redirect('admin_users')
 
+@login_required
+@user_passes_test(is_admin)
+def admin_reject_user(request, user_id):
+    user = get_object_or_404(User, id=user_id)
+    user.approval_status = 'rejected'
+    user.is_active = False
+    user.save()
+    messages.success(request, f'User {user.username} has been rejected')
+    return redirect('admin_users')
+
 @login_required
 @user_passes_test(is_admin)
 def admin_students(request):
-    students = Student.objects.select_related('user').all()
-    return render(request, 'admin/students.html', {'students': students})
+    students = Student.objects.select_related('user').order_by('id')
+    paginator = CachedCountPaginator(students, STUDENTS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    return render(request, 'admin/students.html', {
+        'students': page_obj,
+        'page_obj': page_obj,
+        'paginator': paginator,
+        'is_paginated': page_obj.has_other_pages(),
+    })
 
 @login_required
 @user_passes_test(is_admin)
 def admin_counselors(request):
-    counselors = Counselor.objects.select_related('user').all()
-    return render(request, 'admin/counselors.html', {'counselors': counselors})
+    counselors = Counselor.objects.select_related('user')
+    page_obj = CursorPaginator(
+        counselors, ('id',), COUNSELORS_PER_PAGE, approximate_count=True
+    ).page(request.GET.get('cursor'))
+    return render(request, 'admin/counselors.html', {'counselors': page_obj, 'page_obj': page_obj})
 
 @login_required
 @user_passes_test(is_admin)
 def admin_appointments(request):
-    appointments = Appointment.objects.select_related('student', 'counselor').all()
-    return render(request, 'admin/appointments.html', {'appointments': appointments})
+    appointments = Appointment.objects.select_related('student__user', 'counselor__user')
+    filters = {}
+    status = request.GET.get('status', '')
+    if status:
+        appointments = appointments.filter(status=status)
+        filters['status'] = status
+    # The rollup counts appointments by status, so it stands in for a COUNT(*)
+    page_obj = CursorPaginator(
+        appointments, ('-date', '-time', '-id'), APPOINTMENTS_PER_PAGE,
+        approximate_count=True, estimate=lambda: rollup_estimate('appointment', **filters),
+    ).page(request.GET.get('cursor'))
+    return render(request, 'admin/appointments.html', {'appointments': page_obj, 'page_obj': page_obj})
 
 @login_required
 @user_passes_test(is_admin)
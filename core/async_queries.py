@@ -0,0 +1,39 @@
+"""
+Concurrent ORM reads for async views.
+
+Django's async ORM methods (acount(), aaggregate(), ...) still run each
+query through sync_to_async on one shared thread, so gathering them runs
+the queries one after another. gather_queries() instead runs every
+independent read on its own thread, with that thread's own database
+connection, so a view waits only as long as its slowest query.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+
+QUERY_EXECUTOR = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'ASYNC_QUERY_THREADS', 8),
+    thread_name_prefix='async-query',
+)
+
+
+def _run_query(query):
+    try:
+        return query()
+    finally:
+        # Honours CONN_MAX_AGE the same way the end of a request does
+        connection.close_if_unusable_or_obsolete()
+
+
+async def gather_queries(*queries):
+    """
+    Runs each zero-argument callable concurrently and returns their results
+    in order. Each callable must finish its database work before returning,
+    e.g. by calling list() on a queryset.
+    """
+    return await asyncio.gather(*(
+        sync_to_async(_run_query, thread_sensitive=False, executor=QUERY_EXECUTOR)(query)
+        for query in queries
+    ))
@@ -0,0 +1,107 @@
+"""
+Counselor availability calendar.
+
+A counselor's day is cut into SLOT_MINUTES slots from DAY_START to DAY_END,
+and CounselorAvailability.booked has one bit per slot, set while a pending
+or approved appointment starts inside it. The handlers in core/signals.py
+recompute a day's bitmap whenever an appointment on it is created, moved,
+approved, declined, cancelled or deleted, so free_slots() answers a whole
+date range with one read of a few small rows. ``manage.py
+rebuild_availability`` recomputes the calendar from the appointments.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from django.db import transaction
+from django.utils import timezone
+from .models import Appointment, CounselorAvailability
+
+DAY_START = time(8, 0)
+DAY_END = time(17, 0)
+SLOT_MINUTES = 30
+
+# Appointments that hold their slot
+ACTIVE_STATUSES = Appointment.ACTIVE_STATUSES
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+SLOT_TIMES = tuple(
+    time(minute // 60, minute % 60)
+    for minute in range(_minutes(DAY_START), _minutes(DAY_END), SLOT_MINUTES)
+)
+
+
+# The slots students are offered: the office hours of the original booking
+# form, on the hour from 9 to 11 AM and 1 to 4 PM. The calendar still
+# covers the whole day, so bookings made at other times keep their slots.
+OFFICE_HOURS = tuple(time(hour, 0) for hour in (9, 10, 11, 13, 14, 15, 16))
+
+
+def slot_index(value):
+    """Returns the slot ``value`` falls in, or None outside the working day."""
+    if value < DAY_START or value >= DAY_END:
+        return None
+    return (_minutes(value) - _minutes(DAY_START)) // SLOT_MINUTES
+
+
+def bitmap(times):
+    booked = 0
+    for value in times:
+        index = slot_index(value)
+        if index is not None:
+            booked |= 1 << index
+    return booked
+
+
+def refresh_day(counselor_id, day):
+    """Recomputes one counselor's bitmap for ``day`` from the appointments table."""
+    booked = bitmap(Appointment.objects.filter(
+        counselor_id=counselor_id, date=day, status__in=ACTIVE_STATUSES,
+    ).values_list('time', flat=True))
+    if booked:
+        CounselorAvailability.objects.update_or_create(
+            counselor_id=counselor_id, day=day, defaults={'booked': booked}
+        )
+    else:
+        CounselorAvailability.objects.filter(counselor_id=counselor_id, day=day).delete()
+
+
+@transaction.atomic
+def rebuild_availability():
+    """Recomputes every counselor's calendar. Returns the number of days stored."""
+    CounselorAvailability.objects.all().delete()
+    days = defaultdict(list)
+    for counselor_id, day, value in Appointment.objects.filter(
+        status__in=ACTIVE_STATUSES
+    ).values_list('counselor_id', 'date', 'time').iterator():
+        days[counselor_id, day].append(value)
+    rows = [
+        CounselorAvailability(counselor_id=counselor_id, day=day, booked=bitmap(times))
+        for (counselor_id, day), times in days.items()
+    ]
+    return len(CounselorAvailability.objects.bulk_create(
+        [row for row in rows if row.booked], batch_size=1000
+    ))
+
+
+def free_slots(counselor, start, end, now=None):
+    """
+    Returns {date: [free office-hours slot times]} for every day from
+    ``start`` to ``end``, leaving out slots that have already begun.
+    """
+    now = timezone.localtime(now)
+    booked = dict(CounselorAvailability.objects.filter(
+        counselor=counselor, day__range=(start, end)
+    ).values_list('day', 'booked'))
+    days = {}
+    day = start
+    while day <= end:
+        taken = booked.get(day, 0)
+        days[day] = [
+            slot for slot in OFFICE_HOURS
+            if not taken & (1 << slot_index(slot)) and datetime.combine(day, slot) > now.replace(tzinfo=None)
+        ]
+        day += timedelta(days=1)
+    return days
@@ -0,0 +1,39 @@
+"""
+Race-free appointment booking.
+
+Checking that a slot is free and then inserting leaves a window in which
+two requests can both see the slot free and both book it. The
+unique_active_appointment_slot constraint on Appointment closes it in the
+database: at most one pending or approved appointment per counselor, date
+and time. book_appointment() simply inserts and lets the constraint decide,
+so concurrent bookings need no locks; the loser's insert fails and is
+reported as SlotTaken. Forms may still check first to give a friendly
+error on the common, uncontested path.
+"""
+from django.db import IntegrityError, transaction
+from .models import Appointment
+
+
+class SlotTaken(Exception):
+    """The counselor already has an active appointment at that date and time."""
+
+
+def slot_taken(counselor, date, time):
+    return Appointment.objects.filter(
+        counselor=counselor, date=date, time=time, status__in=Appointment.ACTIVE_STATUSES
+    ).exists()
+
+
+def book_appointment(student, counselor, date, time, purpose, status='pending'):
+    """Creates and returns the appointment, or raises SlotTaken if the slot is held."""
+    try:
+        # A savepoint, so a conflict leaves any surrounding transaction usable
+        with transaction.atomic():
+            return Appointment.objects.create(
+                student=student, counselor=counselor, date=date, time=time,
+                purpose=purpose, status=status,
+            )
+    except IntegrityError:
+        if slot_taken(counselor, date, time):
+            raise SlotTaken
+        raise
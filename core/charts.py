@@ -0,0 +1,109 @@
+"""
+Data for the dashboard charts.
+
+Each chart is served as JSON by its own endpoint so pages render at once
+and fetch their charts in parallel. Charts drawn from the DailySessionStats
+rollup are versioned by the rollup's last change, so a browser holding a
+current copy gets a 304 without the chart being recomputed; the others are
+versioned by a hash of their content.
+"""
+import hashlib
+import json
+from collections import namedtuple
+from datetime import timedelta
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from .models import Appointment, DailySessionStats, Student
+from .session_stats import stats_last_modified
+
+# build(counselor) returns {'labels': [...], 'data': [...]}; rollup(counselor)
+# returns the DailySessionStats filter the chart reads, or None if it does
+# not read the rollup.
+Chart = namedtuple('Chart', ['build', 'rollup'])
+
+
+def _chart(rows, label, value='count'):
+    rows = list(rows)
+    return {
+        'labels': [label(row) for row in rows],
+        'data': [row[value] for row in rows],
+    }
+
+
+def _monthly(stats, months=6):
+    since = timezone.now().date() - timedelta(days=30 * months)
+    rows = stats.filter(day__gte=since).annotate(
+        month=TruncMonth('day')
+    ).values('month').annotate(count=Sum('count')).order_by('month')
+    return _chart(rows, lambda row: row['month'].strftime('%B %Y'))
+
+
+def session_types_chart(counselor=None):
+    rows = DailySessionStats.objects.filter(source='session', count__gt=0).values(
+        'session_type'
+    ).annotate(count=Sum('count')).order_by('session_type')
+    return _chart(rows, lambda row: row['session_type'])
+
+
+def monthly_trend_chart(counselor=None):
+    return _monthly(DailySessionStats.objects.filter(source='session'))
+
+
+def course_distribution_chart(counselor=None):
+    rows = Student.objects.values('course').annotate(count=Count('id')).order_by('course')
+    return _chart(rows, lambda row: row['course'])
+
+
+def counselor_monthly_chart(counselor):
+    return _monthly(DailySessionStats.objects.filter(source='appointment', counselor=counselor))
+
+
+def counselor_purpose_chart(counselor):
+    rows = Appointment.objects.filter(counselor=counselor).values('purpose').annotate(
+        count=Count('id')
+    ).order_by('-count')[:10]
+    return _chart(rows, lambda row: row['purpose'])
+
+
+STAFF_CHARTS = {
+    'session-types': Chart(session_types_chart, lambda counselor: {'source': 'session'}),
+    'monthly-trend': Chart(monthly_trend_chart, lambda counselor: {'source': 'session'}),
+    'course-distribution': Chart(course_distribution_chart, None),
+}
+
+COUNSELOR_CHARTS = {
+    'monthly-sessions': Chart(
+        counselor_monthly_chart, lambda counselor: {'source': 'appointment', 'counselor': counselor}
+    ),
+    'session-types': Chart(counselor_purpose_chart, None),
+}
+
+
+def chart_response(request, name, chart, counselor=None):
+    """
+    Returns the chart as JSON with ETag and Last-Modified headers, or a 304
+    when the browser's copy is still current.
+    """
+    last_modified = chart.rollup and stats_last_modified(**chart.rollup(counselor))
+    data = None
+    if last_modified:
+        # The date is part of the tag because the monthly window moves daily
+        etag = quote_etag(f'{name}-{timezone.localdate()}-{last_modified.timestamp()}')
+    else:
+        data = chart.build(counselor)
+        etag = quote_etag(hashlib.md5(f'{name}:{json.dumps(data)}'.encode()).hexdigest())
+    last_modified = int(last_modified.timestamp()) if last_modified else None
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = JsonResponse(chart.build(counselor) if data is None else data)
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified)
+    # Let the browser keep a copy but revalidate it on every use
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -1,57 +1,108 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.views.generic import ListView, DetailView
 from django.contrib import messages
 from .models import Appointment, Student, GuidanceSession, Interview, Counselor, FollowUp
 from django.utils import timezone
+from asgiref.sync import sync_to_async
+from .async_queries import gather_queries
+from .dashboard_cache import acached_dashboard
+from .dashboard_stats import counselor_stat_queries, merge_stats
+from .charts import COUNSELOR_CHARTS, chart_response
+from django.http import JsonResponse
+from django.db import IntegrityError
+from django.db.models import Count, Q
+from django.utils.dateparse import parse_date
+from .pagination import CursorPaginator
+from .name_index import name_filter, typeahead
+
+APPOINTMENTS_PER_PAGE = 20
+STUDENTS_PER_PAGE = 24
 
 def is_counselor(user):
     return user.is_authenticated and user.role == 'counselor'
 
 @login_required
 @user_passes_test(is_counselor)
-def counselor_dashboard(request):
-    counselor = get_object_or_404(Counselor, user=request.user)
-    pending_appointments = Appointment.objects.filter(counselor=counselor, status='pending').count()
-    total_students = Student.objects.count()
-    completed_sessions = GuidanceSession.objects.filter(counselor=counselor, status='completed').count()
-    
-    context = {
-        'pending_appointments': pending_appointments,
-        'total_students': total_students,
-        'completed_sessions': completed_sessions,
-        'upcoming_appointments': Appointment.objects.filter(
-            counselor=counselor,
-            date__gte=timezone.now().date()
-        ).order_by('date', 'time')[:5],
-        'recent_interviews': Interview.objects.filter(counselor=counselor).order_by('-date')[:5]
-    }
-    return render(request, 'counselor/dashboard.html', context)
+async def counselor_dashboard(request):
+    user = await request.auser()
+    counselor = await aget_object_or_404(Counselor, user=user)
+
+    async def build():
+        # The stats and both lists are independent, so they run concurrently
+        *stats, upcoming_appointments, recent_interviews = await gather_queries(
+            *counselor_stat_queries(counselor),
+            lambda: list(Appointment.objects.filter(
+                counselor=counselor,
+                date__gte=timezone.now().date()
+            ).select_related('student__user').order_by('date', 'time')[:5]),
+            lambda: list(Interview.objects.filter(counselor=counselor).order_by('-date')[:5]),
+        )
+        stats = merge_stats(stats)
+        return {
+            'pending_appointments': stats['pending_appointments'],
+            'total_students': stats['total_students'],
+            'completed_sessions': stats['completed_sessions'],
+            'upcoming_appointments': upcoming_appointments,
+            'recent_interviews': recent_interviews,
+        }
+
+    context = await acached_dashboard('counselor', user, [f'counselor:{counselor.pk}'], build)
+    return await sync_to_async(render)(request, 'counselor/dashboard.html', context)
 
 @login_required
 @user_passes_test(is_counselor)
 def counselor_appointment_list(request):
     counselor = get_object_or_404(Counselor, user=request.user)
-    appointments = Appointment.objects.all().order_by('-date', '-time')
-
-    # Get current date for filtering upcoming appointments
     current_date = timezone.now().date()
-    
-    # Filter upcoming appointments
-    if request.GET.get('status') == 'approved':
+    appointments = Appointment.objects.filter(counselor=counselor).select_related('student__user', 'counselor__user')
+
+    # Summary cards cover all of the counselor's appointments, not the filtered page
+    counts = appointments.aggregate(
+        today=Count('id', filter=Q(date=current_date)),
+        pending=Count('id', filter=Q(status='pending')),
+        upcoming=Count('id', filter=Q(status='approved', date__gte=current_date)),
+    )
+
+    search = request.GET.get('search', '').strip()
+    if search:
         appointments = appointments.filter(
-            status='approved',
-            date__gte=current_date
-        ).order_by('date', 'time')
+            Q(student__user__first_name__icontains=search) |
+            Q(student__user__last_name__icontains=search) |
+            Q(student__user__email__icontains=search) |
+            Q(purpose__icontains=search)
+        )
+
+    # Linked from a student's card and profile
+    student_id = request.GET.get('student', '')
+    if student_id.isdigit():
+        appointments = appointments.filter(student_id=int(student_id))
+
+    ordering = ('-date', '-time', '-id')
+    status = request.GET.get('status')
+    if status == 'approved':
+        # Approved means upcoming sessions, soonest first
+        appointments = appointments.filter(status='approved', date__gte=current_date)
+        ordering = ('date', 'time', 'id')
+    elif status:
+        appointments = appointments.filter(status=status)
+
+    try:
+        appointment_date = parse_date(request.GET.get('date', ''))
+    except ValueError:
+        appointment_date = None
+    if appointment_date:
+        appointments = appointments.filter(date=appointment_date)
+
+    paginator = CursorPaginator(appointments, ordering, APPOINTMENTS_PER_PAGE, approximate_count=True)
+    page = paginator.page(request.GET.get('cursor'))
 
     context = {
-        'appointments': appointments,
-        'today_appointments': appointments.filter(date=current_date).count(),
-        'pending_appointments': appointments.filter(status='pending').count(),
-        'upcoming_appointments': appointments.filter(
-            status='approved', 
-            date__gte=current_date
-        ).count(),
+        'appointments': page,
+        'page_obj': page,
+        'today_appointments': counts['today'],
+        'pending_appointments': counts['pending'],
+        'upcoming_appointments': counts['upcoming'],
     }
 
     return render(request, 'counselor/appointments.html', context)
@@ -59,14 +110,43 @@ def counselor_appointment_list(request):
 @login_required
 @user_passes_test(is_counselor)
 def counselor_student_list(request):
-    students = Student.objects.all().order_by('user__last_name', 'user__first_name')
-    return render(request, 'counselor/students.html', {'students': students})
+    students = Student.objects.select_related('user')
+
+    search = request.GET.get('search', '').strip()
+    if search:
+        # Names come from the token index; emails are still matched anywhere
+        students = students.filter(name_filter(search) | Q(user__email__icontains=search))
+    if request.GET.get('year', '').isdigit():
+        students = students.filter(year=int(request.GET['year']))
+    if request.GET.get('course'):
+        students = students.filter(course=request.GET['course'])
+    if request.GET.get('status'):
+        students = students.filter(user__approval_status=request.GET['status'])
+
+    paginator = CursorPaginator(
+        students, ('user__last_name', 'user__first_name', 'id'), STUDENTS_PER_PAGE, approximate_count=True
+    )
+    page = paginator.page(request.GET.get('cursor'))
+
+    context = {
+        'students': page,
+        'page_obj': page,
+        'courses': Student.objects.order_by('course').values_list('course', flat=True).distinct(),
+    }
+    return render(request, 'counselor/students.html', context)
+
+@login_required
+@user_passes_test(is_counselor)
+def student_typeahead(request):
+    return JsonResponse({'results': typeahead(request.GET.get('q', ''))})
 
 @login_required
 @user_passes_test(is_counselor)
 def counselor_session_history(request):
     counselor = get_object_or_404(Counselor, user=request.user)
-    sessions = GuidanceSession.objects.filter(counselor=counselor).order_by('-date')
+    sessions = GuidanceSession.objects.filter(counselor=counselor).select_related(
+        'student__user', 'interview'
+    ).order_by('-date')
     return render(request, 'counselor/session_history.html', {'sessions': sessions})
 
 @login_required
@@ -76,17 +156,33 @@ def counselor_reports_dashboard(request):
     context = {
         'total_sessions': GuidanceSession.objects.filter(counselor=counselor).count(),
         'total_students': Student.objects.count(),
-        'recent_sessions': GuidanceSession.objects.filter(counselor=counselor).order_by('-date')[:5]
+        'recent_sessions': GuidanceSession.objects.filter(counselor=counselor).select_related('student__user').order_by('-date')[:5]
     }
     return render(request, 'counselor/reports.html', context)
 
+@login_required
+@user_passes_test(is_counselor)
+def counselor_chart_data(request, chart):
+    counselor = get_object_or_404(Counselor, user=request.user)
+    if chart not in COUNSELOR_CHARTS:
+        return JsonResponse({'error': 'Unknown chart.'}, status=404)
+    return chart_response(request, chart, COUNSELOR_CHARTS[chart], counselor)
+
 @login_required
 @user_passes_test(is_counselor)
 def approve_appointment(request, appointment_id):
     counselor = get_object_or_404(Counselor, user=request.user)
     appointment = get_object_or_404(Appointment, id=appointment_id, counselor=counselor)
+    if appointment.status != 'pending':
+        messages.error(request, 'Only pending appointments can be approved.')
+        return redirect('counselor_appointment_list')
     appointment.status = 'approved'
-    appointment.save()
+    try:
+        appointment.save()
+    except IntegrityError:
+        # Another request took the slot since this page was loaded
+        messages.error(request, 'This time slot is already booked by another appointment.')
+        return redirect('counselor_appointment_list')
     messages.success(request, 'Appointment approved successfully.')
     return redirect('counselor_appointment_list')
 
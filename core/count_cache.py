@@ -0,0 +1,75 @@
+"""
+Cached row counts for the paginated lists.
+
+Counting a filtered join is often the most expensive query a list page
+runs, and it is repeated on every page of every visit. cached_count() keeps
+each count in the cache for COUNT_CACHE_TIMEOUT seconds under a key built
+from the query's SQL and parameters (its filter signature) and a version
+number for every table the SQL reads. The handlers in core/signals.py, and
+the search and name indexes, bump a table's version when they write to it,
+so a cached count is reused only until a row behind it changes. Writes made
+with QuerySet.update() send no signals and are picked up when the count
+expires.
+
+rollup_estimate() is the "estimated" mode: appointment and session totals
+are summed from the DailySessionStats rollup, a few rows per day, instead
+of counting the tables themselves.
+"""
+import hashlib
+import re
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
+from .models import DailySessionStats
+
+COUNT_CACHE_TIMEOUT = getattr(settings, 'COUNT_CACHE_TIMEOUT', 60)
+
+# Every table of this app, FTS5 index included, is named core_<something>
+_TABLE_NAME = re.compile(r'\bcore_\w+')
+
+
+def _version_key(table):
+    return f'count:version:{table}'
+
+
+def invalidate_counts(*tables):
+    """Expires every cached count that reads any of ``tables``."""
+    for table in tables:
+        key = _version_key(table)
+        # add() only succeeds for a missing key; otherwise bump it in place
+        if not cache.add(key, 1, None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, 1, None)
+
+
+def _count_key(sql, params):
+    version_keys = [_version_key(table) for table in sorted(set(_TABLE_NAME.findall(sql)))]
+    versions = cache.get_many(version_keys)
+    signature = '\n'.join([
+        sql, repr(params), *(f'{key}={versions.get(key, 0)}' for key in version_keys),
+    ])
+    return 'count:' + hashlib.sha1(signature.encode()).hexdigest()
+
+
+def cached_count(queryset, timeout=None):
+    """Returns ``queryset.count()``, from the cache while its tables are unchanged."""
+    key = _count_key(*queryset.query.sql_with_params())
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, COUNT_CACHE_TIMEOUT if timeout is None else timeout)
+    return count
+
+
+def rollup_estimate(source, **filters):
+    """
+    Returns how many ``source`` rows ('appointment' or 'session') the
+    DailySessionStats rollup records, narrowed by ``filters`` on its own
+    fields, e.g. status='pending' or day__gte=start.
+    """
+    return DailySessionStats.objects.filter(source=source, **filters).aggregate(
+        total=Coalesce(Sum('count'), 0)
+    )['total']
@@ -0,0 +1,99 @@
+"""
+Maintenance of the denormalized counters on Student and Counselor.
+
+When a session or appointment is saved or deleted, its old and new field
+values are turned into +/- deltas for the owning student and counselor and
+applied with F() expressions inside one transaction. last_session_date is
+re-read from the sessions table for the profiles a change touches, since a
+maximum cannot be decremented.
+"""
+from collections import Counter, defaultdict
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from .models import Appointment, Counselor, GuidanceSession, Student
+
+OWNERS = ((Student, 'student'), (Counselor, 'counselor'))
+
+
+def session_deltas(values):
+    return {
+        'session_count': 1,
+        'completed_session_count': int(values['status'] == 'completed'),
+    }
+
+
+def appointment_deltas(values):
+    return {'pending_appointment_count': int(values['status'] == 'pending')}
+
+
+def _owner_changes(old, new, owner_field, deltas):
+    changes = defaultdict(Counter)
+    for values, sign in ((old, -1), (new, 1)):
+        if values:
+            changes[values[owner_field]].update({
+                field: sign * delta for field, delta in deltas(values).items()
+            })
+    return changes
+
+
+def _last_session_date(owner):
+    return Subquery(
+        GuidanceSession.objects.filter(**{owner: OuterRef('pk')})
+        .order_by().values(owner).annotate(latest=Max('date')).values('latest')
+    )
+
+
+@transaction.atomic(savepoint=False)
+def _apply(old, new, deltas, track_last_date):
+    for model, owner in OWNERS:
+        owner_field = f'{owner}_id'
+        for pk, counter in _owner_changes(old, new, owner_field, deltas).items():
+            updates = {field: F(field) + delta for field, delta in counter.items() if delta}
+            if track_last_date and not (old and new and old['date'] == new['date'] and
+                                        old[owner_field] == new[owner_field]):
+                updates['last_session_date'] = _last_session_date(owner)
+            if updates:
+                model.objects.filter(pk=pk).update(**updates)
+
+
+def update_session_counters(old, new):
+    """``old``/``new`` are a session's stored and saved values, or None."""
+    _apply(old, new, session_deltas, track_last_date=True)
+
+
+def update_appointment_counters(old, new):
+    _apply(old, new, appointment_deltas, track_last_date=False)
+
+
+def reconcile_counters():
+    """
+    Recomputes every counter from the sessions and appointments tables.
+    Returns the number of (students, counselors) whose counters were wrong.
+    """
+    fixed = []
+    with transaction.atomic():
+        for model, owner in OWNERS:
+            sessions = GuidanceSession.objects.filter(**{owner: OuterRef('pk')}).order_by().values(owner)
+            appointments = Appointment.objects.filter(**{owner: OuterRef('pk')}).order_by().values(owner)
+            actual = {
+                'session_count': Coalesce(Subquery(sessions.annotate(n=Count('id')).values('n')), 0),
+                'completed_session_count': Coalesce(Subquery(
+                    sessions.annotate(n=Count('id', filter=Q(status='completed'))).values('n')
+                ), 0),
+                'last_session_date': _last_session_date(owner),
+                'pending_appointment_count': Coalesce(Subquery(
+                    appointments.annotate(n=Count('id', filter=Q(status='pending'))).values('n')
+                ), 0),
+            }
+            # Compare in Python: SQL equality treats two NULL dates as unequal
+            drifted = [
+                row['pk'] for row in model.objects.annotate(
+                    **{f'actual_{name}': value for name, value in actual.items()}
+                ).values('pk', *actual, *(f'actual_{name}' for name in actual)).iterator()
+                if any(row[name] != row[f'actual_{name}'] for name in actual)
+            ]
+            for start in range(0, len(drifted), 500):
+                model.objects.filter(pk__in=drifted[start:start + 500]).update(**actual)
+            fixed.append(len(drifted))
+    return tuple(fixed)
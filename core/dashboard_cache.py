@@ -0,0 +1,103 @@
+"""
+Caching for the role dashboards.
+
+A dashboard's context is cached per user under a key built from version
+numbers for the scopes it depends on: its role and the counselor or student
+profile it belongs to. The signal handlers in core/signals.py bump those
+versions when an appointment, session, interview or user changes, so a
+cached dashboard is served until something it shows has changed.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+DASHBOARD_CACHE_ALIAS = getattr(settings, 'DASHBOARD_CACHE_ALIAS', 'default')
+DASHBOARD_CACHE_TIMEOUT = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300)
+
+HITS_KEY = 'dashboard:stats:hits'
+MISSES_KEY = 'dashboard:stats:misses'
+
+
+def dashboard_cache():
+    return caches[DASHBOARD_CACHE_ALIAS]
+
+
+def _version_key(scope):
+    return f'dashboard:version:{scope}'
+
+
+def _increment(cache, key):
+    # add() only succeeds for a missing key; otherwise bump it in place
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Evicted between the add() and the incr()
+            cache.set(key, 1, None)
+
+
+def invalidate_dashboards(*scopes):
+    """Expires every cached dashboard that depends on any of ``scopes``."""
+    cache = dashboard_cache()
+    for scope in scopes:
+        _increment(cache, _version_key(scope))
+
+
+def _dashboard_key(cache, role, user, scopes):
+    scopes = [f'role:{role}', *scopes]
+    version_keys = [_version_key(scope) for scope in scopes]
+    versions = cache.get_many(version_keys)
+    return ':'.join([
+        'dashboard', role, str(user.pk), timezone.localdate().isoformat(),
+        *(str(versions.get(version_key, 0)) for version_key in version_keys),
+    ])
+
+
+def cached_dashboard(role, user, scopes, build):
+    """
+    Returns the cached context for ``user``'s ``role`` dashboard, calling
+    ``build()`` to compute it on a miss. ``build`` must return picklable
+    data, so querysets have to be evaluated into lists. The date is part of
+    the key so that "upcoming" lists roll over at midnight.
+    """
+    cache = dashboard_cache()
+    key = _dashboard_key(cache, role, user, scopes)
+
+    context = cache.get(key)
+    if context is not None:
+        _increment(cache, HITS_KEY)
+        return context
+
+    _increment(cache, MISSES_KEY)
+    context = build()
+    cache.set(key, context, DASHBOARD_CACHE_TIMEOUT)
+    return context
+
+
+async def acached_dashboard(role, user, scopes, build):
+    """Async cached_dashboard(); ``build`` is a coroutine function."""
+    cache = dashboard_cache()
+    key = await sync_to_async(_dashboard_key)(cache, role, user, scopes)
+
+    context = await cache.aget(key)
+    if context is not None:
+        await sync_to_async(_increment)(cache, HITS_KEY)
+        return context
+
+    await sync_to_async(_increment)(cache, MISSES_KEY)
+    context = await build()
+    await cache.aset(key, context, DASHBOARD_CACHE_TIMEOUT)
+    return context
+
+
+def dashboard_cache_stats():
+    counters = dashboard_cache().get_many([HITS_KEY, MISSES_KEY])
+    hits = counters.get(HITS_KEY, 0)
+    misses = counters.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total * 100, 1) if total else 0.0,
+    }
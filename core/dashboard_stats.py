@@ -0,0 +1,81 @@
+"""
+Headline numbers for the role dashboards.
+
+Each function returns every count a dashboard shows using one aggregate
+query per table, with Count(filter=Q(...)) in place of a separate count()
+call for each number. The *_stat_queries variants return those per-table
+queries as callables so async views can run them concurrently.
+"""
+from functools import partial
+from django.db.models import Count, Q
+from django.utils import timezone
+from .models import Appointment, GuidanceSession, Student, User
+
+
+def merge_stats(results):
+    stats = {}
+    for result in results:
+        stats.update(result)
+    return stats
+
+
+def admin_stat_queries():
+    return [
+        partial(
+            User.objects.aggregate,
+            total_users=Count('id'),
+            active_students=Count('student_profile', filter=Q(is_active=True)),
+            active_counselors=Count('counselor_profile', filter=Q(is_active=True)),
+            pending_approvals=Count('id', filter=Q(approval_status='pending')),
+        ),
+    ]
+
+
+def student_stat_queries(student):
+    return [
+        partial(
+            GuidanceSession.objects.filter(student=student).aggregate,
+            total_sessions=Count('id'),
+            completed_sessions=Count('id', filter=Q(status='completed')),
+        ),
+        partial(
+            Appointment.objects.filter(student=student).aggregate,
+            total_appointments=Count('id'),
+            pending_appointments=Count('id', filter=Q(status='pending')),
+        ),
+    ]
+
+
+def counselor_stat_queries(counselor, today=None):
+    today = today or timezone.now().date()
+    return [
+        partial(
+            Appointment.objects.filter(counselor=counselor).aggregate,
+            pending_appointments=Count('id', filter=Q(status='pending')),
+            today_sessions=Count('id', filter=Q(date=today, status='approved')),
+        ),
+        partial(
+            GuidanceSession.objects.filter(counselor=counselor).aggregate,
+            completed_sessions=Count('id', filter=Q(status='completed')),
+        ),
+        partial(
+            Student.objects.aggregate,
+            total_students=Count('id'),
+            active_students=Count('id', filter=Q(user__is_active=True)),
+        ),
+    ]
+
+
+def admin_stats():
+    """Totals for the admin dashboard, in a single query on the user table."""
+    return merge_stats(query() for query in admin_stat_queries())
+
+
+def student_stats(student):
+    """Session and appointment totals for one student: two queries."""
+    return merge_stats(query() for query in student_stat_queries(student))
+
+
+def counselor_stats(counselor, today=None):
+    """Appointment, session and student totals for one counselor: three queries."""
+    return merge_stats(query() for query in counselor_stat_queries(counselor, today))
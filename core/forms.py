@@ -38,7 +38,7 @@ class AppointmentForm(forms.ModelForm):
         widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-input mt-1 block w-full rounded-md border-gray-300'})
     )
     time = forms.TimeField(
-        widget=forms.TimeInput(attrs={'type': 'time', 'class': 'form-input mt-1 block w-full rounded-md border-gray-300'})
+        widget=forms.TimeInput(attrs={'type': 'time', 'min': '09:00', 'max': '16:00', 'step': 3600, 'class': 'form-input mt-1 block w-full rounded-md border-gray-300'})
     )
     purpose = forms.CharField(
         widget=forms.Textarea(attrs={'rows': 4, 'class': 'form-textarea mt-1 block w-full rounded-md border-gray-300'})
@@ -70,21 +70,16 @@ class AppointmentForm(forms.ModelForm):
         if date < current_date:
             raise forms.ValidationError("Cannot schedule appointments in the past.")
 
-        # Check if time is within business hours (8 AM to 5 PM)
-        from datetime import time as dt_time
-        if time < dt_time(8, 0) or time > dt_time(17, 0):
-            raise forms.ValidationError("Appointments must be scheduled between 8:00 AM and 5:00 PM.")
-
-        # Check for double booking
-        from django.db.models import Q
-        existing_appointment = Appointment.objects.filter(
-            counselor=counselor,
-            date=date,
-            time=time,
-            status__in=['pending', 'approved']
-        ).exists()
-
-        if existing_appointment:
+        # Only the office-hours slots offered on the request page can be booked
+        from .availability import OFFICE_HOURS
+        if time not in OFFICE_HOURS:
+            raise forms.ValidationError(
+                "Appointments must start on the hour from 9:00 to 11:00 AM or from 1:00 to 4:00 PM."
+            )
+
+        # Check for double booking; core.booking settles a race for the slot
+        from .booking import slot_taken
+        if slot_taken(counselor, date, time):
             raise forms.ValidationError("This time slot is already booked. Please select a different time.")
 
         return cleaned_data
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from core.report_cache import evict_reports
+
+class Command(BaseCommand):
+    help = 'Deletes the files of cached reports that are too old or over the disk budget'
+
+    def handle(self, *args, **options):
+        removed = evict_reports()
+        self.stdout.write(self.style.SUCCESS(f'Expired {removed} cached report(s)'))
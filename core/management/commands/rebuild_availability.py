@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from core.availability import rebuild_availability
+
+class Command(BaseCommand):
+    help = 'Rebuilds the per-counselor, per-day booked slot bitmaps'
+
+    def handle(self, *args, **options):
+        days = rebuild_availability()
+        self.stdout.write(self.style.SUCCESS(f'Stored availability for {days} counselor day(s)'))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from core.name_index import rebuild_name_index
+
+class Command(BaseCommand):
+    help = 'Rebuilds the normalized student name tokens used for prefix lookup'
+
+    def handle(self, *args, **options):
+        tokens = rebuild_name_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {tokens} name token(s)'))
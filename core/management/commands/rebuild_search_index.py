@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand, CommandError
+from core.search import rebuild_search_index, search_available
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full-text search index over appointments, sessions, interviews and people'
+
+    def handle(self, *args, **options):
+        if not search_available():
+            raise CommandError('The full-text search index needs SQLite with FTS5')
+        rows = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {rows} record(s)'))
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from core.session_stats import rebuild_session_stats
+
+class Command(BaseCommand):
+    help = 'Recomputes the daily session and appointment statistics rollup'
+
+    def handle(self, *args, **options):
+        rows = rebuild_session_stats()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} daily statistics row(s)'))
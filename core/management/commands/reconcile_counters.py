@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from core.counters import reconcile_counters
+
+class Command(BaseCommand):
+    help = 'Recomputes the session and appointment counters on students and counselors'
+
+    def handle(self, *args, **options):
+        students, counselors = reconcile_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Fixed counters for {students} student(s) and {counselors} counselor(s)'
+        ))
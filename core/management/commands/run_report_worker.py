@@ -0,0 +1,73 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from core.report_cache import evict_reports
+from core.report_jobs import claim_job, fail_job, init_worker, requeue_stale_jobs, run_job
+
+class Command(BaseCommand):
+    help = 'Runs queued report jobs on a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=getattr(settings, 'REPORT_WORKER_PROCESSES', 2),
+            help='Number of worker processes',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait before checking an empty queue again',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once the queue is empty instead of polling',
+        )
+
+    def handle(self, *args, **options):
+        requeued, failed = requeue_stale_jobs()
+        if requeued or failed:
+            self.stdout.write(f'Requeued {requeued} and failed {failed} stale job(s)')
+
+        processes = max(1, options['processes'])
+        # future -> the job it is running
+        running = {}
+        finished = 0
+        with ProcessPoolExecutor(max_workers=processes, initializer=init_worker) as pool:
+            while True:
+                while len(running) < processes:
+                    job_id = claim_job()
+                    if job_id is None:
+                        break
+                    # Forked workers must not inherit an open connection
+                    connections.close_all()
+                    running[pool.submit(run_job, job_id)] = job_id
+                    self.stdout.write(f'Started report job #{job_id}')
+
+                if running:
+                    done, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job_id = running.pop(future)
+                        try:
+                            future.result()
+                        except Exception as e:
+                            # run_job records its own errors, so this is the
+                            # worker process itself failing; keep serving the rest
+                            fail_job(job_id, f'Report worker failed: {e!r}')
+                            self.stderr.write(f'Report job #{job_id} failed: {e!r}')
+                        else:
+                            self.stdout.write(self.style.SUCCESS(f'Finished report job #{job_id}'))
+                    finished += len(done)
+                    continue
+
+                # Trim the report cache whenever the queue drains
+                if finished:
+                    evict_reports()
+                    finished = 0
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_report_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_stats(apps, schema_editor):
+    DailySessionStats = apps.get_model('core', 'DailySessionStats')
+    sources = [
+        ('session', apps.get_model('core', 'GuidanceSession'), ['date', 'counselor_id', 'session_type', 'status']),
+        ('appointment', apps.get_model('core', 'Appointment'), ['date', 'counselor_id', 'status']),
+    ]
+    rows = []
+    for source, model, fields in sources:
+        for values in model.objects.values(*fields).annotate(total=Count('id')).order_by():
+            rows.append(DailySessionStats(
+                source=source,
+                day=values['date'],
+                counselor_id=values['counselor_id'],
+                session_type=values.get('session_type') or '',
+                status=values['status'],
+                count=values['total'],
+            ))
+    DailySessionStats.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_report_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySessionStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('session', 'Guidance Session'), ('appointment', 'Appointment')], max_length=12)),
+                ('day', models.DateField()),
+                ('session_type', models.CharField(blank=True, max_length=20)),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('counselor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='core.counselor')),
+            ],
+            options={
+                'ordering': ['day'],
+                'constraints': [models.UniqueConstraint(fields=('source', 'day', 'counselor', 'session_type', 'status'), name='unique_daily_session_stats')],
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:09
+
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    GuidanceSession = apps.get_model('core', 'GuidanceSession')
+    Appointment = apps.get_model('core', 'Appointment')
+    for model_name, owner in (('Student', 'student'), ('Counselor', 'counselor')):
+        sessions = GuidanceSession.objects.filter(**{owner: OuterRef('pk')}).order_by().values(owner)
+        appointments = Appointment.objects.filter(**{owner: OuterRef('pk')}).order_by().values(owner)
+        apps.get_model('core', model_name).objects.update(
+            session_count=Coalesce(Subquery(sessions.annotate(n=Count('id')).values('n')), 0),
+            completed_session_count=Coalesce(Subquery(
+                sessions.annotate(n=Count('id', filter=Q(status='completed'))).values('n')
+            ), 0),
+            last_session_date=Subquery(sessions.annotate(latest=Max('date')).values('latest')),
+            pending_appointment_count=Coalesce(Subquery(
+                appointments.annotate(n=Count('id', filter=Q(status='pending'))).values('n')
+            ), 0),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_daily_session_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='counselor',
+            name='completed_session_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='counselor',
+            name='last_session_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='counselor',
+            name='pending_appointment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='counselor',
+            name='session_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='completed_session_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='last_session_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='pending_appointment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='session_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
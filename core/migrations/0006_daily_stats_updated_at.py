@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:11
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_session_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailysessionstats',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
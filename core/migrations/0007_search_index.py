@@ -0,0 +1,30 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS core_search_index USING fts5("
+        "kind UNINDEXED, object_id UNINDEXED, names, body, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS core_search_index')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_daily_stats_updated_at'),
+    ]
+
+    operations = [
+        # Filled by the signal handlers from now on; migration 0015 indexes
+        # the rows that already exist.
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentNameToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=150)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='name_tokens', to='core.student')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('token', 'student'), name='unique_student_name_token')],
+            },
+        ),
+    ]
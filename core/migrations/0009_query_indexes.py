@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0008_student_name_tokens'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['counselor', 'date', 'time'], name='appointment_counselor_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['counselor', 'status', 'date'], name='appointment_counsel_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['student', 'date', 'time'], name='appointment_student_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='guidancesession',
+            index=models.Index(fields=['student', 'date'], name='session_student_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='guidancesession',
+            index=models.Index(fields=['counselor', 'date'], name='session_counselor_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='guidancesession',
+            index=models.Index(fields=['student', 'created_at'], name='session_student_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='guidancesession',
+            index=models.Index(fields=['counselor', 'created_at'], name='session_counsel_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['email'], name='user_email_idx'),
+        ),
+    ]
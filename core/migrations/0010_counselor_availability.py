@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:36
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+ACTIVE_STATUSES = ['pending', 'approved']
+
+# The availability calendar's slots (core.availability as of this migration)
+DAY_START_MINUTES, DAY_END_MINUTES, SLOT_MINUTES = 8 * 60, 17 * 60, 30
+
+
+def bitmap(times):
+    booked = 0
+    for value in times:
+        minutes = value.hour * 60 + value.minute
+        if DAY_START_MINUTES <= minutes < DAY_END_MINUTES:
+            booked |= 1 << (minutes - DAY_START_MINUTES) // SLOT_MINUTES
+    return booked
+
+
+def backfill_availability(apps, schema_editor):
+    Appointment = apps.get_model('core', 'Appointment')
+    CounselorAvailability = apps.get_model('core', 'CounselorAvailability')
+    days = defaultdict(list)
+    for counselor_id, day, value in Appointment.objects.filter(
+        status__in=ACTIVE_STATUSES
+    ).values_list('counselor_id', 'date', 'time').iterator():
+        days[counselor_id, day].append(value)
+    CounselorAvailability.objects.bulk_create([
+        CounselorAvailability(counselor_id=counselor_id, day=day, booked=bitmap(times))
+        for (counselor_id, day), times in days.items() if bitmap(times)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CounselorAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('booked', models.PositiveIntegerField(default=0)),
+                ('counselor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability', to='core.counselor')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('counselor', 'day'), name='unique_counselor_availability')],
+            },
+        ),
+        migrations.RunPython(backfill_availability, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:38
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+ACTIVE_STATUSES = ['pending', 'approved']
+
+# The availability calendar's slots (core.availability as of this migration)
+DAY_START_MINUTES, DAY_END_MINUTES, SLOT_MINUTES = 8 * 60, 17 * 60, 30
+
+
+def _bitmap(times):
+    booked = 0
+    for value in times:
+        minutes = value.hour * 60 + value.minute
+        if DAY_START_MINUTES <= minutes < DAY_END_MINUTES:
+            booked |= 1 << (minutes - DAY_START_MINUTES) // SLOT_MINUTES
+    return booked
+
+
+def _refresh_derived_rows(apps, declined):
+    """
+    Recomputes what the appointment signal handlers would have updated for
+    the ``declined`` appointments: their days in the DailySessionStats
+    rollup, the pending counters of their students and counselors, and
+    their counselors' availability bitmaps.
+    """
+    Appointment = apps.get_model('core', 'Appointment')
+    DailySessionStats = apps.get_model('core', 'DailySessionStats')
+    CounselorAvailability = apps.get_model('core', 'CounselorAvailability')
+
+    now = timezone.now()
+    for counselor_id, day in {(a.counselor_id, a.date) for a in declined}:
+        appointments = Appointment.objects.filter(counselor_id=counselor_id, date=day)
+        counts = dict(appointments.values_list('status').annotate(Count('id')).order_by())
+        # Zeroed rows are kept, as the signal handlers keep them
+        rows = DailySessionStats.objects.filter(source='appointment', counselor_id=counselor_id, day=day)
+        for status in set(counts) | set(rows.values_list('status', flat=True)):
+            DailySessionStats.objects.update_or_create(
+                source='appointment', day=day, counselor_id=counselor_id,
+                session_type='', status=status,
+                defaults={'count': counts.get(status, 0), 'updated_at': now},
+            )
+        booked = _bitmap(appointments.filter(status__in=ACTIVE_STATUSES).values_list('time', flat=True))
+        if booked:
+            CounselorAvailability.objects.update_or_create(
+                counselor_id=counselor_id, day=day, defaults={'booked': booked}
+            )
+        else:
+            CounselorAvailability.objects.filter(counselor_id=counselor_id, day=day).delete()
+
+    for model_name, owner in (('Student', 'student'), ('Counselor', 'counselor')):
+        owner_ids = {getattr(a, f'{owner}_id') for a in declined}
+        pending = Appointment.objects.filter(
+            **{owner: OuterRef('pk')}, status='pending'
+        ).order_by().values(owner).annotate(n=Count('id')).values('n')
+        apps.get_model('core', model_name).objects.filter(pk__in=owner_ids).update(
+            pending_appointment_count=Coalesce(Subquery(pending), 0)
+        )
+
+
+def decline_double_bookings(apps, schema_editor):
+    # The constraint cannot be added while a slot has two active bookings:
+    # keep the earliest request for each slot and decline the rest. These
+    # updates send no signals, so the rows the signal handlers maintain are
+    # recomputed for the affected days and profiles afterwards.
+    Appointment = apps.get_model('core', 'Appointment')
+    active = Appointment.objects.filter(status__in=ACTIVE_STATUSES)
+    double_booked = (
+        active.values('counselor_id', 'date', 'time')
+        .annotate(bookings=Count('id'), first=Min('id'))
+        .filter(bookings__gt=1)
+        .order_by()
+    )
+    declined = []
+    for slot in double_booked:
+        extra = active.filter(
+            counselor_id=slot['counselor_id'], date=slot['date'], time=slot['time']
+        ).exclude(id=slot['first'])
+        declined.extend(extra)
+        extra.update(status='declined')
+    if declined:
+        _refresh_derived_rows(apps, declined)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_counselor_availability'),
+    ]
+
+    operations = [
+        migrations.RunPython(decline_double_bookings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'approved'])), fields=('counselor', 'date', 'time'), name='unique_active_appointment_slot', violation_error_message='This time slot is already booked. Please select a different time.'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:50
+
+from django.db import migrations, models
+
+
+def create_generation(apps, schema_editor):
+    apps.get_model('core', 'NameIndexGeneration').objects.create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_active_appointment_slot_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NameIndexGeneration',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('generation', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_generation, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:55
+
+import unicodedata
+
+from django.db import migrations
+
+
+def normalize(text):
+    # A frozen copy of core.name_index.normalize as of this migration
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return [word for word in ''.join(
+        char if char.isalnum() else ' ' for char in stripped.casefold()
+    ).split() if word]
+
+
+def backfill_name_tokens(apps, schema_editor):
+    Student = apps.get_model('core', 'Student')
+    StudentNameToken = apps.get_model('core', 'StudentNameToken')
+    batch = []
+    for student_id, first_name, last_name, username in Student.objects.values_list(
+        'id', 'user__first_name', 'user__last_name', 'user__username'
+    ).iterator():
+        batch.extend(
+            StudentNameToken(student_id=student_id, token=token)
+            for token in set(normalize(f'{first_name} {last_name} {username}'))
+        )
+        if len(batch) >= 1000:
+            StudentNameToken.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    StudentNameToken.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_name_index_generation'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_name_tokens, migrations.RunPython.noop),
+    ]
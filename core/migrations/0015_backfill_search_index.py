@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-17 09:10
+
+from django.db import migrations
+
+# A copy of the document builders in core.search as they were when this
+# migration was written, so later changes there cannot change what it does.
+
+
+def _full_name(user):
+    return f'{user.first_name} {user.last_name} {user.username}'
+
+
+def _text(*values):
+    return '\n'.join(value for value in values if value)
+
+
+def _people(obj):
+    return _text(_full_name(obj.student.user), _full_name(obj.counselor.user))
+
+
+# kind: (code, model name, related objects, document builder)
+SEARCH_KINDS = {
+    'appointment': (1, 'Appointment', ('student__user', 'counselor__user'), lambda obj: (
+        _people(obj), _text(obj.purpose),
+    )),
+    'session': (2, 'GuidanceSession', ('student__user', 'counselor__user'), lambda obj: (
+        _people(obj), _text(obj.problem_statement, obj.notes, obj.recommendations),
+    )),
+    'interview': (3, 'Interview', ('student__user', 'counselor__user'), lambda obj: (
+        _people(obj),
+        _text(
+            obj.reason_for_interview,
+            obj.presenting_problem,
+            obj.background_of_problem,
+            obj.counselor_notes,
+            obj.recommendations,
+        ),
+    )),
+    'student': (4, 'Student', ('user',), lambda obj: (
+        _text(_full_name(obj.user)), _text(obj.user.email, obj.course),
+    )),
+    'counselor': (5, 'Counselor', ('user',), lambda obj: (
+        _text(_full_name(obj.user)), _text(obj.user.email, obj.email),
+    )),
+}
+
+
+def _insert(cursor, rows):
+    cursor.executemany(
+        'INSERT OR REPLACE INTO core_search_index (rowid, kind, object_id, names, body) '
+        'VALUES (%s, %s, %s, %s, %s)',
+        rows,
+    )
+
+
+def backfill_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        for kind, (code, model_name, related, document) in SEARCH_KINDS.items():
+            objects = apps.get_model('core', model_name).objects.select_related(*related)
+            batch = []
+            for obj in objects.iterator(chunk_size=1000):
+                batch.append((obj.pk * 8 + code, kind, obj.pk, *document(obj)))
+                if len(batch) >= 1000:
+                    _insert(cursor, batch)
+                    batch = []
+            if batch:
+                _insert(cursor, batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_report_source_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_index, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, router, transaction
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
@@ -48,6 +48,13 @@ class User(AbstractUser):
         related_name='custom_user_set',
         related_query_name='custom_user'
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Registration checks whether an email is already taken
+            models.Index(fields=['email'], name='user_email_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if self.is_superuser:
@@ -58,24 +65,69 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.username} ({self.role})"
 
-class Student(models.Model):
+class SessionCounters(models.Model):
+    """
+    Session and appointment counters stored on the profile so list pages
+    need no per-row queries. core/counters.py keeps them current; run
+    ``manage.py reconcile_counters`` to repair any drift.
+    """
+    COUNTER_FIELDS = ('session_count', 'completed_session_count', 'last_session_date', 'pending_appointment_count')
+
+    session_count = models.PositiveIntegerField(default=0, editable=False)
+    completed_session_count = models.PositiveIntegerField(default=0, editable=False)
+    last_session_date = models.DateField(null=True, blank=True, editable=False)
+    pending_appointment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        # The counters are updated in the database with F() expressions, so
+        # an ordinary save must not write back the values loaded earlier.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+class RollupTracked(models.Model):
+    """
+    A row counted in the DailySessionStats rollup and the profile counters.
+    Saving runs in one transaction with the post_save handlers in
+    core/signals.py that move those counts, so if a count update fails the
+    row write is rolled back with it. Deletes already send post_delete
+    inside the deletion's transaction.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+class Student(SessionCounters):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='student_profile')
     course = models.CharField(max_length=100)
     year = models.IntegerField()
     contact_number = models.CharField(max_length=15, blank=True, null=True)
     reason_for_referral = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.user.username} ({self.course}, Year {self.year})"
 
-class Counselor(models.Model):
+class Counselor(SessionCounters):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='counselor_profile')
     email = models.EmailField()
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.user.username
 
-class GuidanceSession(models.Model):
+class GuidanceSession(RollupTracked):
     SESSION_TYPE_CHOICES = [
         ('Interview', 'Interview'),
         ('Referral', 'Referral'),
@@ -107,6 +159,17 @@ class GuidanceSession(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Per-student and per-counselor histories, newest first. SQLite
+            # reads these backwards, and since every index ends with the
+            # rowid they also cover the ('-created_at', '-id') cursor ordering.
+            models.Index(fields=['student', 'date'], name='session_student_date_idx'),
+            models.Index(fields=['counselor', 'date'], name='session_counselor_date_idx'),
+            models.Index(fields=['student', 'created_at'], name='session_student_created_idx'),
+            models.Index(fields=['counselor', 'created_at'], name='session_counsel_created_idx'),
+        ]
+
     def start_session(self):
         if self.status == 'scheduled':
             self.status = 'in_progress'
@@ -142,12 +205,14 @@ class GuidanceSession(models.Model):
     def __str__(self):
         return f"{self.session_type} with {self.student.user.username} by {self.counselor.user.username}"
 
-class Appointment(models.Model):
+class Appointment(RollupTracked):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
         ('approved', 'Approved'),
         ('declined', 'Declined'),
     ]
+    # Statuses that hold the counselor's time slot
+    ACTIVE_STATUSES = ('pending', 'approved')
     
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name="appointments")
     counselor = models.ForeignKey(Counselor, on_delete=models.CASCADE, related_name="appointments")
@@ -158,6 +223,26 @@ class Appointment(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Double-booking checks and counselor lists by date and time
+            models.Index(fields=['counselor', 'date', 'time'], name='appointment_counselor_date_idx'),
+            # Per-status dashboard counts
+            models.Index(fields=['counselor', 'status', 'date'], name='appointment_counsel_status_idx'),
+            # Student upcoming and past lists
+            models.Index(fields=['student', 'date', 'time'], name='appointment_student_date_idx'),
+        ]
+        constraints = [
+            # One active booking per counselor slot, enforced by the database
+            # so concurrent requests cannot both take it (see core/booking.py)
+            models.UniqueConstraint(
+                fields=['counselor', 'date', 'time'],
+                condition=models.Q(status__in=['pending', 'approved']),
+                name='unique_active_appointment_slot',
+                violation_error_message='This time slot is already booked. Please select a different time.',
+            ),
+        ]
+
     def __str__(self):
         return f"Appointment for {self.student.user.username} with {self.counselor.user.username}"
     
@@ -166,13 +251,96 @@ class Appointment(models.Model):
             counselor=self.counselor,
             date=self.date,
             time=self.time,
-            status__in=['pending', 'approved']
-        ).exists()
+            status__in=self.ACTIVE_STATUSES
+        ).exclude(pk=self.pk).exists()
+class DailySessionStats(models.Model):
+    """
+    Per-day counts of guidance sessions and appointments, one row per
+    counselor, session type and status. Kept current by the signal handlers
+    in core/signals.py; ``manage.py rebuild_session_stats`` recomputes it.
+    """
+    SOURCE_CHOICES = [
+        ('session', 'Guidance Session'),
+        ('appointment', 'Appointment'),
+    ]
+
+    source = models.CharField(max_length=12, choices=SOURCE_CHOICES)
+    day = models.DateField()
+    counselor = models.ForeignKey(Counselor, on_delete=models.CASCADE, related_name='daily_stats')
+    # Blank for appointments, which have no session type
+    session_type = models.CharField(max_length=20, blank=True)
+    status = models.CharField(max_length=20)
+    count = models.PositiveIntegerField(default=0)
+    # Moves on every change, so Max(updated_at) versions the rollup; rows
+    # are kept at zero rather than deleted so the watermark never goes back.
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['source', 'day', 'counselor', 'session_type', 'status'],
+                name='unique_daily_session_stats',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_source_display()} stats for {self.day}: {self.count}"
+
+class StudentNameToken(models.Model):
+    """
+    One normalized (case-folded, accent-stripped) word of a student's name,
+    for prefix lookups. Kept current by core/signals.py; ``manage.py
+    rebuild_name_index`` recomputes it.
+    """
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='name_tokens')
+    token = models.CharField(max_length=150)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['token', 'student'], name='unique_student_name_token'),
+        ]
+
+    def __str__(self):
+        return f"{self.token} -> {self.student_id}"
+
+class NameIndexGeneration(models.Model):
+    """
+    A single row counting writes to the name index. Typeahead results are
+    cached per process under this number, and keeping it in the database
+    lets every worker see a rename as soon as it commits.
+    """
+    generation = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Name index generation {self.generation}"
+
+class CounselorAvailability(models.Model):
+    """
+    A counselor's booked slots for one day as a bitmap, one bit per slot of
+    core.availability.SLOT_TIMES. Days without bookings have no row. Kept
+    current by core/signals.py; ``manage.py rebuild_availability``
+    recomputes it.
+    """
+    counselor = models.ForeignKey(Counselor, on_delete=models.CASCADE, related_name='availability')
+    day = models.DateField()
+    booked = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also the index that date-range reads walk
+            models.UniqueConstraint(fields=['counselor', 'day'], name='unique_counselor_availability'),
+        ]
+
+    def __str__(self):
+        return f"{self.counselor_id} on {self.day}: {self.booked:b}"
+
 class FollowUp(models.Model):
     session = models.OneToOneField(GuidanceSession, on_delete=models.CASCADE, related_name="followup")
     followup_date = models.DateField()
     followup_notes = models.TextField(blank=True, null=True)
     completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         status = "Completed" if self.completed else "Pending"
@@ -224,6 +392,28 @@ class Interview(models.Model):
     def __str__(self):
         return f"Interview Form - {self.student.user.username} - {self.date}"
 
+class ReportJob(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    bucket = models.CharField(max_length=10, default='day')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"Report job #{self.pk} ({self.get_status_display()})"
+
 class Report(models.Model):
     REPORT_TYPES = [
         ('student_summary', 'Student Summary Report'),
@@ -238,10 +428,18 @@ class Report(models.Model):
         ('csv', 'CSV'),
     ]
 
+    STATUS_CHOICES = ReportJob.STATUS_CHOICES
+
     name = models.CharField(max_length=255)
     report_type = models.CharField(max_length=50, choices=REPORT_TYPES)
     format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
-    file = models.FileField(upload_to='reports/')
+    file = models.FileField(upload_to='reports/', blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='completed')
+    progress = models.PositiveSmallIntegerField(default=0)
+    job = models.ForeignKey(ReportJob, on_delete=models.SET_NULL, null=True, blank=True, related_name='reports')
+    # Hash of the report parameters and the data version it was built from
+    # (see core/report_cache.py); blank for reports that are never reused.
+    fingerprint = models.CharField(max_length=64, blank=True, db_index=True)
     generated_at = models.DateTimeField(auto_now_add=True)
     generated_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     start_date = models.DateField(null=True, blank=True)
@@ -253,6 +451,10 @@ class Report(models.Model):
     def __str__(self):
         return f"{self.name} - {self.get_report_type_display()}"
 
+    @property
+    def is_pending(self):
+        return self.status in ('queued', 'running')
+
     def delete(self, *args, **kwargs):
         # Delete the file when the model instance is deleted
         if self.file:
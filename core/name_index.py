@@ -0,0 +1,138 @@
+"""
+Prefix lookup of students by name.
+
+Each word of a student's first name, last name and username is stored in
+StudentNameToken case-folded and with accents stripped, so "José" is found
+by "jo" and "JOSE". A prefix is matched as the range [prefix, prefix +
+U+10FFFF) on the (token, student) unique index, which SQLite walks in order
+instead of running LIKE over every user.
+
+Typeahead results are kept in a per-process LRU keyed by the normalized
+query and a generation number that every index write bumps, so a renamed
+student never lingers in the suggestions. The generation is a row of
+NameIndexGeneration rather than a cache entry: the default cache is local
+to each process, and a bump in one worker must reach the others.
+"""
+import unicodedata
+from functools import lru_cache
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from .count_cache import invalidate_counts
+from .models import NameIndexGeneration, Student, StudentNameToken
+
+TYPEAHEAD_LIMIT = 10
+TYPEAHEAD_CACHE_SIZE = 2048
+
+# Sorts after every character, so [prefix, prefix + PREFIX_END) is the prefix range
+PREFIX_END = '\U0010ffff'
+
+
+def normalize(text):
+    """Returns the lower-case, accent-free words of ``text``."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return [word for word in ''.join(
+        char if char.isalnum() else ' ' for char in stripped.casefold()
+    ).split() if word]
+
+
+def student_tokens(student):
+    user = student.user
+    return set(normalize(f'{user.first_name} {user.last_name} {user.username}'))
+
+
+def _bump_generation():
+    invalidate_counts(StudentNameToken._meta.db_table)
+    # The row is created by migration 0012; recreate it if it went missing
+    _, created = NameIndexGeneration.objects.get_or_create(pk=1, defaults={'generation': 1})
+    if not created:
+        NameIndexGeneration.objects.filter(pk=1).update(generation=F('generation') + 1)
+
+
+def generation():
+    """Returns the name index's current generation, shared by every process."""
+    return NameIndexGeneration.objects.filter(pk=1).values_list('generation', flat=True).first() or 0
+
+
+@transaction.atomic
+def index_student(student):
+    """Replaces ``student``'s tokens, touching only the words that changed."""
+    tokens = student_tokens(student)
+    stored = set(student.name_tokens.values_list('token', flat=True))
+    if tokens == stored:
+        return
+    student.name_tokens.filter(token__in=stored - tokens).delete()
+    StudentNameToken.objects.bulk_create(
+        [StudentNameToken(student=student, token=token) for token in tokens - stored]
+    )
+    _bump_generation()
+
+
+@transaction.atomic
+def rebuild_name_index(batch_size=1000):
+    """Recomputes every student's tokens. Returns the number of tokens stored."""
+    StudentNameToken.objects.all().delete()
+    batch, total = [], 0
+    for student in Student.objects.select_related('user').iterator(chunk_size=batch_size):
+        batch.extend(StudentNameToken(student=student, token=token) for token in student_tokens(student))
+        if len(batch) >= batch_size:
+            total += len(StudentNameToken.objects.bulk_create(batch))
+            batch = []
+    if batch:
+        total += len(StudentNameToken.objects.bulk_create(batch))
+    _bump_generation()
+    return total
+
+
+def _prefix_tokens(word):
+    return StudentNameToken.objects.filter(token__gte=word, token__lt=word + PREFIX_END)
+
+
+def name_filter(query):
+    """
+    Returns a Q matching students with a name word starting with each word
+    of ``query``, e.g. "ma cruz" finds Maria Dela Cruz.
+    """
+    condition = Q()
+    for word in normalize(query):
+        condition &= Q(pk__in=_prefix_tokens(word).values('student_id'))
+    return condition
+
+
+@lru_cache(maxsize=TYPEAHEAD_CACHE_SIZE)
+def _cached_typeahead(words, limit, generation):
+    # The longest word is usually the most selective, so its prefix range
+    # drives the scan; walking the index yields matches in token order and
+    # the scan stops as soon as enough students are found. Other words are
+    # checked per candidate through the student_id index.
+    first, *rest = sorted(words, key=len, reverse=True)
+    candidates = _prefix_tokens(first)
+    for word in rest:
+        candidates = candidates.filter(Exists(_prefix_tokens(word).filter(student_id=OuterRef('student_id'))))
+    student_ids = []
+    for student_id in candidates.order_by('token').values_list('student_id', flat=True).iterator():
+        if student_id not in student_ids:
+            student_ids.append(student_id)
+            if len(student_ids) == limit:
+                break
+
+    students = Student.objects.select_related('user').only(
+        'course', 'year', 'user__first_name', 'user__last_name', 'user__username'
+    ).in_bulk(student_ids)
+    return tuple(
+        {
+            'id': student.pk,
+            'name': student.user.get_full_name() or student.user.username,
+            'course': student.course,
+            'year': student.year,
+        }
+        for student in (students[pk] for pk in student_ids if pk in students)
+    )
+
+
+def typeahead(query, limit=TYPEAHEAD_LIMIT):
+    """Returns up to ``limit`` students whose name matches ``query`` as you type."""
+    words = tuple(normalize(query))
+    if not words:
+        return []
+    return list(_cached_typeahead(words, limit, generation()))
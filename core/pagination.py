@@ -0,0 +1,187 @@
+"""
+Keyset (cursor) pagination.
+
+Instead of OFFSET/LIMIT plus a COUNT(*) of the whole result, each page is
+fetched with a WHERE clause that continues from the last row of the page
+before, so deep pages cost the same as the first one. Pages are addressed
+by opaque, signed next/previous tokens rather than page numbers.
+
+Totals come from core.count_cache, so a page view only counts rows when
+the cached count for its filters has expired or been invalidated.
+"""
+import operator
+from functools import cached_property, reduce
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db.models import Q
+from .count_cache import cached_count
+
+CURSOR_SALT = 'core.pagination.cursor'
+
+# How far an approximate count looks before it gives up and reports "N+"
+APPROXIMATE_COUNT_LIMIT = 1000
+
+
+class CursorPage:
+    def __init__(self, object_list, paginator, next_token=None, previous_token=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_token = next_token
+        self.previous_token = previous_token
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_token is not None
+
+    def has_previous(self):
+        return self.previous_token is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Paginates ``queryset`` by ``ordering``, e.g. ('-date', '-time', '-id').
+    The ordering fields must be non-null and together unique, so it should
+    end with the primary key. They may follow relations, as in
+    ('user__last_name', 'user__first_name', 'id'), or name annotations of
+    ``queryset``.
+
+    With ``approximate_count`` the paginator also offers ``count``, counting
+    at most APPROXIMATE_COUNT_LIMIT rows; ``count_is_exact`` says whether
+    the real total may be larger. ``estimate`` is an optional callable that
+    returns a cheap estimate of the total, or None when it has none for
+    these filters; an estimated count sets ``count_is_estimated``.
+    """
+
+    def __init__(self, queryset, ordering, per_page, approximate_count=False, estimate=None):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.approximate_count = approximate_count
+        self.estimate = estimate
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self._count = None
+        self.count_is_estimated = False
+
+    def _encode(self, obj, direction):
+        values = [self._value(obj, name) for name in self.fields]
+        return signing.dumps([direction, values], salt=CURSOR_SALT, compress=True)
+
+    def _decode(self, token):
+        try:
+            direction, values = signing.loads(token, salt=CURSOR_SALT)
+        except (signing.BadSignature, TypeError, ValueError):
+            return None, None
+        if direction not in ('next', 'previous') or len(values) != len(self.fields):
+            return None, None
+        return direction, [self._field(name).to_python(value) for name, value in zip(self.fields, values)]
+
+    def _field(self, name):
+        annotation = self.queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        model = self.queryset.model
+        *relations, attr = name.split('__')
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        return model._meta.get_field(attr)
+
+    def _value(self, obj, name):
+        """Returns ``obj``'s value for the ordering field ``name`` as a string."""
+        if name in self.queryset.query.annotations:
+            value = getattr(obj, name)
+            return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        *relations, attr = name.split('__')
+        for relation in relations:
+            obj = getattr(obj, relation)
+        return obj._meta.get_field(attr).value_to_string(obj)
+
+    def _after(self, values, ordering):
+        """Rows that come after ``values`` when sorted by ``ordering``."""
+        clauses = []
+        for i, name in enumerate(ordering):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            equal = {f: v for f, v in zip(self.fields[:i], values[:i])}
+            clauses.append(Q(**equal, **{f'{field}__{lookup}': values[i]}))
+        return reduce(operator.or_, clauses)
+
+    def page(self, token=None):
+        direction, values = self._decode(token) if token else (None, None)
+        if direction == 'previous':
+            # Walk backwards from the cursor, then put the rows back in order
+            reverse = tuple(name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering)
+            rows = list(self.queryset.filter(self._after(values, reverse)).order_by(*reverse)[:self.per_page + 1])
+            if len(rows) <= self.per_page:
+                # Back at the start: serve a full first page instead
+                return self.page()
+            rows = rows[:self.per_page][::-1]
+            has_previous, has_next = True, True
+        else:
+            queryset = self.queryset.order_by(*self.ordering)
+            if values is not None:
+                queryset = queryset.filter(self._after(values, self.ordering))
+            rows = list(queryset[:self.per_page + 1])
+            has_more, rows = len(rows) > self.per_page, rows[:self.per_page]
+            has_previous, has_next = values is not None, has_more
+
+        return CursorPage(
+            rows,
+            self,
+            next_token=self._encode(rows[-1], 'next') if has_next and rows else None,
+            previous_token=self._encode(rows[0], 'previous') if has_previous and rows else None,
+        )
+
+    @property
+    def count(self):
+        if not self.approximate_count:
+            return None
+        if self._count is None:
+            estimated = self.estimate() if self.estimate else None
+            if estimated is not None:
+                self._count, self.count_is_estimated = estimated, True
+            else:
+                self._count = cached_count(self.queryset.order_by()[:APPROXIMATE_COUNT_LIMIT + 1])
+        if self.count_is_estimated:
+            return self._count
+        return min(self._count, APPROXIMATE_COUNT_LIMIT)
+
+    @property
+    def count_is_exact(self):
+        return self.count is not None and not self.count_is_estimated and self._count <= APPROXIMATE_COUNT_LIMIT
+
+
+class CachedCountPaginator(Paginator):
+    """Page-number Paginator whose total comes from core.count_cache."""
+
+    @cached_property
+    def count(self):
+        return cached_count(self.object_list)
+
+
+class CursorPaginationMixin:
+    """
+    Swaps Django's page-number pagination in a ListView for cursor
+    pagination on ``cursor_ordering``. The page token is read from the
+    ``cursor`` query parameter.
+    """
+    cursor_ordering = ('-id',)
+    approximate_count = True
+
+    def estimate_count(self):
+        """Returns a cheap estimate of the total for the current filters, or None to count."""
+        return None
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = CursorPaginator(
+            queryset, self.cursor_ordering, page_size, self.approximate_count, self.estimate_count
+        )
+        page = paginator.page(self.request.GET.get('cursor'))
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,133 @@
+"""
+Per-request query recording and N+1 detection.
+
+QueryRecorder collects every SQL statement run while it is active, on any
+thread that inherits its context: the request thread, the sync_to_async
+thread that renders an async view's template, and the gather_queries
+executor. Statements are grouped by shape (the SQL with its parameters
+left out and IN lists collapsed), and a shape that repeats at least
+QUERY_REPEAT_THRESHOLD times in one request is reported as a likely N+1.
+
+query_recorder_middleware, enabled when DEBUG is on, records each request,
+adds X-Query-Count and X-Query-Time headers and logs repeated shapes to the
+``core.queries`` logger. QueryBudgetMixin gives tests assertQueryBudget().
+"""
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils.decorators import sync_and_async_middleware
+
+logger = logging.getLogger('core.queries')
+
+QUERY_REPEAT_THRESHOLD = getattr(settings, 'QUERY_REPEAT_THRESHOLD', 5)
+
+# Every recorder active in this context; they may nest, e.g. a test around the middleware
+_active_recorders = ContextVar('query_recorders', default=())
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_INLINE_NUMBER = re.compile(r'\b\d+\b')
+
+
+def query_shape(sql):
+    """Returns ``sql`` with variable-length IN lists and inlined numbers collapsed."""
+    return _INLINE_NUMBER.sub('N', _IN_LIST.sub('IN (...)', sql))
+
+
+def _record(execute, sql, params, many, context):
+    recorders = _active_recorders.get()
+    if not recorders:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        for recorder in recorders:
+            recorder.queries.append((sql, duration))
+
+
+def _install(connection, **kwargs):
+    if _record not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record)
+
+
+# Connections opened from now on, on any thread, report to the active recorder
+connection_created.connect(_install, dispatch_uid='core.query_budget')
+
+
+class QueryRecorder:
+    """Context manager that records the queries run inside it."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __enter__(self):
+        for connection in connections.all(initialized_only=True):
+            _install(connection)
+        self._token = _active_recorders.set(_active_recorders.get() + (self,))
+        return self
+
+    def __exit__(self, *exc_info):
+        _active_recorders.reset(self._token)
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    def repeated(self, threshold=QUERY_REPEAT_THRESHOLD):
+        """Returns (shape, times run) for every shape run at least ``threshold`` times."""
+        shapes = Counter(query_shape(sql) for sql, _ in self.queries)
+        return [(shape, times) for shape, times in shapes.most_common() if times >= threshold]
+
+
+def _report(request, response, recorder):
+    response['X-Query-Count'] = str(recorder.count)
+    response['X-Query-Time'] = f'{recorder.total_time * 1000:.1f}ms'
+    for shape, times in recorder.repeated():
+        logger.warning('Possible N+1 on %s %s: ran %d times: %s', request.method, request.path, times, shape)
+    return response
+
+
+@sync_and_async_middleware
+def query_recorder_middleware(get_response):
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            with QueryRecorder() as recorder:
+                response = await get_response(request)
+            return _report(request, response, recorder)
+    else:
+        def middleware(request):
+            with QueryRecorder() as recorder:
+                response = get_response(request)
+            return _report(request, response, recorder)
+    return middleware
+
+
+class QueryBudgetMixin:
+    """TestCase mixin for checking how many queries a block of code runs."""
+
+    def assertQueryBudget(self, budget, func, *args, **kwargs):
+        """
+        Calls ``func`` and fails if it runs more than ``budget`` queries or
+        repeats a query shape QUERY_REPEAT_THRESHOLD times. Returns the result.
+        """
+        with QueryRecorder() as recorder:
+            result = func(*args, **kwargs)
+        repeated = recorder.repeated()
+        self.assertFalse(repeated, f'Repeated queries (possible N+1): {repeated}')
+        self.assertLessEqual(
+            recorder.count, budget,
+            f'{recorder.count} queries exceeded the budget of {budget}:\n' +
+            '\n'.join(sql for sql, _ in recorder.queries),
+        )
+        return result
@@ -0,0 +1,103 @@
+"""
+Reuse of previously generated report files.
+
+A report is identified by a fingerprint of its parameters plus a data
+version taken from every table a report reads. While nothing in those
+tables changes, asking for the same report again returns the stored file
+instead of rendering a new one.
+"""
+import hashlib
+import json
+import os
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Count, Max
+from django.utils import timezone
+from .models import Appointment, Counselor, FollowUp, GuidanceSession, Report, Student, User
+
+REPORT_CACHE_MAX_AGE = timedelta(hours=getattr(settings, 'REPORT_CACHE_MAX_AGE_HOURS', 24))
+REPORT_CACHE_MAX_BYTES = getattr(settings, 'REPORT_CACHE_MAX_BYTES', 500 * 1024 * 1024)
+
+# The tables the reports in core/reports.py read, each with an updated_at
+REPORT_SOURCES = (GuidanceSession, Appointment, FollowUp, Student, Counselor, User)
+
+
+def data_version():
+    """
+    Returns a watermark that changes whenever a row of REPORT_SOURCES is
+    created, updated or deleted. The row counts catch deletions, which do
+    not move the latest updated_at.
+    """
+    parts = []
+    for model in REPORT_SOURCES:
+        stats = model.objects.aggregate(latest=Max('updated_at'), total=Count('id'))
+        latest = stats['latest'].isoformat() if stats['latest'] else ''
+        parts.append(f"{latest}/{stats['total']}")
+    return '|'.join(parts)
+
+
+def report_fingerprint(report_type, start_date, end_date, format_type, bucket, version):
+    key = json.dumps([
+        report_type,
+        str(start_date),
+        str(end_date),
+        format_type,
+        bucket if report_type in ('session_analytics', 'counselor_performance') else None,
+        version,
+    ])
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def find_cached_report(fingerprint):
+    """
+    Returns the newest unexpired report with this fingerprint, or None. A
+    report that is still queued or running counts as a hit, so identical
+    requests made while it renders share the same job.
+    """
+    candidates = Report.objects.filter(
+        fingerprint=fingerprint,
+        generated_at__gte=timezone.now() - REPORT_CACHE_MAX_AGE,
+        status__in=['queued', 'running', 'completed'],
+    ).order_by('-generated_at')
+
+    for report in candidates[:5]:
+        if report.is_pending:
+            return report
+        if report.file and os.path.isfile(report.file.path):
+            return report
+    return None
+
+
+def expire_report(report):
+    """
+    Deletes a cached report's file and takes it out of the cache. The
+    Report row stays, so the report remains in its owner's history.
+    """
+    if report.file:
+        report.file.delete(save=False)
+    report.fingerprint = ''
+    report.save(update_fields=['file', 'fingerprint'])
+
+
+def evict_reports(max_age=REPORT_CACHE_MAX_AGE, max_bytes=REPORT_CACHE_MAX_BYTES):
+    """
+    Expires cached reports that are older than ``max_age``, then the oldest
+    remaining ones until the total file size fits in ``max_bytes``. Returns
+    the number of reports expired.
+    """
+    removed = 0
+    cached = Report.objects.exclude(fingerprint='').exclude(status__in=['queued', 'running'])
+
+    for report in cached.filter(generated_at__lt=timezone.now() - max_age):
+        expire_report(report)
+        removed += 1
+
+    total_bytes = 0
+    for report in cached.order_by('-generated_at'):
+        size = os.path.getsize(report.file.path) if report.file and os.path.isfile(report.file.path) else 0
+        if total_bytes + size > max_bytes:
+            expire_report(report)
+            removed += 1
+        else:
+            total_bytes += size
+    return removed
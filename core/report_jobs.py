@@ -0,0 +1,119 @@
+"""
+A small database-backed job queue for report generation.
+
+generate_report only records the requested reports and a ReportJob; the
+``run_report_worker`` management command claims queued jobs and renders
+them on a process pool, so no HTTP worker is tied up building files and
+no outside broker is needed.
+"""
+import os
+import traceback
+from datetime import timedelta
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Report, ReportJob
+from .report_renderers import RENDERERS, generate_report_files
+
+# Jobs left 'running' for longer than this are assumed to belong to a
+# worker that died, and are put back on the queue.
+STALE_JOB_TIMEOUT = timedelta(minutes=getattr(settings, 'REPORT_JOB_TIMEOUT_MINUTES', 30))
+MAX_ATTEMPTS = 3
+
+
+def enqueue_reports(reports, bucket='day'):
+    """
+    Queues one job that renders every report in ``reports``. The reports
+    must share a report type and date range; each one is a different format.
+    """
+    with transaction.atomic():
+        job = ReportJob.objects.create(bucket=bucket)
+        Report.objects.filter(id__in=[r.id for r in reports]).update(
+            job=job, status='queued', progress=0
+        )
+    return job
+
+
+def claim_job():
+    """
+    Marks the oldest queued job as running and returns its id, or None if
+    the queue is empty. The conditional UPDATE makes the claim safe when
+    several workers poll the same table.
+    """
+    queued = ReportJob.objects.filter(status='queued').values_list('id', flat=True)
+    for job_id in queued[:10]:
+        claimed = ReportJob.objects.filter(id=job_id, status='queued').update(
+            status='running',
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return job_id
+    return None
+
+
+def requeue_stale_jobs():
+    """Puts jobs abandoned by a dead worker back on the queue."""
+    cutoff = timezone.now() - STALE_JOB_TIMEOUT
+    stale = ReportJob.objects.filter(status='running', started_at__lt=cutoff)
+    requeued = stale.filter(attempts__lt=MAX_ATTEMPTS).update(status='queued')
+    failed = stale.update(status='failed', error='Worker stopped responding.', finished_at=timezone.now())
+    Report.objects.filter(job__status='queued', status='running').update(status='queued', progress=0)
+    Report.objects.filter(job__status='failed').exclude(status='failed').update(status='failed')
+    return requeued, failed
+
+
+def init_worker():
+    """
+    Process pool initializer. Forked workers must not reuse the parent's
+    database connections, and spawned workers need Django set up first.
+    """
+    if not apps.ready:
+        django.setup()
+    for conn in connections.all(initialized_only=True):
+        conn.close()
+
+
+def fail_job(job_id, error):
+    """Marks ``job_id`` and its reports as failed with ``error``."""
+    Report.objects.filter(job_id=job_id).update(status='failed')
+    ReportJob.objects.filter(id=job_id).update(status='failed', error=error, finished_at=timezone.now())
+
+
+def run_job(job_id):
+    """Renders every report attached to ``job_id``. Runs inside a worker."""
+    file_paths = {}
+    try:
+        job = ReportJob.objects.get(id=job_id)
+        reports = list(job.reports.all())
+        if not reports:
+            ReportJob.objects.filter(id=job_id).update(status='completed', finished_at=timezone.now())
+            return job_id
+
+        job.reports.update(status='running', progress=10)
+        first = reports[0]
+        file_paths = generate_report_files(
+            first.report_type, first.start_date, first.end_date,
+            [report.format for report in reports], job.bucket
+        )
+        job.reports.update(progress=90)
+
+        for report in reports:
+            with open(file_paths[report.format], 'rb') as f:
+                report.file.save(f"{report.name}.{RENDERERS[report.format].extension}", File(f), save=False)
+            report.status = 'completed'
+            report.progress = 100
+            report.save(update_fields=['file', 'status', 'progress'])
+
+        ReportJob.objects.filter(id=job_id).update(status='completed', finished_at=timezone.now())
+    except Exception:
+        fail_job(job_id, traceback.format_exc())
+    finally:
+        for file_path in file_paths.values():
+            if os.path.isfile(file_path):
+                os.remove(file_path)
+    return job_id
@@ -0,0 +1,334 @@
+import csv
+import io
+import os
+from contextlib import ExitStack
+import xlsxwriter
+from django.conf import settings
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Paragraph
+from .reports import build_dataset
+
+class ReportRenderer:
+    """
+    Writes a ReportDataset to a binary stream in one output format.
+
+    Renderers are fed row by row so that one pass over a dataset can drive
+    several renderers at once.
+    """
+    format = None
+    extension = None
+
+    def __init__(self, dataset, stream):
+        self.dataset = dataset
+        self.stream = stream
+
+    def open(self):
+        pass
+
+    def write_row(self, row):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PDFTableWriter:
+    """
+    Writes a long table to a PDF one page at a time.
+
+    Rows are collected into page-sized chunks and each chunk is drawn onto
+    the canvas as a grid with the header row repeated, then the page is
+    closed. Column widths and row heights are fixed up front, so nothing
+    ever measures or splits the whole table, and cell text that does not
+    fit its column is clipped.
+    """
+    pagesize = letter
+    margin = 36
+    header_height = 30
+    row_height = 18
+    header_font = ('Helvetica-Bold', 14)
+    body_font = ('Helvetica', 12)
+    cell_padding = 6
+
+    def __init__(self, stream, title, headers, subtitle=None):
+        self.canvas = canvas.Canvas(stream, pagesize=self.pagesize, pageCompression=1)
+        self.title = title
+        self.subtitle = subtitle
+        self.page_width, self.page_height = self.pagesize
+        self.col_widths = self._column_widths(headers)
+        self.col_edges = [self.margin]
+        for width in self.col_widths:
+            self.col_edges.append(self.col_edges[-1] + width)
+        self._char_widths = {}
+        self.headers = self._fit_row(headers, self.header_font)
+        self.rows = []
+        self.pages = 0
+        self.top = self._draw_heading()
+
+    def _column_widths(self, headers):
+        # Share the usable width by header length, with a floor so short
+        # headers over long values (e.g. 'Year') still get some room.
+        available = self.page_width - 2 * self.margin
+        weights = [max(len(str(header)), 8) for header in headers]
+        total = sum(weights)
+        return [available * weight / total for weight in weights]
+
+    def _draw_heading(self):
+        styles = getSampleStyleSheet()
+        top = self.page_height - self.margin
+        for text, style in ((self.title, styles['Title']), (self.subtitle, styles['Normal'])):
+            if not text:
+                continue
+            paragraph = Paragraph(text, style)
+            _, height = paragraph.wrapOn(self.canvas, self.page_width - 2 * self.margin, self.page_height)
+            paragraph.drawOn(self.canvas, self.margin, top - height)
+            top -= height + 20
+        return top
+
+    @property
+    def rows_per_page(self):
+        return max(1, int((self.top - self.margin - self.header_height) // self.row_height))
+
+    def _char_width(self, font_name, char):
+        # Character widths (at size 1000) are cached per font, which is far
+        # cheaper than measuring every cell with stringWidth.
+        widths = self._char_widths.setdefault(font_name, {})
+        char_width = widths.get(char)
+        if char_width is None:
+            char_width = widths[char] = stringWidth(char, font_name, 1000)
+        return char_width
+
+    def _fit(self, value, width, font):
+        """Returns (text, text width) with the text clipped to the column."""
+        font_name, font_size = font
+        text = '' if value is None else str(value)
+        limit = (width - 2 * self.cell_padding) * 1000 / font_size
+
+        widths = self._char_widths.setdefault(font_name, {})
+        try:
+            total = sum(map(widths.__getitem__, text))
+        except KeyError:
+            for char in set(text):
+                self._char_width(font_name, char)
+            total = sum(map(widths.__getitem__, text))
+        if total <= limit:
+            return text, total * font_size / 1000
+
+        # Too wide: keep as many characters as fit alongside an ellipsis
+        ellipsis = 3 * self._char_width(font_name, '.')
+        total = 0
+        for index, char in enumerate(text):
+            if total + widths[char] + ellipsis > limit:
+                break
+            total += widths[char]
+        return text[:index] + '...', (total + ellipsis) * font_size / 1000
+
+    def _fit_row(self, row, font):
+        return [self._fit(value, width, font) for value, width in zip(row, self.col_widths)]
+
+    def write_row(self, row):
+        self.rows.append(self._fit_row(row, self.body_font))
+        if len(self.rows) >= self.rows_per_page:
+            self._draw_page()
+
+    def _draw_cells(self, text, cells, row_top, row_height, font):
+        font_name, font_size = font
+        text.setFont(font_name, font_size)
+        baseline = row_top - row_height / 2 - font_size * 0.35
+        for (value, width), left, right in zip(cells, self.col_edges, self.col_edges[1:]):
+            text.setTextOrigin((left + right - width) / 2, baseline)
+            text.textOut(value)
+
+    def _draw_page(self):
+        c = self.canvas
+        left, right = self.col_edges[0], self.col_edges[-1]
+        header_bottom = self.top - self.header_height
+        bottom = header_bottom - self.row_height * len(self.rows)
+
+        # Backgrounds
+        c.setFillColor(colors.grey)
+        c.rect(left, header_bottom, right - left, self.header_height, stroke=0, fill=1)
+        if self.rows:
+            c.setFillColor(colors.beige)
+            c.rect(left, bottom, right - left, header_bottom - bottom, stroke=0, fill=1)
+
+        # Grid
+        row_lines = [self.top, header_bottom] + [
+            header_bottom - self.row_height * (i + 1) for i in range(len(self.rows))
+        ]
+        c.setStrokeColor(colors.black)
+        c.setLineWidth(1)
+        c.lines(
+            [(left, y, right, y) for y in row_lines] +
+            [(x, self.top, x, bottom) for x in self.col_edges]
+        )
+
+        # Cell text, all in one text object
+        text = c.beginText()
+        text.setFillColor(colors.whitesmoke)
+        self._draw_cells(text, self.headers, self.top, self.header_height, self.header_font)
+        text.setFillColor(colors.black)
+        for i, cells in enumerate(self.rows):
+            self._draw_cells(text, cells, header_bottom - self.row_height * i, self.row_height, self.body_font)
+        c.drawText(text)
+
+        c.showPage()
+        self.pages += 1
+        self.rows = []
+        self.top = self.page_height - self.margin
+
+    def close(self):
+        if self.rows or not self.pages:
+            self._draw_page()
+        self.canvas.save()
+
+
+class PDFRenderer(ReportRenderer):
+    format = 'pdf'
+    extension = 'pdf'
+
+    def open(self):
+        self.writer = PDFTableWriter(self.stream, self.dataset.title, self.dataset.headers, self.dataset.period)
+
+    def write_row(self, row):
+        self.writer.write_row(row)
+
+    def close(self):
+        self.writer.close()
+
+
+class ExcelRenderer(ReportRenderer):
+    format = 'excel'
+    extension = 'xlsx'
+
+    def open(self):
+        # Rows are written strictly in order, so constant_memory mode can
+        # flush each one to disk instead of holding the sheet in memory.
+        self.workbook = xlsxwriter.Workbook(self.stream, {'constant_memory': True})
+        self.worksheet = self.workbook.add_worksheet()
+        self.header_format = self.workbook.add_format({
+            'bold': True,
+            'bg_color': '#4B5563',
+            'font_color': 'white',
+            'align': 'center',
+            'valign': 'vcenter',
+            'border': 1
+        })
+        self.cell_format = self.workbook.add_format({
+            'align': 'center',
+            'valign': 'vcenter',
+            'border': 1
+        })
+
+        last_col = len(self.dataset.headers) - 1
+        self.worksheet.merge_range(0, 0, 0, last_col, self.dataset.title, self.header_format)
+        self.worksheet.merge_range(1, 0, 1, last_col, self.dataset.period, self.cell_format)
+        self.worksheet.write_row(3, 0, self.dataset.headers, self.header_format)
+        self.worksheet.set_column(0, last_col, 15)
+        self.row = 3
+
+    def write_row(self, row):
+        self.row += 1
+        self.worksheet.write_row(self.row, 0, row, self.cell_format)
+
+    def close(self):
+        self.workbook.close()
+
+
+class CSVRenderer(ReportRenderer):
+    format = 'csv'
+    extension = 'csv'
+
+    def open(self):
+        self.text = io.TextIOWrapper(self.stream, encoding='utf-8', newline='')
+        self.writer = csv.writer(self.text)
+        self.writer.writerow(self.dataset.headers)
+
+    def write_row(self, row):
+        self.writer.writerow(row)
+
+    def close(self):
+        self.text.flush()
+        # Hand the underlying stream back to the caller instead of closing it.
+        self.text.detach()
+
+
+class Echo:
+    """A write-only file object that hands back what is written to it."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(headers, rows):
+    """
+    Yields CSV-encoded lines one row at a time, for use as the body of a
+    StreamingHttpResponse.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_excel(stream, headers, rows, sheet_name=None):
+    """
+    Writes a plain header-plus-rows workbook using xlsxwriter's
+    constant_memory mode, which flushes each row to disk as it is written.
+    """
+    workbook = xlsxwriter.Workbook(stream, {'constant_memory': True})
+    worksheet = workbook.add_worksheet(sheet_name)
+    worksheet.write_row(0, 0, headers)
+    for row_num, row in enumerate(rows, start=1):
+        worksheet.write_row(row_num, 0, row)
+    workbook.close()
+
+
+RENDERERS = {
+    renderer.format: renderer
+    for renderer in (PDFRenderer, ExcelRenderer, CSVRenderer)
+}
+
+
+def render_dataset(dataset, renderers):
+    """
+    Iterates ``dataset`` once and feeds every row to each renderer, so a
+    report requested in several formats is only queried once.
+    """
+    for renderer in renderers:
+        renderer.open()
+    for row in dataset:
+        for renderer in renderers:
+            renderer.write_row(row)
+    for renderer in renderers:
+        renderer.close()
+
+
+def generate_report_files(report_type, start_date, end_date, formats, bucket='day'):
+    """
+    Renders one report in each of ``formats`` from a single pass over its
+    dataset and returns a {format: temp file path} mapping.
+    """
+    # Create the temporary file paths
+    temp_dir = os.path.join(settings.MEDIA_ROOT, 'temp')
+    os.makedirs(temp_dir, exist_ok=True)
+    # The pid keeps names unique when several worker processes render at once
+    timestamp = timezone.now().strftime("%Y%m%d_%H%M%S")
+    file_paths = {
+        format_type: os.path.join(temp_dir, f'report_{timestamp}_{os.getpid()}.{RENDERERS[format_type].extension}')
+        for format_type in formats
+    }
+
+    dataset = build_dataset(report_type, start_date, end_date, bucket)
+    with ExitStack() as stack:
+        renderers = [
+            RENDERERS[format_type](dataset, stack.enter_context(open(file_path, 'wb')))
+            for format_type, file_path in file_paths.items()
+        ]
+        render_dataset(dataset, renderers)
+    return file_paths
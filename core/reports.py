@@ -0,0 +1,343 @@
+import operator
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import reduce
+from django.db import connection
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Max, Q, Value
+from django.db.models.functions import Concat, Trim, TruncMonth, TruncWeek
+from .models import Student, Counselor, GuidanceSession, Appointment
+
+# Rows are pulled from the database in chunks so large reports never sit
+# in the queryset result cache all at once.
+REPORT_CHUNK_SIZE = 2000
+
+STUDENT_SUMMARY_HEADERS = ['Student Name', 'Course', 'Year', 'Total Sessions', 'Status']
+SESSION_ANALYTICS_HEADERS = ['Date', 'Total Sessions', 'Completed', 'Ongoing']
+COUNSELOR_PERFORMANCE_HEADERS = [
+    'Counselor Name', 'Total Sessions', 'Completed', 'Cancelled', 'Students', 'Avg Duration', 'Success Rate'
+]
+COUNSELOR_PERIOD_PERFORMANCE_HEADERS = COUNSELOR_PERFORMANCE_HEADERS[:1] + ['Period'] + COUNSELOR_PERFORMANCE_HEADERS[1:]
+CASE_MANAGEMENT_HEADERS = [
+    'Case ID', 'Student', 'Status', 'Sessions', 'Follow-Ups', 'Pending Follow-Ups', 'Last Updated'
+]
+SESSION_EXPORT_HEADERS = ['Student Name', 'Course', 'Session Type', 'Date', 'Status']
+
+StudentSummaryRow = namedtuple(
+    'StudentSummaryRow', ['student_name', 'course', 'year', 'total_sessions', 'status']
+)
+SessionAnalyticsRow = namedtuple(
+    'SessionAnalyticsRow', ['period', 'total_sessions', 'completed', 'ongoing']
+)
+CounselorPerformanceRow = namedtuple(
+    'CounselorPerformanceRow',
+    ['counselor_name', 'total_sessions', 'completed', 'cancelled', 'students', 'avg_duration', 'success_rate']
+)
+CounselorPeriodPerformanceRow = namedtuple(
+    'CounselorPeriodPerformanceRow', ['counselor_name', 'period'] + list(CounselorPerformanceRow._fields[1:])
+)
+CaseManagementRow = namedtuple(
+    'CaseManagementRow',
+    ['case_id', 'student_name', 'status', 'sessions', 'followups', 'pending_followups', 'last_updated']
+)
+
+# Bucket name -> (truncation function, label format). Days group on the
+# date column directly, so no truncation is needed.
+SESSION_ANALYTICS_BUCKETS = {
+    'day': (None, '%Y-%m-%d'),
+    'week': (TruncWeek, 'Week of %Y-%m-%d'),
+    'month': (TruncMonth, '%B %Y'),
+}
+# Counselor performance can also total each counselor over the whole range
+COUNSELOR_PERFORMANCE_BUCKETS = ('total',) + tuple(SESSION_ANALYTICS_BUCKETS)
+
+
+class ReportDataset:
+    """
+    The headers and rows of one report, independent of the output format.
+
+    Rows are produced lazily: the queries run when the dataset is iterated,
+    so a dataset should be iterated once and its rows fanned out to every
+    renderer that needs them (see report_renderers.render_dataset).
+    """
+
+    def __init__(self, report_type, headers, rows, start_date, end_date):
+        self.report_type = report_type
+        self.headers = headers
+        self._rows = rows
+        self.start_date = start_date
+        self.end_date = end_date
+
+    def __iter__(self):
+        return iter(self._rows())
+
+    @property
+    def title(self):
+        return f"Guidance Counseling Report - {self.report_type}"
+
+    @property
+    def period(self):
+        return f"Period: {self.start_date.strftime('%B %d, %Y')} - {self.end_date.strftime('%B %d, %Y')}"
+
+
+def full_name(prefix=''):
+    """
+    Database-side equivalent of User.get_full_name() for the user reached
+    through ``prefix`` (e.g. 'student__user__').
+    """
+    return Trim(Concat(f'{prefix}first_name', Value(' '), f'{prefix}last_name'))
+
+
+def student_summary_rows(start_date, end_date, chunk_size=REPORT_CHUNK_SIZE):
+    """
+    Yields one row per student with the number of sessions held in the
+    date range. Built from a single annotated query instead of one count
+    query per student.
+    """
+    students = Student.objects.annotate(
+        full_name=full_name('user__'),
+        total_sessions=Count(
+            'sessions',
+            filter=Q(sessions__date__range=[start_date, end_date])
+        ),
+    ).order_by('id').values_list('full_name', 'course', 'year', 'total_sessions')
+
+    for name, course, year, total_sessions in students.iterator(chunk_size=chunk_size):
+        yield StudentSummaryRow(
+            name,
+            course,
+            year,
+            total_sessions,
+            'Active' if total_sessions > 0 else 'Inactive'
+        )
+
+
+def session_analytics_rows(start_date, end_date, bucket='day'):
+    """
+    Yields one row per day, week or month in the date range with the total,
+    completed and ongoing session counts, computed by a single GROUP BY.
+    """
+    if bucket not in SESSION_ANALYTICS_BUCKETS:
+        raise ValueError(f"Unknown analytics bucket: {bucket}")
+    trunc, label_format = SESSION_ANALYTICS_BUCKETS[bucket]
+
+    sessions = GuidanceSession.objects.filter(date__range=[start_date, end_date])
+    if trunc is None:
+        sessions = sessions.values(period=F('date'))
+    else:
+        sessions = sessions.annotate(period=trunc('date')).values('period')
+
+    periods = sessions.annotate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(status='completed')),
+        ongoing=Count('id', filter=Q(status='in_progress')),
+    ).order_by('period').values_list('period', 'total', 'completed', 'ongoing')
+
+    for period, total, completed, ongoing in periods.iterator():
+        yield SessionAnalyticsRow(period.strftime(label_format), total, completed, ongoing)
+
+
+def _performance_aggregates(prefix='', sessions_filter=None):
+    """
+    Session aggregates for counselor performance. ``prefix`` is the path
+    from the queried model to GuidanceSession ('sessions__' from Counselor,
+    '' from GuidanceSession itself).
+    """
+    def only(condition=None):
+        conditions = [c for c in (sessions_filter, condition) if c is not None]
+        return reduce(operator.and_, conditions) if conditions else None
+
+    id_field = f'{prefix}id' if prefix else 'id'
+    duration = ExpressionWrapper(
+        F(f'{prefix}time_ended') - F(f'{prefix}time_started'),
+        output_field=DurationField()
+    )
+    return {
+        'total': Count(id_field, filter=only()),
+        'completed': Count(id_field, filter=only(Q(**{f'{prefix}status': 'completed'}))),
+        'cancelled': Count(id_field, filter=only(Q(**{f'{prefix}status': 'cancelled'}))),
+        'students': Count(f'{prefix}student', distinct=True, filter=only()),
+        'avg_duration': Avg(duration, filter=only()),
+    }
+
+
+def counselor_performance_queryset(start_date=None, end_date=None):
+    """
+    Every counselor annotated with their session totals, optionally limited
+    to sessions in the date range, as one grouped query.
+    """
+    in_range = None
+    if start_date and end_date:
+        in_range = Q(sessions__date__range=[start_date, end_date])
+    return Counselor.objects.annotate(
+        counselor_name=full_name('user__'),
+        **_performance_aggregates('sessions__', in_range)
+    ).order_by('id')
+
+
+def _performance_figures(total, completed, cancelled, students, avg_duration):
+    success_rate = (completed / total * 100) if total > 0 else 0
+    duration = f"{int(avg_duration.total_seconds() // 60)} minutes" if avg_duration else '-'
+    return [total, completed, cancelled, students, duration, f"{success_rate:.1f}%"]
+
+
+def counselor_performance_rows(start_date, end_date, bucket='total'):
+    """
+    Yields one row per counselor with their session totals in the date
+    range. With a 'day', 'week' or 'month' bucket the totals are broken
+    down into one row per counselor and period instead. Either way a single
+    grouped query produces every row.
+    """
+    if bucket not in COUNSELOR_PERFORMANCE_BUCKETS:
+        raise ValueError(f"Unknown counselor performance bucket: {bucket}")
+    fields = ['total', 'completed', 'cancelled', 'students', 'avg_duration']
+
+    if bucket == 'total':
+        counselors = counselor_performance_queryset(start_date, end_date).values_list('counselor_name', *fields)
+        for name, *figures in counselors.iterator():
+            yield CounselorPerformanceRow(name, *_performance_figures(*figures))
+        return
+
+    trunc, label_format = SESSION_ANALYTICS_BUCKETS[bucket]
+    sessions = GuidanceSession.objects.filter(date__range=[start_date, end_date])
+    if trunc is None:
+        sessions = sessions.annotate(period=F('date'))
+    else:
+        sessions = sessions.annotate(period=trunc('date'))
+    periods = sessions.values(
+        'counselor_id', 'period', counselor_name=full_name('counselor__user__')
+    ).annotate(
+        **_performance_aggregates()
+    ).order_by('counselor_name', 'counselor_id', 'period').values_list(
+        'counselor_name', 'period', *fields
+    )
+    for name, period, *figures in periods.iterator():
+        yield CounselorPeriodPerformanceRow(name, period.strftime(label_format), *_performance_figures(*figures))
+
+
+def case_management_rows(start_date, end_date, chunk_size=REPORT_CHUNK_SIZE):
+    """
+    Yields one case per student seen in the date range. Sessions are
+    grouped by student in a single query, with the student's name joined
+    in and follow-ups counted through the session's OneToOne followup.
+    A case is open while a session is still scheduled or in progress, or
+    a follow-up is outstanding.
+    """
+    cases = GuidanceSession.objects.filter(
+        date__range=[start_date, end_date]
+    ).values(
+        'student_id', student_name=full_name('student__user__')
+    ).annotate(
+        sessions=Count('id'),
+        open_sessions=Count('id', filter=Q(status__in=['scheduled', 'in_progress'])),
+        followups=Count('followup'),
+        pending_followups=Count('followup', filter=Q(followup__completed=False)),
+        last_updated=Max('updated_at'),
+    ).order_by('student_name', 'student_id').values_list(
+        'student_id', 'student_name', 'sessions', 'open_sessions',
+        'followups', 'pending_followups', 'last_updated'
+    )
+
+    for student_id, name, sessions, open_sessions, followups, pending, last_updated in cases.iterator(chunk_size=chunk_size):
+        yield CaseManagementRow(
+            f"CASE-{student_id}",
+            name,
+            'Open' if open_sessions or pending else 'Closed',
+            sessions,
+            followups,
+            pending,
+            last_updated.strftime('%Y-%m-%d')
+        )
+
+
+def session_export_rows(chunk_size=REPORT_CHUNK_SIZE):
+    """
+    Yields every guidance session as a flat export row. Values are read
+    straight from the joined query in chunks, so memory stays flat however
+    many sessions there are.
+    """
+    sessions = GuidanceSession.objects.annotate(
+        student_name=full_name('student__user__'),
+    ).order_by('id').values_list(
+        'student_name', 'student__course', 'session_type', 'date', 'status'
+    )
+
+    for name, course, session_type, date, status in sessions.iterator(chunk_size=chunk_size):
+        yield [name, course, session_type, date.strftime('%Y-%m-%d'), status]
+
+
+def session_sheet_rows():
+    sessions = GuidanceSession.objects.annotate(
+        student_name=full_name('student__user__'),
+        counselor_name=full_name('counselor__user__'),
+    ).order_by('id').values_list('date', 'student_name', 'counselor_name')
+    for date, student_name, counselor_name in sessions.iterator(chunk_size=REPORT_CHUNK_SIZE):
+        yield [date.strftime('%Y-%m-%d'), student_name, counselor_name]
+
+
+def student_sheet_rows():
+    students = Student.objects.annotate(
+        name=full_name('user__'),
+    ).order_by('id').values_list('name', 'year', 'course')
+    return students.iterator(chunk_size=REPORT_CHUNK_SIZE)
+
+
+def appointment_sheet_rows():
+    appointments = Appointment.objects.annotate(
+        student_name=full_name('student__user__'),
+    ).order_by('id').values_list('date', 'student_name', 'status')
+    for date, student_name, status in appointments.iterator(chunk_size=REPORT_CHUNK_SIZE):
+        yield [date.strftime('%Y-%m-%d'), student_name, status]
+
+
+# Metric name -> (sheet title, headers, row function), in workbook order
+CUSTOM_REPORT_SHEETS = {
+    'sessions': ('Sessions', ['Date', 'Student', 'Counselor'], session_sheet_rows),
+    'students': ('Students', ['Name', 'Year Level', 'Course'], student_sheet_rows),
+    'appointments': ('Appointments', ['Date', 'Student', 'Status'], appointment_sheet_rows),
+}
+
+
+def _fetch_sheet_rows(rows):
+    try:
+        return list(rows())
+    finally:
+        # Each pool thread opened its own connection; don't leak it
+        connection.close()
+
+
+def fetch_custom_sheets(metrics):
+    """
+    Runs the query behind each requested sheet at the same time on a thread
+    pool and returns [(title, headers, rows)] in workbook order, so the
+    total time is that of the slowest sheet rather than the sum.
+    """
+    selected = [CUSTOM_REPORT_SHEETS[name] for name in CUSTOM_REPORT_SHEETS if name in metrics]
+    if not selected:
+        return []
+    with ThreadPoolExecutor(max_workers=len(selected)) as pool:
+        futures = [pool.submit(_fetch_sheet_rows, rows) for _, _, rows in selected]
+        return [(title, headers, future.result()) for (title, headers, _), future in zip(selected, futures)]
+
+
+def build_dataset(report_type, start_date, end_date, bucket='day'):
+    """
+    Returns the ReportDataset for ``report_type``. Nothing is queried until
+    the dataset is iterated.
+    """
+    if report_type == 'student_summary':
+        headers = STUDENT_SUMMARY_HEADERS
+        rows = lambda: student_summary_rows(start_date, end_date)
+    elif report_type == 'session_analytics':
+        if bucket not in SESSION_ANALYTICS_BUCKETS:
+            raise ValueError(f"Unknown analytics bucket: {bucket}")
+        headers = SESSION_ANALYTICS_HEADERS
+        rows = lambda: session_analytics_rows(start_date, end_date, bucket)
+    elif report_type == 'counselor_performance':
+        if bucket not in COUNSELOR_PERFORMANCE_BUCKETS:
+            raise ValueError(f"Unknown counselor performance bucket: {bucket}")
+        headers = COUNSELOR_PERFORMANCE_HEADERS if bucket == 'total' else COUNSELOR_PERIOD_PERFORMANCE_HEADERS
+        rows = lambda: counselor_performance_rows(start_date, end_date, bucket)
+    else:  # case_management
+        headers = CASE_MANAGEMENT_HEADERS
+        rows = lambda: case_management_rows(start_date, end_date)
+    return ReportDataset(report_type, headers, rows, start_date, end_date)
@@ -0,0 +1,243 @@
+"""
+Full-text search over counseling records.
+
+Appointments, sessions, interviews, students and counselors are indexed in
+one SQLite FTS5 table, ``core_search_index``. Each row carries the people
+involved in ``names`` and the free text in ``body``, and is addressed by a
+rowid derived from its kind and primary key, so keeping a row in sync is a
+single indexed write. Matches are ranked with bm25, names weighted above
+body text.
+
+The table is kept current by the handlers in core.signals and can be
+rebuilt from scratch with ``manage.py rebuild_search_index``. On databases
+other than SQLite there is no index and ``search_filter`` falls back to
+``icontains``.
+"""
+import re
+from collections import namedtuple
+from functools import reduce
+import operator
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from .count_cache import invalidate_counts
+from .models import Appointment, Counselor, GuidanceSession, Interview, Student
+
+SEARCH_TABLE = 'core_search_index'
+
+# bm25 weights for (kind, object_id, names, body); unindexed columns get 0
+RANK_WEIGHTS = (0.0, 0.0, 10.0, 1.0)
+
+SearchHit = namedtuple('SearchHit', 'kind object_id rank snippet')
+
+# snippet() marks matches with these private-use characters, which typed
+# text does not contain, so the stored text can be escaped before the
+# markers become <mark> tags
+_MATCH_START, _MATCH_END = '\ue000', '\ue001'
+
+
+def _full_name(user):
+    return f'{user.first_name} {user.last_name} {user.username}'
+
+
+def _text(*values):
+    return '\n'.join(value for value in values if value)
+
+
+def appointment_document(appointment):
+    return (
+        _text(_full_name(appointment.student.user), _full_name(appointment.counselor.user)),
+        _text(appointment.purpose),
+    )
+
+
+def session_document(session):
+    return (
+        _text(_full_name(session.student.user), _full_name(session.counselor.user)),
+        _text(session.problem_statement, session.notes, session.recommendations),
+    )
+
+
+def interview_document(interview):
+    return (
+        _text(_full_name(interview.student.user), _full_name(interview.counselor.user)),
+        _text(
+            interview.reason_for_interview,
+            interview.presenting_problem,
+            interview.background_of_problem,
+            interview.counselor_notes,
+            interview.recommendations,
+        ),
+    )
+
+
+def student_document(student):
+    return _text(_full_name(student.user)), _text(student.user.email, student.course)
+
+
+def counselor_document(counselor):
+    return _text(_full_name(counselor.user)), _text(counselor.user.email, counselor.email)
+
+
+# kind: (code, model, document builder, related objects the document reads)
+SEARCH_KINDS = {
+    'appointment': (1, Appointment, appointment_document, ('student__user', 'counselor__user')),
+    'session': (2, GuidanceSession, session_document, ('student__user', 'counselor__user')),
+    'interview': (3, Interview, interview_document, ('student__user', 'counselor__user')),
+    'student': (4, Student, student_document, ('user',)),
+    'counselor': (5, Counselor, counselor_document, ('user',)),
+}
+KIND_FOR_MODEL = {model: kind for kind, (_, model, _, _) in SEARCH_KINDS.items()}
+
+
+def search_available():
+    return connection.vendor == 'sqlite'
+
+
+def _rowid(kind, pk):
+    # Eight kind codes per primary key, so a row is found without a scan
+    return pk * 8 + SEARCH_KINDS[kind][0]
+
+
+def match_expression(query):
+    """
+    Turns free text into an FTS5 MATCH expression: every word must appear,
+    and the last one may be a prefix so results follow the user's typing.
+    Returns '' when the query has no searchable words.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return ''
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _rows(kind, objects):
+    code, _, document, _ = SEARCH_KINDS[kind]
+    for obj in objects:
+        names, body = document(obj)
+        yield obj.pk * 8 + code, kind, obj.pk, names, body
+
+
+def _write(rows):
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, kind, object_id, names, body) '
+            f'VALUES (%s, %s, %s, %s, %s)',
+            list(rows),
+        )
+    invalidate_counts(SEARCH_TABLE)
+
+
+def index_object(obj):
+    if not search_available():
+        return
+    _write(_rows(KIND_FOR_MODEL[type(obj)], [obj]))
+
+
+def remove_object(obj):
+    if not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+            [_rowid(KIND_FOR_MODEL[type(obj)], obj.pk)],
+        )
+    invalidate_counts(SEARCH_TABLE)
+
+
+def index_queryset(kind, queryset, batch_size=1000):
+    """Indexes every object in ``queryset``, ``batch_size`` rows per write."""
+    related = SEARCH_KINDS[kind][3]
+    objects = queryset.select_related(*related).iterator(chunk_size=batch_size)
+    batch, total = [], 0
+    for row in _rows(kind, objects):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            _write(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        _write(batch)
+        total += len(batch)
+    return total
+
+
+def reindex_user(user):
+    """Re-indexes everything that shows ``user``'s name, after it changes."""
+    if not search_available():
+        return
+    for profile_kind, related_name in (('student', 'student_profile'), ('counselor', 'counselor_profile')):
+        profile = getattr(user, related_name, None)
+        if profile is None:
+            continue
+        index_queryset(profile_kind, SEARCH_KINDS[profile_kind][1].objects.filter(pk=profile.pk))
+        for kind in ('appointment', 'session', 'interview'):
+            model = SEARCH_KINDS[kind][1]
+            index_queryset(kind, model.objects.filter(**{profile_kind: profile}))
+
+
+@transaction.atomic
+def rebuild_search_index():
+    """Empties the index and fills it again from the tables. Returns the row count."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+    invalidate_counts(SEARCH_TABLE)
+    total = sum(
+        index_queryset(kind, model.objects.all())
+        for kind, (_, model, _, _) in SEARCH_KINDS.items()
+    )
+    with connection.cursor() as cursor:
+        # Merge the index b-trees so later queries touch fewer pages
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+    return total
+
+
+def search(query, kinds=None, limit=20):
+    """
+    Returns up to ``limit`` SearchHits for ``query``, best match first,
+    optionally restricted to some of SEARCH_KINDS.
+    """
+    expression = match_expression(query)
+    if not expression or not search_available():
+        return []
+    sql = (
+        f'SELECT kind, object_id, bm25({SEARCH_TABLE}, {", ".join(map(str, RANK_WEIGHTS))}) AS rank, '
+        f"snippet({SEARCH_TABLE}, -1, '{_MATCH_START}', '{_MATCH_END}', '...', 12) "
+        f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s'
+    )
+    params = [expression]
+    if kinds:
+        sql += f' AND kind IN ({", ".join(["%s"] * len(kinds))})'
+        params.extend(kinds)
+    sql += ' ORDER BY rank LIMIT %s'
+    params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [
+            SearchHit(kind, object_id, rank, highlight(snippet))
+            for kind, object_id, rank, snippet in cursor.fetchall()
+        ]
+
+
+def highlight(snippet):
+    """Returns ``snippet`` as HTML: the text escaped, the matches in <mark>."""
+    return escape(snippet).replace(_MATCH_START, '<mark>').replace(_MATCH_END, '</mark>')
+
+
+def search_filter(kind, query, fallback_fields):
+    """
+    Returns a Q restricting a ``kind`` queryset to rows matching ``query``.
+    Without the FTS5 index it ORs ``icontains`` over ``fallback_fields``.
+    """
+    if not search_available():
+        return reduce(operator.or_, (Q(**{f'{field}__icontains': query}) for field in fallback_fields))
+    expression = match_expression(query)
+    if not expression:
+        return Q()
+    return Q(pk__in=RawSQL(
+        f'SELECT object_id FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s AND kind = %s',
+        (expression, kind),
+    ))
@@ -0,0 +1,78 @@
+"""
+Incremental maintenance of the DailySessionStats rollup.
+
+Every GuidanceSession and Appointment contributes 1 to the rollup row for
+its (day, counselor, session type, status) key. When one is saved or
+deleted the old key is decremented and the new one incremented, so the
+dashboards can read a few hundred rollup rows instead of the fact tables.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max
+from django.utils import timezone
+from .models import Appointment, DailySessionStats, GuidanceSession
+
+# Source name -> (model, fields making up the rollup key)
+STATS_SOURCES = {
+    'session': (GuidanceSession, ('date', 'counselor_id', 'session_type', 'status')),
+    'appointment': (Appointment, ('date', 'counselor_id', 'status')),
+}
+
+
+def source_for(model):
+    for source, (source_model, _) in STATS_SOURCES.items():
+        if source_model is model:
+            return source
+    return None
+
+
+def stats_key(source, values):
+    """Builds the DailySessionStats lookup for a row's field values."""
+    return {
+        'source': source,
+        'day': values['date'],
+        'counselor_id': values['counselor_id'],
+        'session_type': values.get('session_type') or '',
+        'status': values['status'],
+    }
+
+
+def apply_delta(key, delta):
+    """Adds ``delta`` to the rollup row for ``key``, creating it if needed."""
+    rows = DailySessionStats.objects.filter(**key)
+    if rows.update(count=F('count') + delta, updated_at=timezone.now()) or delta <= 0:
+        return
+    try:
+        with transaction.atomic():
+            DailySessionStats.objects.create(count=delta, **key)
+    except IntegrityError:
+        # Another writer created the row first
+        rows.update(count=F('count') + delta, updated_at=timezone.now())
+
+
+def move(old_key, new_key):
+    if old_key == new_key:
+        return
+    if old_key:
+        apply_delta(old_key, -1)
+    if new_key:
+        apply_delta(new_key, 1)
+
+
+@transaction.atomic
+def rebuild_session_stats():
+    """Recomputes the whole rollup from the fact tables. Returns the row count."""
+    DailySessionStats.objects.all().delete()
+    rows = []
+    for source, (model, fields) in STATS_SOURCES.items():
+        grouped = model.objects.values(*fields).annotate(total=Count('id')).order_by()
+        rows.extend(
+            DailySessionStats(count=values['total'], **stats_key(source, values))
+            for values in grouped
+        )
+    DailySessionStats.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def stats_last_modified(**filters):
+    """When the rollup rows matching ``filters`` last changed, or None."""
+    return DailySessionStats.objects.filter(**filters).aggregate(latest=Max('updated_at'))['latest']
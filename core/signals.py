@@ -0,0 +1,194 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .availability import ACTIVE_STATUSES, refresh_day
+from .count_cache import invalidate_counts
+from .dashboard_cache import invalidate_dashboards
+from .models import Appointment, Counselor, GuidanceSession, Interview, Student, User
+from .counters import update_appointment_counters, update_session_counters
+from .search import index_object, reindex_user, remove_object
+from .name_index import index_student
+from .session_stats import move, source_for, stats_key
+
+
+# Fields the rollup, the profile counters and the availability calendar depend on
+TRACKED_FIELDS = {
+    GuidanceSession: ('date', 'student_id', 'counselor_id', 'session_type', 'status'),
+    Appointment: ('date', 'time', 'student_id', 'counselor_id', 'status'),
+}
+
+# User fields that appear in search documents
+SEARCHED_USER_FIELDS = ('first_name', 'last_name', 'username', 'email')
+
+COUNTER_UPDATES = {
+    GuidanceSession: update_session_counters,
+    Appointment: update_appointment_counters,
+}
+
+
+def tracked_values(sender, instance):
+    return {field: getattr(instance, field) for field in TRACKED_FIELDS[sender]}
+
+
+# No savepoint: a failure here must roll back the row write around it
+@transaction.atomic(savepoint=False)
+def apply_change(sender, old, new):
+    """Moves a row's contribution in the rollup and counters from ``old`` to ``new``."""
+    source = source_for(sender)
+    move(
+        stats_key(source, old) if old else None,
+        stats_key(source, new) if new else None,
+    )
+    COUNTER_UPDATES[sender](old, new)
+
+
+@receiver(pre_save, sender=GuidanceSession)
+@receiver(pre_save, sender=Appointment)
+def remember_tracked_values(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # One read of the stored row serves both the rollup and the counters
+    instance._tracked_values = (
+        sender.objects.filter(pk=instance.pk).values(*TRACKED_FIELDS[sender]).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=GuidanceSession)
+@receiver(post_save, sender=Appointment)
+def track_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    apply_change(sender, getattr(instance, '_tracked_values', None), tracked_values(sender, instance))
+
+
+@receiver(post_delete, sender=GuidanceSession)
+@receiver(post_delete, sender=Appointment)
+def track_deleted(sender, instance, **kwargs):
+    apply_change(sender, tracked_values(sender, instance), None)
+
+
+@receiver(post_save, sender=Appointment)
+def update_availability(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    old, new = getattr(instance, '_tracked_values', None), tracked_values(sender, instance)
+    slots = [
+        values and (values['counselor_id'], values['date'], values['time'], values['status'] in ACTIVE_STATUSES)
+        for values in (old, new)
+    ]
+    # Approving keeps the slot held, and editing the purpose moves nothing
+    if slots[0] == slots[1]:
+        return
+    # A moved appointment frees its old day as well as booking the new one
+    for counselor_id, day in {slot[:2] for slot in slots if slot}:
+        refresh_day(counselor_id, day)
+
+
+@receiver(post_delete, sender=Appointment)
+def release_availability(sender, instance, **kwargs):
+    refresh_day(instance.counselor_id, instance.date)
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def invalidate_appointment_dashboards(sender, instance, **kwargs):
+    # The admin dashboard lists upcoming appointments for everyone
+    invalidate_dashboards(
+        f'student:{instance.student_id}', f'counselor:{instance.counselor_id}', 'role:admin'
+    )
+
+
+@receiver(post_save, sender=GuidanceSession)
+@receiver(post_delete, sender=GuidanceSession)
+@receiver(post_save, sender=Interview)
+@receiver(post_delete, sender=Interview)
+def invalidate_session_dashboards(sender, instance, **kwargs):
+    invalidate_dashboards(f'student:{instance.student_id}', f'counselor:{instance.counselor_id}')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_dashboards(sender, instance, update_fields=None, **kwargs):
+    # Logging in only touches last_login, which no dashboard shows
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_dashboards('role:admin', 'role:counselor')
+
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+@receiver(post_save, sender=Counselor)
+@receiver(post_delete, sender=Counselor)
+def invalidate_profile_dashboards(sender, instance, **kwargs):
+    # Student and counselor totals appear on the admin and counselor dashboards
+    invalidate_dashboards('role:admin', 'role:counselor')
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+@receiver(post_save, sender=GuidanceSession)
+@receiver(post_delete, sender=GuidanceSession)
+@receiver(post_save, sender=Interview)
+@receiver(post_delete, sender=Interview)
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+@receiver(post_save, sender=Counselor)
+@receiver(post_delete, sender=Counselor)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_table_counts(sender, instance, update_fields=None, **kwargs):
+    # No list filters on last_login, so logging in keeps the user counts
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_counts(sender._meta.db_table)
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_save, sender=GuidanceSession)
+@receiver(post_save, sender=Interview)
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Counselor)
+def index_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    index_object(instance)
+
+
+@receiver(post_delete, sender=Appointment)
+@receiver(post_delete, sender=GuidanceSession)
+@receiver(post_delete, sender=Interview)
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Counselor)
+def unindex_deleted(sender, instance, **kwargs):
+    remove_object(instance)
+
+
+@receiver(pre_save, sender=User)
+def remember_searched_fields(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._searched_values = None
+    if raw or not instance.pk:
+        return
+    if update_fields and not set(update_fields) & set(SEARCHED_USER_FIELDS):
+        return
+    instance._searched_values = sender.objects.filter(pk=instance.pk).values_list(*SEARCHED_USER_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def reindex_renamed_user(sender, instance, raw=False, **kwargs):
+    old = getattr(instance, '_searched_values', None)
+    if raw or old is None:
+        return
+    # A rename touches every record that shows the name, so only do it on a real change
+    if old != tuple(getattr(instance, field) for field in SEARCHED_USER_FIELDS):
+        reindex_user(instance)
+        student = getattr(instance, 'student_profile', None)
+        if student is not None:
+            index_student(student)
+
+
+@receiver(post_save, sender=Student)
+def index_student_name(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    index_student(instance)
@@ -1,53 +1,84 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.utils import timezone
 from .models import Student, Appointment, GuidanceSession, Interview, Counselor
 from datetime import datetime, timedelta
+from asgiref.sync import sync_to_async
+from .async_queries import gather_queries
+from .dashboard_cache import acached_dashboard
+from .dashboard_stats import merge_stats, student_stat_queries
+from django.db.models import Count, Q
+from django.http import JsonResponse
+from django.utils.dateparse import parse_date
+from .availability import SLOT_MINUTES, free_slots
+from .booking import SlotTaken, book_appointment
+from .forms import AppointmentForm
+from .pagination import CursorPaginator
+
+APPOINTMENTS_PER_PAGE = 10
+# Widest date range one availability request may ask for
+AVAILABILITY_MAX_DAYS = 31
 
 def is_student(user):
     return user.is_authenticated and user.role == 'student'
 
 @login_required
 @user_passes_test(is_student)
-def student_dashboard(request):
-    student = get_object_or_404(Student, user=request.user)
-    upcoming_appointments = Appointment.objects.filter(
-        student=student,
-        date__gte=timezone.now().date()
-    ).order_by('date', 'time')[:5]
-    
-    recent_sessions = GuidanceSession.objects.filter(
-        student=student
-    ).order_by('-date')[:5]
-    
-    context = {
-        'upcoming_appointments': upcoming_appointments,
-        'recent_sessions': recent_sessions,
-        'total_sessions': GuidanceSession.objects.filter(student=student).count(),
-        'pending_appointments': Appointment.objects.filter(student=student, status='pending').count(),
-        'completed_sessions': GuidanceSession.objects.filter(student=student, status='completed').count()
-    }
-    return render(request, 'student/dashboard.html', context)
+async def student_dashboard(request):
+    user = await request.auser()
+    student = await aget_object_or_404(Student, user=user)
+
+    async def build():
+        # The stats and both lists are independent, so they run concurrently
+        *stats, upcoming_appointments, recent_sessions = await gather_queries(
+            *student_stat_queries(student),
+            lambda: list(Appointment.objects.filter(
+                student=student,
+                date__gte=timezone.now().date()
+            ).select_related('counselor__user').order_by('date', 'time')[:5]),
+            lambda: list(GuidanceSession.objects.filter(
+                student=student
+            ).select_related('counselor__user').order_by('-date')[:5]),
+        )
+        return {
+            'upcoming_appointments': upcoming_appointments,
+            'recent_sessions': recent_sessions,
+            **merge_stats(stats),
+        }
+
+    context = await acached_dashboard('student', user, [f'student:{student.pk}'], build)
+    return await sync_to_async(render)(request, 'student/dashboard.html', context)
 
 @login_required
 @user_passes_test(is_student)
 def student_appointment_list(request):
     student = get_object_or_404(Student, user=request.user)
-    appointments = Appointment.objects.filter(student=student).order_by('-date', '-time')
-    counselors = Counselor.objects.all()
-    
-    # Add these specific querysets
+    today = timezone.now().date()
+    appointments = Appointment.objects.filter(student=student).select_related('student__user', 'counselor__user')
+    upcoming = Q(date__gte=today, status__in=['pending', 'approved'])  # Include both pending and approved
+
+    counts = appointments.aggregate(
+        upcoming_count=Count('id', filter=upcoming),
+        completed_count=Count('id', filter=Q(status='completed')),
+    )
+    # Both lists are paged by cursor, each with its own query parameter:
+    # upcoming appointments soonest first, past ones newest first.
+    upcoming_page = CursorPaginator(
+        appointments.filter(upcoming), ('date', 'time', 'id'), APPOINTMENTS_PER_PAGE
+    ).page(request.GET.get('upcoming'))
+    past_page = CursorPaginator(
+        appointments.filter(date__lt=today), ('-date', '-time', '-id'), APPOINTMENTS_PER_PAGE
+    ).page(request.GET.get('cursor'))
+
     context = {
-        'appointments': appointments,
-        'counselors': counselors,
-        'upcoming_appointments': appointments.filter(
-            date__gte=timezone.now().date(),
-            status__in=['pending', 'approved']  # Include both pending and approved
-        ),
-        'past_appointments': appointments.filter(
-            date__lt=timezone.now().date()
-        )
+        'counselors': Counselor.objects.select_related('user').only(
+            'id', 'user__first_name', 'user__last_name'
+        ).order_by('user__last_name', 'user__first_name'),
+        'upcoming_appointments': upcoming_page,
+        'past_appointments': past_page,
+        'page_obj': past_page,
+        **counts,
     }
     return render(request, 'student/appointments.html', context)
 
@@ -75,25 +106,20 @@ def student_counselor_list(request):
 @user_passes_test(is_student)
 def request_appointment(request):
     if request.method == 'POST':
-        student = Student.objects.get(user=request.user)
-        counselor_id = request.POST.get('counselor')
-        appointment_date = request.POST.get('date') 
-        appointment_time = request.POST.get('time')
-        purpose = request.POST.get('purpose')
-        
-        counselor = get_object_or_404(Counselor, id=counselor_id)
-        
-        appointment = Appointment.objects.create(
-            student=student,
-            counselor=counselor,
-            date=appointment_date,
-            time=appointment_time,
-            purpose=purpose,
-            status='pending'
-        )
-        
-        messages.success(request, 'Appointment request submitted successfully.')
-        return redirect('student_appointment_list')
+        student = get_object_or_404(Student, user=request.user)
+        form = AppointmentForm(request.POST)
+        if form.is_valid():
+            try:
+                book_appointment(student, **form.cleaned_data)
+            except SlotTaken:
+                messages.error(request, 'This time slot was just booked. Please select a different time.')
+            else:
+                messages.success(request, 'Appointment request submitted successfully.')
+                return redirect('student_appointment_list')
+        else:
+            for errors in form.errors.values():
+                for error in errors:
+                    messages.error(request, error)
         
     counselors = Counselor.objects.all()
     context = {
@@ -102,6 +128,29 @@ def request_appointment(request):
     }
     return render(request, 'student/request_appointment.html', context)
 
+@login_required
+def counselor_availability(request, counselor_id):
+    counselor = get_object_or_404(Counselor, id=counselor_id)
+    today = timezone.localdate()
+    try:
+        start = parse_date(request.GET.get('start', '')) or today
+        end = parse_date(request.GET.get('end', '')) or start + timedelta(days=6)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid date.'}, status=400)
+    # Past days have no free slots worth offering
+    start = max(start, today)
+    if end < start or (end - start).days >= AVAILABILITY_MAX_DAYS:
+        return JsonResponse({'error': f'Choose a range of 1 to {AVAILABILITY_MAX_DAYS} days from today on.'}, status=400)
+
+    return JsonResponse({
+        'counselor': counselor.id,
+        'slot_minutes': SLOT_MINUTES,
+        'days': [
+            {'date': day.isoformat(), 'free': [slot.strftime('%H:%M') for slot in slots]}
+            for day, slots in free_slots(counselor, start, end).items()
+        ],
+    })
+
 @login_required
 @user_passes_test(is_student)
 def cancel_appointment(request, appointment_id):
@@ -1,3 +1,1367 @@
-from django.test import TestCase
+import multiprocessing
+import os
+import re
+import sqlite3
+import tempfile
+import zipfile
+from concurrent.futures import Future
+from contextlib import closing
+from datetime import date, time, timedelta
+from importlib import import_module
+from io import BytesIO, StringIO
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+from django.apps import apps
+from django.core import signing
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections
+from django.db.models import F
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from .availability import SLOT_TIMES
+from .booking import SlotTaken, book_appointment
+from .counters import reconcile_counters
+from .dashboard_stats import admin_stats, counselor_stats, student_stats
+from .forms import AppointmentForm
+from .name_index import typeahead
+from .models import (
+    User, Student, Counselor, Appointment, GuidanceSession, FollowUp, Interview, Report, ReportJob,
+    DailySessionStats, CounselorAvailability,
+)
+from .pagination import CURSOR_SALT, CursorPaginator
+from .query_budget import QueryBudgetMixin, QueryRecorder
+from .report_cache import evict_reports
+from .report_jobs import claim_job, enqueue_reports, requeue_stale_jobs, run_job
+from .report_renderers import RENDERERS, PDFTableWriter, render_dataset
+from .reports import (
+    SESSION_EXPORT_HEADERS, build_dataset, case_management_rows, counselor_performance_rows,
+    fetch_custom_sheets, session_analytics_rows, student_summary_rows,
+)
+from .search import search
+from .student_views import AVAILABILITY_MAX_DAYS
+from .urls import urlpatterns
+from .views import AppointmentListView
 
-# Create your tests here.
+
+def create_counselor(username='counselor', **user_fields):
+    user = User.objects.create_user(username, role='counselor', **user_fields)
+    return Counselor.objects.create(user=user, email=f'{username}@example.com')
+
+
+def create_student(username='student', course='BSIT', year=1, **user_fields):
+    user = User.objects.create_user(username, role='student', **user_fields)
+    return Student.objects.create(user=user, course=course, year=year)
+
+
+class DashboardStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.now().date()
+        cls.counselor = create_counselor(approval_status='approved')
+
+        cls.student = None
+        for i, is_active in enumerate([True, True, False]):
+            student = create_student(f'student{i}', is_active=is_active)
+            cls.student = cls.student or student
+        User.objects.create_user('admin', role='admin', approval_status='approved')
+
+        for status in ['completed', 'completed', 'scheduled']:
+            GuidanceSession.objects.create(
+                student=cls.student, counselor=cls.counselor, session_type='Interview', status=status
+            )
+        for appointment_date, appointment_time, status in [
+            (cls.today, time(9, 0), 'approved'),
+            (cls.today, time(10, 0), 'pending'),
+            (date(2020, 1, 1), time(9, 0), 'approved'),
+        ]:
+            Appointment.objects.create(
+                student=cls.student, counselor=cls.counselor, date=appointment_date,
+                time=appointment_time, purpose='Consultation', status=status
+            )
+
+    def test_admin_stats(self):
+        with self.assertNumQueries(1):
+            stats = admin_stats()
+        self.assertEqual(stats, {
+            'total_users': 5,
+            'active_students': 2,
+            'active_counselors': 1,
+            'pending_approvals': 3,
+        })
+
+    def test_student_stats(self):
+        with self.assertNumQueries(2):
+            stats = student_stats(self.student)
+        self.assertEqual(stats, {
+            'total_sessions': 3,
+            'completed_sessions': 2,
+            'total_appointments': 3,
+            'pending_appointments': 1,
+        })
+
+    def test_counselor_stats(self):
+        with self.assertNumQueries(3):
+            stats = counselor_stats(self.counselor, self.today)
+        self.assertEqual(stats, {
+            'pending_appointments': 1,
+            'today_sessions': 1,
+            'completed_sessions': 2,
+            'total_students': 3,
+            'active_students': 2,
+        })
+
+    def dashboard_context(self, user):
+        # The fallback dashboard's template is not shipped, so capture the
+        # context it would render.
+        self.client.force_login(user)
+        with mock.patch('core.views.render', return_value=HttpResponse()) as render:
+            self.client.get(reverse('dashboard'))
+        return render.call_args.args[2]
+
+    def test_the_fallback_dashboard_shows_the_figures(self):
+        context = self.dashboard_context(self.counselor.user)
+        self.assertEqual(context['today_sessions_count'], 1)
+        self.assertEqual(context['pending_appointments'], 1)
+        self.assertEqual(context['total_students'], 2)
+        self.assertEqual(self.dashboard_context(self.student.user)['total_sessions'], 3)
+
+
+class SessionAnalyticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        counselor = create_counselor(first_name='Ana', last_name='Santos')
+        student = create_student()
+        for day, status in [
+            (date(2026, 3, 2), 'completed'),
+            (date(2026, 3, 2), 'in_progress'),
+            (date(2026, 3, 4), 'scheduled'),
+            (date(2026, 4, 1), 'completed'),
+            (date(2026, 5, 1), 'completed'),
+        ]:
+            session = GuidanceSession.objects.create(
+                student=student, counselor=counselor, session_type='Interview', status=status
+            )
+            # date is auto_now_add, so backdate it directly
+            GuidanceSession.objects.filter(pk=session.pk).update(date=day)
+
+    def rows(self, bucket):
+        with self.assertNumQueries(1):
+            return [tuple(row) for row in session_analytics_rows(date(2026, 3, 1), date(2026, 4, 30), bucket)]
+
+    def test_rows_per_day(self):
+        self.assertEqual(self.rows('day'), [
+            ('2026-03-02', 2, 1, 1),
+            ('2026-03-04', 1, 0, 0),
+            ('2026-04-01', 1, 1, 0),
+        ])
+
+    def test_rows_per_week(self):
+        self.assertEqual(self.rows('week'), [
+            ('Week of 2026-03-02', 3, 1, 1),
+            ('Week of 2026-03-30', 1, 1, 0),
+        ])
+
+    def test_rows_per_month(self):
+        self.assertEqual(self.rows('month'), [
+            ('March 2026', 3, 1, 1),
+            ('April 2026', 1, 1, 0),
+        ])
+
+    def test_unknown_bucket(self):
+        with self.assertRaises(ValueError):
+            list(session_analytics_rows(date(2026, 3, 1), date(2026, 4, 30), 'year'))
+
+    def performance(self, bucket):
+        with self.assertNumQueries(1):
+            return [
+                tuple(row)[:4]
+                for row in counselor_performance_rows(date(2026, 3, 1), date(2026, 4, 30), bucket)
+            ]
+
+    def test_counselor_totals_over_the_range(self):
+        self.assertEqual(self.performance('total'), [('Ana Santos', 4, 2, 0)])
+
+    def test_counselor_rows_per_day(self):
+        self.assertEqual(self.performance('day'), [
+            ('Ana Santos', '2026-03-02', 2, 1),
+            ('Ana Santos', '2026-03-04', 1, 0),
+            ('Ana Santos', '2026-04-01', 1, 1),
+        ])
+
+
+class ReportDatasetTests(TestCase):
+    """The report row builders, each a single grouped query, and the renderers they feed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        counselor = create_counselor(first_name='Ana', last_name='Santos')
+        cls.cruz = create_student('cruz', first_name='Juan', last_name='Cruz')
+        cls.reyes = create_student('reyes', course='BSCS', year=2, first_name='Maria', last_name='Reyes')
+        cls.sessions = []
+        for student, day, status in [
+            (cls.cruz, date(2026, 3, 2), 'completed'),
+            (cls.cruz, date(2026, 3, 9), 'completed'),
+            (cls.reyes, date(2026, 2, 1), 'completed'),
+        ]:
+            session = GuidanceSession.objects.create(
+                student=student, counselor=counselor, session_type='Interview', status=status
+            )
+            # date is auto_now_add, so backdate it directly
+            GuidanceSession.objects.filter(pk=session.pk).update(date=day)
+            cls.sessions.append(session)
+
+    def rows(self, builder):
+        with self.assertNumQueries(1):
+            return [tuple(row) for row in builder(date(2026, 3, 1), date(2026, 3, 31))]
+
+    def test_student_summary_counts_sessions_in_the_range(self):
+        self.assertEqual(self.rows(student_summary_rows), [
+            ('Juan Cruz', 'BSIT', 1, 2, 'Active'),
+            ('Maria Reyes', 'BSCS', 2, 0, 'Inactive'),
+        ])
+
+    def test_case_management_groups_sessions_by_student(self):
+        followup = FollowUp.objects.create(session=self.sessions[0], followup_date=date(2026, 3, 16))
+        self.assertEqual([row[:6] for row in self.rows(case_management_rows)], [
+            (f'CASE-{self.cruz.id}', 'Juan Cruz', 'Open', 2, 1, 1),
+        ])
+        followup.completed = True
+        followup.save()
+        self.assertEqual([row[:6] for row in self.rows(case_management_rows)], [
+            (f'CASE-{self.cruz.id}', 'Juan Cruz', 'Closed', 2, 1, 0),
+        ])
+
+    def test_one_pass_renders_every_format(self):
+        dataset = build_dataset('student_summary', date(2026, 3, 1), date(2026, 3, 31))
+        streams = {format_type: BytesIO() for format_type in RENDERERS}
+        renderers = [RENDERERS[format_type](dataset, stream) for format_type, stream in streams.items()]
+        with self.assertNumQueries(1):
+            render_dataset(dataset, renderers)
+
+        self.assertEqual(streams['csv'].getvalue().decode().splitlines(), [
+            'Student Name,Course,Year,Total Sessions,Status',
+            'Juan Cruz,BSIT,1,2,Active',
+            'Maria Reyes,BSCS,2,0,Inactive',
+        ])
+        with zipfile.ZipFile(streams['excel']) as workbook:
+            sheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+        self.assertIn(dataset.title, sheet)
+        self.assertIn('Maria Reyes', sheet)
+        self.assertTrue(streams['pdf'].getvalue().startswith(b'%PDF'))
+
+    def test_the_csv_export_streams_every_session(self):
+        admin = User.objects.create_user('admin', role='admin', is_staff=True, approval_status='approved')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('export_report_csv'))
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(b''.join(response.streaming_content).decode().splitlines(), [
+            'Student Name,Course,Session Type,Date,Status',
+            'Juan Cruz,BSIT,Interview,2026-03-02,completed',
+            'Juan Cruz,BSIT,Interview,2026-03-09,completed',
+            'Maria Reyes,BSCS,Interview,2026-02-01,completed',
+        ])
+
+
+class PDFTableWriterTests(SimpleTestCase):
+    """Long PDF tables are drawn in page-sized chunks."""
+
+    def test_rows_spill_onto_a_new_page_at_the_boundary(self):
+        stream = BytesIO()
+        writer = PDFTableWriter(stream, 'Sessions', SESSION_EXPORT_HEADERS)
+        first_page = writer.rows_per_page
+        for i in range(first_page):
+            writer.write_row([f'Student {i}', 'BSIT', 'Interview', '2026-03-02', 'completed'])
+        # A full page is drawn as soon as its last row arrives
+        self.assertEqual((writer.pages, writer.rows), (1, []))
+        # Later pages have no heading, so they hold more rows
+        self.assertGreater(writer.rows_per_page, first_page)
+
+        writer.write_row(['Student', 'BSIT', 'Interview', '2026-03-03', 'completed'])
+        self.assertEqual(writer.pages, 1)
+        writer.close()
+        self.assertEqual(writer.pages, 2)
+        self.assertEqual(len(re.findall(rb'/Type /Page\b(?!s)', stream.getvalue())), 2)
+
+    def test_an_empty_table_still_gets_a_page(self):
+        writer = PDFTableWriter(BytesIO(), 'Sessions', SESSION_EXPORT_HEADERS)
+        writer.close()
+        self.assertEqual(writer.pages, 1)
+
+    def test_long_cells_are_clipped_to_their_column(self):
+        writer = PDFTableWriter(BytesIO(), 'Sessions', SESSION_EXPORT_HEADERS)
+        text, width = writer._fit('x' * 200, writer.col_widths[0], writer.body_font)
+        self.assertTrue(text.endswith('...'))
+        self.assertLessEqual(width, writer.col_widths[0] - 2 * writer.cell_padding)
+
+
+class CustomSheetsTests(TransactionTestCase):
+    """Custom report sheets are queried concurrently, each on its own connection."""
+
+    def setUp(self):
+        counselor = create_counselor()
+        self.student = create_student(first_name='Juan', last_name='Cruz')
+        Appointment.objects.create(
+            student=self.student, counselor=counselor, date=date(2026, 3, 2),
+            time=time(9, 0), purpose='Consultation',
+        )
+
+    def test_only_the_selected_sheets_are_built_in_workbook_order(self):
+        sheets = fetch_custom_sheets(['appointments', 'students', 'grades'])
+        self.assertEqual(sheets, [
+            ('Students', ['Name', 'Year Level', 'Course'], [('Juan Cruz', 1, 'BSIT')]),
+            ('Appointments', ['Date', 'Student', 'Status'], [['2026-03-02', 'Juan Cruz', 'pending']]),
+        ])
+
+    def test_no_sheets_selected(self):
+        self.assertEqual(fetch_custom_sheets([]), [])
+
+
+class ChartEndpointTests(TestCase):
+    """Chart endpoints answer a current ETag with a 304."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', role='admin', is_staff=True, approval_status='approved')
+        cls.counselor = create_counselor(approval_status='approved')
+        cls.student = create_student()
+
+    def create_session(self):
+        GuidanceSession.objects.create(
+            student=self.student, counselor=self.counselor, session_type='Interview', status='scheduled'
+        )
+
+    def fetch(self, url, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(url, **headers)
+
+    def test_a_rollup_chart_is_revalidated_until_the_rollup_changes(self):
+        self.create_session()
+        self.client.force_login(self.admin)
+        url = reverse('chart_data', args=['session-types'])
+        response = self.fetch(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'labels': ['Interview'], 'data': [1]})
+        etag = response['ETag']
+        self.assertEqual(self.fetch(url, etag).status_code, 304)
+
+        self.create_session()
+        response = self.fetch(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json(), {'labels': ['Interview'], 'data': [2]})
+
+    def test_a_chart_outside_the_rollup_is_tagged_by_its_content(self):
+        self.client.force_login(self.admin)
+        url = reverse('chart_data', args=['course-distribution'])
+        etag = self.fetch(url)['ETag']
+        self.assertEqual(self.fetch(url, etag).status_code, 304)
+
+        create_student('student2', course='BSCS')
+        response = self.fetch(url, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_counselor_charts_are_conditional(self):
+        Appointment.objects.create(
+            student=self.student, counselor=self.counselor, date=timezone.localdate(),
+            time=time(9, 0), purpose='Consultation',
+        )
+        self.client.force_login(self.counselor.user)
+        url = reverse('counselor_chart_data', args=['monthly-sessions'])
+        etag = self.fetch(url)['ETag']
+        self.assertEqual(self.fetch(url, etag).status_code, 304)
+
+
+class DailySessionStatsTests(TestCase):
+    """The rollup follows session writes and rebuilds to match the table."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.counselor = create_counselor()
+        cls.student = create_student()
+
+    def create_session(self, status='scheduled'):
+        return GuidanceSession.objects.create(
+            student=self.student, counselor=self.counselor, session_type='Interview', status=status
+        )
+
+    def rollup(self):
+        rows = DailySessionStats.objects.filter(source='session', count__gt=0)
+        return {(row.session_type, row.status): row.count for row in rows}
+
+    def test_the_rollup_follows_session_writes(self):
+        session = self.create_session()
+        self.create_session(status='completed')
+        self.assertEqual(self.rollup(), {('Interview', 'scheduled'): 1, ('Interview', 'completed'): 1})
+
+        session.session_type = 'Referral'
+        session.status = 'completed'
+        session.save()
+        self.assertEqual(self.rollup(), {('Referral', 'completed'): 1, ('Interview', 'completed'): 1})
+
+        session.delete()
+        self.assertEqual(self.rollup(), {('Interview', 'completed'): 1})
+
+    def test_rebuild_reconciles_writes_that_skipped_the_signals(self):
+        for status in ['scheduled', 'scheduled', 'completed']:
+            self.create_session(status=status)
+        # QuerySet.update() sends no signals, so the rollup drifts
+        GuidanceSession.objects.filter(status='scheduled').update(status='cancelled')
+        self.assertEqual(self.rollup(), {('Interview', 'scheduled'): 2, ('Interview', 'completed'): 1})
+
+        call_command('rebuild_session_stats', stdout=StringIO())
+        self.assertEqual(self.rollup(), {('Interview', 'cancelled'): 2, ('Interview', 'completed'): 1})
+
+
+class RollupTransactionTests(TestCase):
+    """The rollup and counters move in the same transaction as the row."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.counselor = create_counselor()
+        cls.student = create_student()
+        cls.day = date(2026, 3, 2)
+
+    def create_appointment(self, status='pending'):
+        return Appointment.objects.create(
+            student=self.student, counselor=self.counselor, date=self.day,
+            time=time(9, 0), purpose='Consultation', status=status,
+        )
+
+    def rollup(self):
+        return dict(DailySessionStats.objects.filter(
+            source='appointment', day=self.day, count__gt=0,
+        ).values_list('status', 'count'))
+
+    def test_status_change_moves_the_rollup_and_counters(self):
+        appointment = self.create_appointment()
+        self.assertEqual(self.rollup(), {'pending': 1})
+        appointment.status = 'approved'
+        appointment.save()
+        self.assertEqual(self.rollup(), {'approved': 1})
+        self.counselor.refresh_from_db()
+        self.assertEqual(self.counselor.pending_appointment_count, 0)
+        appointment.delete()
+        self.assertEqual(self.rollup(), {})
+
+    def test_failed_rollup_update_rolls_back_the_insert(self):
+        with mock.patch('core.signals.move', side_effect=RuntimeError('rollup unavailable')):
+            with self.assertRaises(RuntimeError):
+                self.create_appointment()
+        self.assertFalse(Appointment.objects.exists())
+        self.assertEqual(self.rollup(), {})
+
+    def test_failed_counter_update_rolls_back_the_update(self):
+        appointment = self.create_appointment()
+        appointment.status = 'approved'
+        with mock.patch.dict('core.signals.COUNTER_UPDATES', {Appointment: mock.Mock(side_effect=RuntimeError)}):
+            with self.assertRaises(RuntimeError):
+                appointment.save()
+        self.assertEqual(Appointment.objects.get().status, 'pending')
+        self.assertEqual(self.rollup(), {'pending': 1})
+        self.counselor.refresh_from_db()
+        self.assertEqual(self.counselor.pending_appointment_count, 1)
+
+    def test_reconcile_repairs_drifted_counters(self):
+        self.create_appointment()
+        GuidanceSession.objects.create(
+            student=self.student, counselor=self.counselor, session_type='Interview', status='completed'
+        )
+        Student.objects.update(session_count=5, completed_session_count=0, pending_appointment_count=0)
+        self.assertEqual(reconcile_counters(), (1, 0))
+        self.assertEqual(reconcile_counters(), (0, 0))
+        self.student.refresh_from_db()
+        self.assertEqual(
+            (self.student.session_count, self.student.completed_session_count, self.student.pending_appointment_count),
+            (1, 1, 1),
+        )
+
+
+class CursorPaginatorTests(TestCase):
+    ordering = ('-date', '-time', '-id')
+
+    @classmethod
+    def setUpTestData(cls):
+        counselor = create_counselor()
+        student = create_student()
+        for day, hour in [(2, 9), (2, 10), (3, 9), (3, 10), (3, 11), (4, 9), (4, 10)]:
+            Appointment.objects.create(
+                student=student, counselor=counselor, date=date(2026, 3, day), time=time(hour, 0), purpose='Consultation'
+            )
+        cls.expected = list(Appointment.objects.order_by(*cls.ordering).values_list('id', flat=True))
+
+    def paginator(self):
+        return CursorPaginator(Appointment.objects.all(), self.ordering, 3)
+
+    def ids(self, page):
+        return [appointment.id for appointment in page]
+
+    def test_next_tokens_walk_every_row_once(self):
+        page = self.paginator().page()
+        pages = [self.ids(page)]
+        while page.has_next():
+            page = self.paginator().page(page.next_token)
+            pages.append(self.ids(page))
+        self.assertEqual(pages, [self.expected[:3], self.expected[3:6], self.expected[6:]])
+        self.assertTrue(page.has_previous())
+
+    def test_previous_tokens_walk_back(self):
+        second = self.paginator().page(self.paginator().page().next_token)
+        third = self.paginator().page(second.next_token)
+        self.assertEqual(self.ids(self.paginator().page(third.previous_token)), self.expected[3:6])
+        first = self.paginator().page(second.previous_token)
+        self.assertEqual(self.ids(first), self.expected[:3])
+        self.assertFalse(first.has_previous())
+
+    def test_ordering_by_related_and_annotated_fields(self):
+        names = [('Reyes', 'Ana'), ('Cruz', 'Luis'), ('Cruz', 'Ben'), ('Abad', 'Zoe'), ('Santos', 'Mia')]
+        for i, (last_name, first_name) in enumerate(names):
+            create_student(f'named{i}', first_name=first_name, last_name=last_name)
+        students = Student.objects.select_related('user')
+        for queryset, ordering in [
+            (students, ('user__last_name', 'user__first_name', 'id')),
+            (students.annotate(last=F('user__last_name'), first=F('user__first_name')), ('last', 'first', 'id')),
+        ]:
+            paginator = CursorPaginator(queryset, ordering, 2)
+            page, names_seen = paginator.page(), []
+            while True:
+                names_seen += [(s.user.last_name, s.user.first_name) for s in page]
+                if not page.has_next():
+                    break
+                page = paginator.page(page.next_token)
+            # The fixture's own student has no name and sorts first
+            self.assertEqual(names_seen, [('', '')] + sorted(names), ordering)
+
+    def test_bad_tokens_serve_the_first_page(self):
+        token = self.paginator().page().next_token
+        payload, signature = token.rsplit(':', 1)
+        bad_tokens = [
+            'garbage',
+            # The signature no longer matches the payload
+            f"{payload}:{signature[::-1]}",
+            # Signed for another purpose
+            signing.dumps(['next', ['2026-03-03', '09:00:00', '1']], salt='elsewhere'),
+            # Correctly signed, but not a cursor for this ordering
+            signing.dumps(['next', ['2026-03-03']], salt=CURSOR_SALT, compress=True),
+            signing.dumps(['sideways', ['2026-03-03', '09:00:00', '1']], salt=CURSOR_SALT, compress=True),
+        ]
+        for bad in bad_tokens:
+            page = self.paginator().page(bad)
+            self.assertEqual(self.ids(page), self.expected[:3], bad)
+            self.assertFalse(page.has_previous())
+
+
+class AppointmentListViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.counselor = create_counselor()
+
+    def view(self, **params):
+        view = AppointmentListView()
+        view.setup(RequestFactory().get('/', params))
+        return view
+
+    def test_invalid_dates_are_ignored(self):
+        for value in ['2026-02-30', 'yesterday']:
+            view = self.view(date_from=value, date_to=value)
+            self.assertEqual(list(view.get_queryset()), [])
+            self.assertEqual(view.estimate_count(), 0)
+
+    def test_valid_dates_narrow_the_estimate(self):
+        for day, count in [(date(2026, 3, 2), 3), (date(2026, 3, 9), 2)]:
+            DailySessionStats.objects.create(
+                source='appointment', day=day, counselor=self.counselor, status='pending', count=count
+            )
+        self.assertEqual(self.view(date_from='2026-03-03').estimate_count(), 2)
+        self.assertEqual(self.view(date_to='2026-03-03').estimate_count(), 3)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Checks SQLite query plans')
+class QueryPlanTests(TestCase):
+    """The hot queries should be answered from an index, not a table scan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.counselor = create_counselor()
+        cls.student = create_student()
+        cls.today = timezone.now().date()
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(f'USING INDEX {index_name}', plan.replace('COVERING INDEX', 'INDEX'))
+        self.assertNotIn(f'SCAN {queryset.model._meta.db_table}', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_double_booking_check(self):
+        self.assertUsesIndex(
+            Appointment.objects.filter(
+                counselor=self.counselor, date=self.today, time=time(9, 0),
+                status__in=['pending', 'approved'],
+            ),
+            'appointment_counselor_date_idx',
+        )
+
+    def test_counselor_appointments_by_status(self):
+        self.assertUsesIndex(
+            Appointment.objects.filter(counselor=self.counselor, status='pending'),
+            'appointment_counsel_status_idx',
+        )
+
+    def test_counselor_appointment_list(self):
+        self.assertUsesIndex(
+            Appointment.objects.filter(counselor=self.counselor).order_by('-date', '-time', '-id'),
+            'appointment_counselor_date_idx',
+        )
+
+    def test_student_upcoming_appointments(self):
+        self.assertUsesIndex(
+            Appointment.objects.filter(student=self.student, date__gte=self.today).order_by('date', 'time'),
+            'appointment_student_date_idx',
+        )
+
+    def test_student_session_history(self):
+        self.assertUsesIndex(
+            GuidanceSession.objects.filter(student=self.student).order_by('-date'),
+            'session_student_date_idx',
+        )
+        self.assertUsesIndex(
+            GuidanceSession.objects.filter(student=self.student).order_by('-created_at', '-id'),
+            'session_student_created_idx',
+        )
+
+    def test_counselor_session_history(self):
+        self.assertUsesIndex(
+            GuidanceSession.objects.filter(counselor=self.counselor).order_by('-date'),
+            'session_counselor_date_idx',
+        )
+        self.assertUsesIndex(
+            GuidanceSession.objects.filter(counselor=self.counselor).order_by('-created_at', '-id'),
+            'session_counsel_created_idx',
+        )
+
+    def test_registration_email_lookup(self):
+        self.assertUsesIndex(User.objects.filter(email='student@example.com'), 'user_email_idx')
+
+
+class ReportPagesTests(TransactionTestCase):
+    """The staff report pages render with the shared sidebar."""
+
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', role='admin', is_staff=True, approval_status='approved')
+        self.report = Report.objects.create(
+            name='Sessions', report_type='session_analytics', format='csv', generated_by=self.admin
+        )
+        self.client.force_login(self.admin)
+
+    def test_reports_dashboard_renders(self):
+        response = self.client.get('/reports/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '/admin-panel/appointments/?status=pending')
+
+    def test_report_page_renders(self):
+        response = self.client.get(f'/reports/{self.report.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.report.name)
+
+    def test_generate_report_rejects_unsupported_choices(self):
+        for report_type, date_range in [('attendance', 'this_month'), ('session_analytics', 'last_30_days')]:
+            response = self.client.post(reverse('generate_report'), {
+                'report_type': report_type, 'date_range': date_range, 'format': 'csv',
+            })
+            self.assertRedirects(response, reverse('reports_dashboard'), fetch_redirect_response=False)
+        self.assertEqual(Report.objects.count(), 1)
+        self.assertFalse(ReportJob.objects.exists())
+
+
+class ImmediateExecutor:
+    """Stands in for the worker's process pool, running each job on submit."""
+
+    def __init__(self, max_workers=None, initializer=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class ReportJobTests(TestCase):
+    """Queued report jobs are claimed, rendered and finished or failed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', role='admin', is_staff=True, approval_status='approved')
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(self.settings(MEDIA_ROOT=media_root.name))
+
+    def queue(self, *formats):
+        reports = [
+            Report.objects.create(
+                name='Cases', report_type='case_management', format=format, generated_by=self.admin,
+                start_date=date(2026, 3, 1), end_date=date(2026, 3, 31), status='queued',
+            )
+            for format in formats
+        ]
+        return enqueue_reports(reports), reports
+
+    def statuses(self, reports):
+        return [Report.objects.get(pk=report.pk).status for report in reports]
+
+    def test_claim_and_run_completes_every_format(self):
+        job, reports = self.queue('csv', 'excel', 'pdf')
+        self.assertEqual(claim_job(), job.id)
+        self.assertIsNone(claim_job())
+        self.assertEqual(run_job(job.id), job.id)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('completed', 1))
+        self.assertEqual(self.statuses(reports), ['completed'] * 3)
+        self.assertTrue(all(Report.objects.get(pk=report.pk).file for report in reports))
+
+    def test_a_rendering_error_fails_the_job(self):
+        job, reports = self.queue('csv')
+        claim_job()
+        with mock.patch('core.report_jobs.generate_report_files', side_effect=RuntimeError('disk full')):
+            run_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('disk full', job.error)
+        self.assertEqual(self.statuses(reports), ['failed'])
+
+    def test_an_error_loading_the_job_fails_it(self):
+        job, reports = self.queue('csv')
+        claim_job()
+        with mock.patch.object(ReportJob.objects, 'get', side_effect=RuntimeError('connection lost')):
+            run_job(job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(self.statuses(reports), ['failed'])
+
+    def test_requeue_stale_jobs(self):
+        retry, retry_reports = self.queue('csv')
+        exhausted, exhausted_reports = self.queue('csv')
+        fresh, _ = self.queue('csv')
+        for _ in range(3):
+            claim_job()
+        Report.objects.update(status='running')
+        long_ago = timezone.now() - timedelta(hours=2)
+        ReportJob.objects.filter(pk__in=[retry.pk, exhausted.pk]).update(started_at=long_ago)
+        ReportJob.objects.filter(pk=exhausted.pk).update(attempts=3)
+
+        self.assertEqual(requeue_stale_jobs(), (1, 1))
+        self.assertEqual(
+            dict(ReportJob.objects.values_list('pk', 'status')),
+            {retry.pk: 'queued', exhausted.pk: 'failed', fresh.pk: 'running'},
+        )
+        self.assertEqual(self.statuses(retry_reports), ['queued'])
+        self.assertEqual(self.statuses(exhausted_reports), ['failed'])
+        self.assertEqual(claim_job(), retry.pk)
+
+    def test_the_worker_survives_a_failed_job(self):
+        crashing, crashing_reports = self.queue('csv')
+        healthy, healthy_reports = self.queue('csv')
+
+        def crash_first(job_id):
+            if job_id == crashing.id:
+                raise RuntimeError('worker process died')
+            return run_job(job_id)
+
+        with mock.patch('core.management.commands.run_report_worker.ProcessPoolExecutor', ImmediateExecutor), \
+                mock.patch('core.management.commands.run_report_worker.run_job', crash_first):
+            call_command('run_report_worker', '--once', '--processes=1', stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(self.statuses(crashing_reports), ['failed'])
+        self.assertEqual(self.statuses(healthy_reports), ['completed'])
+        self.assertEqual(ReportJob.objects.get(pk=crashing.pk).status, 'failed')
+
+
+class ReportCacheTests(TestCase):
+    """Identical report requests share a file until the data behind it changes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', role='admin', is_staff=True, approval_status='approved')
+        cls.counselor = create_counselor()
+        cls.student = create_student()
+        cls.session = GuidanceSession.objects.create(
+            student=cls.student, counselor=cls.counselor, session_type='Interview', status='completed'
+        )
+        cls.followup = FollowUp.objects.create(session=cls.session, followup_date=date(2026, 3, 9))
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def request_report(self, report_type='case_management', format='csv'):
+        self.client.post(reverse('generate_report'), {
+            'report_type': report_type, 'date_range': 'this_year', 'format': format,
+        })
+        return Report.objects.count()
+
+    def test_an_unchanged_report_is_reused(self):
+        self.assertEqual(self.request_report(), 1)
+        self.assertEqual(self.request_report(), 1)
+        self.assertEqual(ReportJob.objects.count(), 1)
+
+    def test_different_parameters_get_their_own_report(self):
+        self.request_report()
+        self.assertEqual(self.request_report(format='pdf'), 2)
+        self.assertEqual(self.request_report(report_type='student_summary'), 3)
+
+    def cached_report(self, name, content, age):
+        report = Report(
+            name=name, report_type='case_management', format='csv', generated_by=self.admin, fingerprint=name,
+        )
+        report.file.save(f'{name}.csv', ContentFile(content))
+        Report.objects.filter(pk=report.pk).update(generated_at=timezone.now() - age)
+        return report
+
+    def test_eviction_keeps_the_report_history(self):
+        with tempfile.TemporaryDirectory() as media_root, self.settings(MEDIA_ROOT=media_root):
+            old = self.cached_report('old', b'a,b\n', timedelta(hours=30))
+            large = self.cached_report('large', b'x' * 100, timedelta(hours=2))
+            recent = self.cached_report('recent', b'x' * 100, timedelta(hours=1))
+            old_path = old.file.path
+
+            self.assertEqual(evict_reports(max_bytes=150), 2)
+            self.assertEqual(Report.objects.count(), 3)
+            for report in (old, large):
+                report.refresh_from_db()
+                self.assertEqual((report.fingerprint, report.file.name), ('', ''))
+            self.assertFalse(os.path.exists(old_path))
+            recent.refresh_from_db()
+            self.assertEqual(recent.fingerprint, 'recent')
+            self.assertTrue(os.path.exists(recent.file.path))
+
+            response = self.client.get(reverse('download_report', args=[old.id]))
+            self.assertRedirects(response, reverse('view_report', args=[old.id]), fetch_redirect_response=False)
+
+    def test_changes_to_any_source_table_invalidate(self):
+        def rename_student():
+            self.student.user.first_name = 'Juan'
+            self.student.user.save()
+
+        def change_course():
+            self.student.course = 'BSCS'
+            self.student.save()
+
+        def complete_followup():
+            self.followup.completed = True
+            self.followup.save()
+
+        def cancel_session():
+            self.session.status = 'cancelled'
+            self.session.save()
+
+        def delete_followup():
+            FollowUp.objects.all().delete()
+
+        expected = self.request_report()
+        for change in [rename_student, change_course, complete_followup, cancel_session, delete_followup]:
+            change()
+            expected += 1
+            self.assertEqual(self.request_report(), expected, change.__name__)
+
+
+# route in core/urls.py: (who requests it, most queries it may run). Every
+# route must appear here or in UNBUDGETED.
+QUERY_BUDGETS = {
+    '': ('student', 5),
+    'login/': ('student', 5),
+    'logout/': ('student', 4),
+    'register/': ('student', 5),
+    'student/dashboard/': ('student', 11),
+    'student/appointments/': ('student', 11),
+    'student/sessions/history/': ('student', 11),
+    'student/counselors/': ('student', 8),
+    'student/appointments/request/': ('student', 8),
+    'student/profile/': ('student', 7),
+    'student/counselor/<int:counselor_id>/profile/': ('student', 8),
+    'student/counselor/<int:counselor_id>/availability/': ('student', 7),
+    'counselor/dashboard/': ('counselor', 11),
+    'counselor/appointments/': ('counselor', 8),
+    'counselor/students/': ('counselor', 7),
+    'counselor/students/typeahead/': ('counselor', 5),
+    'counselor/sessions/history/': ('counselor', 7),
+    'counselor/reports/': ('counselor', 9),
+    'counselor/reports/charts/<slug:chart>/': ('counselor', 7),
+    'counselor/student/<int:student_id>/': ('counselor', 7),
+    'counselor/profile/': ('counselor', 6),
+    'counselor/interview/<int:interview_id>/': ('counselor', 8),
+    'counselor/interview/<int:interview_id>/view/': ('counselor', 8),
+    'interview/<int:interview_id>/': ('counselor', 8),
+    'admin-panel/dashboard/': ('admin', 8),
+    'admin-panel/dashboard/cache-stats/': ('admin', 5),
+    'admin-panel/users/': ('admin', 6),
+    'admin-panel/users/add/': ('admin', 5),
+    'admin-panel/users/<int:user_id>/edit/': ('admin', 6),
+    'admin-panel/users/<int:user_id>/delete/': ('admin', 6),
+    'admin-panel/counselors/': ('admin', 6),
+    'admin-panel/appointments/': ('admin', 6),
+    'reports/': ('admin', 9),
+    'reports/charts/<slug:chart>/': ('admin', 7),
+    'search/': ('admin', 5),
+    'reports/<int:report_id>/': ('admin', 5),
+    'reports/<int:report_id>/status/': ('admin', 6),
+    'reports/<int:report_id>/download/': ('admin', 6),
+    'reports/export/csv/': ('admin', 5),
+    'reports/export/excel/': ('admin', 6),
+    'reports/export/pdf/': ('admin', 6),
+}
+
+# Routes that are not measured, and why
+UNBUDGETED = {
+    'dashboard/': 'renders dashboard.html, which does not exist',
+    'schedule-session/': "its template reverses the unrouted 'appointment_list'",
+    'student/interviews/': 'renders student/interview_forms.html, which does not exist',
+    'student/appointments/<int:appointment_id>/cancel/': 'changes data on every request',
+    'counselor/appointments/<int:appointment_id>/approve/': 'changes data on every request',
+    'counselor/appointments/<int:appointment_id>/decline/': 'changes data on every request',
+    'counselor/appointments/<int:appointment_id>/start-session/': 'changes data on every request',
+    'admin-panel/users/<int:user_id>/approve/': 'changes data on every request',
+    'admin-panel/users/<int:user_id>/reject/': 'changes data on every request',
+    'admin-panel/students/': "its template reverses the unrouted 'view_interview_form'",
+    'admin-panel/reports/': "its template reverses the unrouted 'generate_sessions_report'",
+    'admin-panel/settings/': 'renders admin/settings.html, which does not exist',
+    'reports/generate/': 'POST only; a GET redirects without querying',
+    'interview/<int:session_id>/view/': 'renders counselor/completed_interview_view.html, which does not exist',
+}
+
+
+class QueryBudgetTests(QueryBudgetMixin, TransactionTestCase):
+    """
+    Every page must stay within its query budget, and the count must not
+    grow with the data. A TransactionTestCase, because the dashboards run
+    their queries on other threads, which cannot read inside an open
+    test transaction.
+    """
+
+    def setUp(self):
+        self.counselor = create_counselor(approval_status='approved')
+        self.users = {
+            'admin': User.objects.create_user('admin', role='admin', is_staff=True, approval_status='approved'),
+            'counselor': self.counselor.user,
+        }
+        self.added = 0
+        self.add_students(2)
+        student = Student.objects.order_by('id').first()
+        self.users['student'] = student.user
+        report = Report.objects.create(
+            name='Sessions', report_type='session_analytics', format='csv', generated_by=self.users['admin']
+        )
+        self.url_kwargs = {
+            'appointment_id': Appointment.objects.filter(student=student).first().id,
+            'counselor_id': self.counselor.id,
+            'student_id': student.id,
+            'interview_id': Interview.objects.filter(student=student).first().id,
+            'session_id': GuidanceSession.objects.filter(student=student).first().id,
+            'user_id': student.user.id,
+            'report_id': report.id,
+            'chart': 'session-types',
+        }
+
+    def add_students(self, count):
+        """Adds ``count`` students, each with an appointment, a session and an interview."""
+        today = timezone.now().date()
+        for _ in range(count):
+            self.added += 1
+            n = self.added
+            student = create_student(
+                f'student{n}', course=f'Course{n % 3}', year=1 + n % 4,
+                first_name=f'Student{n}', last_name='Test', approval_status='approved',
+            )
+            appointment = Appointment.objects.create(
+                student=student, counselor=self.counselor, date=today + timedelta(days=n % 5 - 2),
+                time=time(8 + n % 9, 0), purpose='Consultation', status=['pending', 'approved'][n % 2],
+            )
+            session = GuidanceSession.objects.create(
+                student=student, counselor=self.counselor, session_type='Interview',
+                status='completed', appointment=appointment,
+            )
+            Interview.objects.create(
+                session=session, student=student, counselor=self.counselor, address='Address',
+                contact_number='0900', birth_date=date(2000, 1, 1), birth_place='City', age=20,
+                civil_status='single', religion='None', parents_marital_status='married',
+                elementary_school='School', elementary_year_graduated='2012', high_school='School',
+                high_school_year_graduated='2018', reason_for_interview='Referral',
+                presenting_problem='Stress', background_of_problem='Exams',
+            )
+
+    def url(self, route):
+        return '/' + re.sub(r'<(?:\w+:)?(\w+)>', lambda match: str(self.url_kwargs[match.group(1)]), route)
+
+    def measure(self):
+        counts = {}
+        for route, (role, budget) in QUERY_BUDGETS.items():
+            with self.subTest(route=route, students=self.added):
+                self.client.force_login(self.users[role])
+                with QueryRecorder() as recorder:
+                    response = self.assertQueryBudget(budget, self.client.get, self.url(route))
+                self.assertLess(response.status_code, 500)
+                counts[route] = recorder.count
+        return counts
+
+    def test_every_route_has_a_budget(self):
+        routes = {str(pattern.pattern) for pattern in urlpatterns}
+        self.assertEqual(routes - set(QUERY_BUDGETS) - set(UNBUDGETED), set())
+        self.assertEqual((set(QUERY_BUDGETS) | set(UNBUDGETED)) - routes, set())
+
+    def test_counselor_student_pages_render(self):
+        self.client.force_login(self.users['counselor'])
+        response = self.client.get('/counselor/students/')
+        self.assertContains(response, 'studentSuggestions')
+        self.assertContains(response, 'Student1')
+        response = self.client.get(self.url('counselor/student/<int:student_id>/'))
+        self.assertContains(response, f'student={self.url_kwargs["student_id"]}')
+
+    def test_queries_do_not_grow_with_the_data(self):
+        before = self.measure()
+        self.add_students(15)
+        after = self.measure()
+        for route, count in after.items():
+            with self.subTest(route=route):
+                self.assertLessEqual(count, before[route])
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Uses the SQLite FTS5 index')
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.counselor = create_counselor(first_name='Maria', last_name='Santos')
+        cls.student = create_student(first_name='Juan', last_name='Cruz')
+
+    def create_appointment(self, purpose):
+        return Appointment.objects.create(
+            student=self.student, counselor=self.counselor, date=date(2026, 3, 2),
+            time=time(9, 0), purpose=purpose,
+        )
+
+    def test_snippets_escape_the_stored_text(self):
+        appointment = self.create_appointment('<script>alert(1)</script> exam anxiety')
+        [hit] = search('anxiety', kinds=['appointment'])
+        self.assertEqual(hit.object_id, appointment.id)
+        self.assertIn('&lt;script&gt;', hit.snippet)
+        self.assertNotIn('<script>', hit.snippet)
+        self.assertIn('<mark>anxiety</mark>', hit.snippet)
+
+    def hits(self, query, kind='appointment'):
+        return [hit.object_id for hit in search(query, kinds=[kind])]
+
+    def test_saving_indexes_the_new_text(self):
+        appointment = self.create_appointment('exam anxiety')
+        self.assertEqual(self.hits('anxiety'), [appointment.id])
+        appointment.purpose = 'career planning'
+        appointment.save()
+        self.assertEqual(self.hits('anxiety'), [])
+        self.assertEqual(self.hits('career'), [appointment.id])
+        self.assertEqual(self.hits('juan cru'), [appointment.id])
+
+    def test_renaming_a_user_reindexes_their_records(self):
+        appointment = self.create_appointment('exam anxiety')
+        user = self.student.user
+        user.last_name = 'Reyes'
+        user.save()
+        self.assertEqual(self.hits('cruz'), [])
+        self.assertEqual(self.hits('reyes'), [appointment.id])
+        self.assertEqual(self.hits('reyes', kind='student'), [self.student.id])
+
+    def test_the_migration_indexes_existing_rows(self):
+        appointment = self.create_appointment('exam anxiety')
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM core_search_index')
+        migration = import_module('core.migrations.0015_backfill_search_index')
+        # The backfill only reads the connection off the schema editor
+        migration.backfill_search_index(apps, SimpleNamespace(connection=connection))
+        self.assertEqual(self.hits('anxiety'), [appointment.id])
+        self.assertEqual(self.hits('cruz', kind='student'), [self.student.id])
+        self.assertEqual(self.hits('santos', kind='counselor'), [self.counselor.id])
+
+    def test_deleting_removes_the_row(self):
+        appointment = self.create_appointment('exam anxiety')
+        appointment.delete()
+        self.assertEqual(self.hits('anxiety'), [])
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM core_search_index WHERE kind = %s', ['appointment'])
+            self.assertEqual(cursor.fetchone(), (0,))
+
+
+class NameIndexTests(TestCase):
+    def test_a_rename_reaches_workers_with_their_own_cache(self):
+        student = create_student('jcruz', first_name='Juan', last_name='Cruz')
+        user = student.user
+        self.assertEqual([row['id'] for row in typeahead('juan')], [student.id])
+        user.first_name = 'Pedro'
+        user.save()
+        # Another worker's cache never saw the rename's bump
+        cache.clear()
+        self.assertEqual(typeahead('juan'), [])
+        self.assertEqual([row['name'] for row in typeahead('pedro')], ['Pedro Cruz'])
+
+    def test_counselors_find_students_by_name_or_email(self):
+        user = create_student('jcruz', first_name='Juan', last_name='Cruz', email='jc@school.edu').user
+        self.client.force_login(create_counselor().user)
+        for search in ['cru', 'school.edu']:
+            response = self.client.get(reverse('counselor_student_list'), {'search': search})
+            self.assertEqual([student.user for student in response.context['students']], [user], search)
+
+
+class CounselorStudentListTests(TestCase):
+    @mock.patch('core.counselor_views.STUDENTS_PER_PAGE', 2)
+    def test_students_are_listed_by_name_across_pages(self):
+        for i, (last_name, first_name) in enumerate([('Reyes', 'Ana'), ('Cruz', 'Luis'), ('Cruz', 'Ben'), ('Abad', 'Zoe')]):
+            create_student(f'student{i}', first_name=first_name, last_name=last_name)
+        self.client.force_login(create_counselor().user)
+        url, names = reverse('counselor_student_list'), []
+        response = self.client.get(url)
+        while True:
+            page = response.context['students']
+            names += [student.user.get_full_name() for student in page]
+            if not page.has_next():
+                break
+            response = self.client.get(url, {'cursor': page.next_token})
+        self.assertEqual(names, ['Zoe Abad', 'Ben Cruz', 'Luis Cruz', 'Ana Reyes'])
+
+
+class StudentAppointmentListTests(TestCase):
+    def test_upcoming_appointments_are_paged(self):
+        counselor = create_counselor()
+        student = create_student(approval_status='approved')
+        user = student.user
+        day = timezone.now().date() + timedelta(days=1)
+        for slot in SLOT_TIMES[:12]:
+            Appointment.objects.create(student=student, counselor=counselor, date=day, time=slot, purpose='Consultation')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('student_appointment_list'))
+        first = response.context['upcoming_appointments']
+        self.assertEqual(response.context['upcoming_count'], 12)
+        self.assertEqual([a.time for a in first], list(SLOT_TIMES[:10]))
+        self.assertContains(response, '?upcoming=')
+
+        response = self.client.get(reverse('student_appointment_list'), {'upcoming': first.next_token})
+        self.assertEqual([a.time for a in response.context['upcoming_appointments']], list(SLOT_TIMES[10:12]))
+
+
+class BookingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.counselor = create_counselor()
+        cls.students = [create_student(f'student{i}') for i in range(2)]
+        cls.day = timezone.now().date() + timedelta(days=1)
+
+    def book(self, student):
+        return book_appointment(student, self.counselor, self.day, time(10, 0), 'Consultation')
+
+    def test_an_active_slot_cannot_be_booked_twice(self):
+        self.book(self.students[0])
+        with self.assertRaises(SlotTaken):
+            self.book(self.students[1])
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_the_database_refuses_a_double_booking(self):
+        self.book(self.students[0])
+        with self.assertRaises(IntegrityError):
+            Appointment.objects.create(
+                student=self.students[1], counselor=self.counselor, date=self.day,
+                time=time(10, 0), purpose='Consultation', status='approved',
+            )
+
+    def test_a_declined_appointment_frees_its_slot(self):
+        appointment = self.book(self.students[0])
+        appointment.status = 'declined'
+        appointment.save()
+        self.assertEqual(self.book(self.students[1]).student, self.students[1])
+
+    def test_the_form_accepts_only_calendar_slots(self):
+        def form(slot):
+            return AppointmentForm(data={
+                'counselor': self.counselor.id, 'date': self.day, 'time': slot, 'purpose': 'Consultation',
+            })
+        self.assertTrue(form('09:00').is_valid())
+        self.assertTrue(form('16:00').is_valid())
+        for slot in ['08:00', '09:15', '09:30', '12:00', '12:30', '16:30', '17:00']:
+            self.assertFalse(form(slot).is_valid(), slot)
+
+    def test_approving_a_declined_appointment_whose_slot_was_rebooked(self):
+        appointment = self.book(self.students[0])
+        appointment.status = 'declined'
+        appointment.save()
+        self.book(self.students[1])
+        self.client.force_login(self.counselor.user)
+        response = self.client.get(reverse('approve_appointment', args=[appointment.id]))
+        self.assertRedirects(response, reverse('counselor_appointment_list'), fetch_redirect_response=False)
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.status, 'declined')
+
+    def test_approving_a_pending_appointment(self):
+        appointment = self.book(self.students[0])
+        self.client.force_login(self.counselor.user)
+        self.client.get(reverse('approve_appointment', args=[appointment.id]))
+        appointment.refresh_from_db()
+        self.assertEqual(appointment.status, 'approved')
+
+
+class AvailabilityTests(TestCase):
+    """The slot bitmap follows bookings and answers the free-slot API."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.counselor = create_counselor()
+        cls.student = create_student(approval_status='approved')
+        cls.day = timezone.localdate() + timedelta(days=1)
+
+    def booked(self):
+        row = CounselorAvailability.objects.filter(counselor=self.counselor, day=self.day).first()
+        return [slot for index, slot in enumerate(SLOT_TIMES) if row and row.booked & (1 << index)]
+
+    def book(self, slot):
+        return Appointment.objects.create(
+            student=self.student, counselor=self.counselor, date=self.day, time=slot, purpose='Consultation'
+        )
+
+    def test_the_bitmap_follows_each_status_change(self):
+        first = self.book(time(9, 30))
+        second = self.book(time(14, 0))
+        self.assertEqual(self.booked(), [time(9, 30), time(14, 0)])
+
+        self.client.force_login(self.counselor.user)
+        self.client.get(reverse('approve_appointment', args=[first.id]))
+        self.assertEqual(self.booked(), [time(9, 30), time(14, 0)])
+        self.client.get(reverse('decline_appointment', args=[first.id]))
+        self.assertEqual(self.booked(), [time(14, 0)])
+
+        second.time = time(15, 30)
+        second.save()
+        self.assertEqual(self.booked(), [time(15, 30)])
+
+        self.client.force_login(self.student.user)
+        self.client.post(reverse('cancel_appointment', args=[second.id]))
+        self.assertEqual(self.booked(), [])
+        self.assertFalse(CounselorAvailability.objects.exists())
+
+    def test_the_slot_migration_recomputes_what_it_declines(self):
+        kept = self.book(time(9, 30))
+        extra = self.book(time(10, 0))
+        # Stand in for a double booking: the migration declines with
+        # update(), which sends no signals, so these rows go stale.
+        Appointment.objects.filter(pk=extra.pk).update(time=time(9, 30), status='declined')
+        self.assertEqual(self.booked(), [time(9, 30), time(10, 0)])
+
+        migration = import_module('core.migrations.0011_active_appointment_slot_unique')
+        migration._refresh_derived_rows(apps, [Appointment.objects.get(pk=extra.pk)])
+        self.assertEqual(self.booked(), [time(9, 30)])
+        self.assertEqual(
+            dict(DailySessionStats.objects.filter(
+                source='appointment', counselor=self.counselor, day=self.day,
+            ).values_list('status', 'count')),
+            {'pending': 1, 'declined': 1},
+        )
+        self.student.refresh_from_db()
+        self.counselor.refresh_from_db()
+        self.assertEqual(self.student.pending_appointment_count, 1)
+        self.assertEqual(self.counselor.pending_appointment_count, 1)
+        self.assertEqual(kept.status, 'pending')
+
+    def availability(self, **params):
+        return self.client.get(reverse('counselor_availability', args=[self.counselor.id]), params)
+
+    def test_the_api_lists_free_office_hours(self):
+        self.book(time(10, 0))
+        self.client.force_login(self.student.user)
+        response = self.availability(start=self.day.isoformat(), end=self.day.isoformat())
+        self.assertEqual(response.status_code, 200)
+        [day] = response.json()['days']
+        self.assertEqual(day['date'], self.day.isoformat())
+        self.assertEqual(day['free'], ['09:00', '11:00', '13:00', '14:00', '15:00', '16:00'])
+
+    def test_the_api_validates_the_range(self):
+        self.client.force_login(self.student.user)
+        too_long = self.day + timedelta(days=AVAILABILITY_MAX_DAYS)
+        for params in [
+            {'start': self.day.isoformat(), 'end': (self.day - timedelta(days=1)).isoformat()},
+            {'start': self.day.isoformat(), 'end': too_long.isoformat()},
+            {'start': '2026-02-30'},
+            {'end': '2020-01-01'},
+        ]:
+            self.assertEqual(self.availability(**params).status_code, 400, params)
+        last = self.day + timedelta(days=AVAILABILITY_MAX_DAYS - 1)
+        response = self.availability(start=self.day.isoformat(), end=last.isoformat())
+        self.assertEqual(len(response.json()['days']), AVAILABILITY_MAX_DAYS)
+
+
+def _book_in_child(database, barrier, results, student_id, counselor_id, day, slot):
+    # Runs in a forked process: leave the parent's in-memory test database
+    # behind and open the on-disk copy, as a separate server process would.
+    settings_dict = connections['default'].settings_dict
+    connections['default'] = connections['default'].__class__(
+        {**settings_dict, 'NAME': database, 'OPTIONS': {**settings_dict['OPTIONS'], 'timeout': 30}}, 'default'
+    )
+    student = Student.objects.get(pk=student_id)
+    counselor = Counselor.objects.get(pk=counselor_id)
+    barrier.wait()
+    try:
+        book_appointment(student, counselor, day, slot, 'Exam stress')
+        results.put('booked')
+    except SlotTaken:
+        results.put('taken')
+    except Exception as error:
+        results.put(repr(error))
+
+
+@skipUnless(
+    connection.vendor == 'sqlite' and 'fork' in multiprocessing.get_all_start_methods(),
+    'Copies the SQLite test database to disk and forks workers',
+)
+class BookingRaceTests(TransactionTestCase):
+    """Processes that all book the same slot at once: exactly one may win."""
+    CONTENDERS = 8
+
+    def setUp(self):
+        self.counselor = create_counselor()
+        self.students = [create_student(f'student{i}') for i in range(self.CONTENDERS)]
+
+    def test_exactly_one_concurrent_booking_wins(self):
+        day, slot = timezone.now().date() + timedelta(days=1), time(10, 0)
+        with tempfile.TemporaryDirectory() as directory:
+            database = os.path.join(directory, 'booking_race.sqlite3')
+            connection.ensure_connection()
+            with closing(sqlite3.connect(database)) as copy:
+                connection.connection.backup(copy)
+
+            context = multiprocessing.get_context('fork')
+            barrier, results = context.Barrier(self.CONTENDERS), context.Queue()
+            processes = [
+                context.Process(target=_book_in_child, args=(
+                    database, barrier, results, student.pk, self.counselor.pk, day, slot,
+                ))
+                for student in self.students
+            ]
+            for process in processes:
+                process.start()
+            outcomes = sorted(results.get(timeout=60) for _ in processes)
+            for process in processes:
+                process.join(timeout=60)
+
+            with closing(sqlite3.connect(database)) as copy:
+                (active,), = copy.execute(
+                    'SELECT COUNT(*) FROM core_appointment WHERE counselor_id = ? AND date = ? '
+                    "AND time = ? AND status IN ('pending', 'approved')",
+                    (self.counselor.pk, day.isoformat(), slot.isoformat()),
+                ).fetchall()
+
+        self.assertEqual(outcomes, ['booked'] + ['taken'] * (self.CONTENDERS - 1))
+        self.assertEqual(active, 1)
@@ -20,13 +20,16 @@ urlpatterns = [
     path('student/appointments/<int:appointment_id>/cancel/', student_views.cancel_appointment, name='cancel_appointment'),
     path('student/profile/', student_views.student_profile, name='student_profile'),
     path('student/counselor/<int:counselor_id>/profile/', views.counselor_profile, name='counselor_profile'),
+    path('student/counselor/<int:counselor_id>/availability/', student_views.counselor_availability, name='counselor_availability'),
 
     # Counselor URLs
     path('counselor/dashboard/', counselor_views.counselor_dashboard, name='counselor_dashboard'),
     path('counselor/appointments/', counselor_views.counselor_appointment_list, name='counselor_appointment_list'),
     path('counselor/students/', counselor_views.counselor_student_list, name='counselor_student_list'),
+    path('counselor/students/typeahead/', counselor_views.student_typeahead, name='student_typeahead'),
     path('counselor/sessions/history/', counselor_views.counselor_session_history, name='counselor_session_history'),
     path('counselor/reports/', counselor_views.counselor_reports_dashboard, name='counselor_reports_dashboard'),
+    path('counselor/reports/charts/<slug:chart>/', counselor_views.counselor_chart_data, name='counselor_chart_data'),
     path('counselor/appointments/<int:appointment_id>/approve/', counselor_views.approve_appointment, name='approve_appointment'),
     path('counselor/appointments/<int:appointment_id>/decline/', counselor_views.decline_appointment, name='decline_appointment'),
     path('counselor/appointments/<int:appointment_id>/start-session/', counselor_views.start_session, name='start_session'),
@@ -40,17 +43,31 @@ urlpatterns = [
 
     # Admin URLs
     path('admin-panel/dashboard/', admin_views.admin_dashboard, name='admin_dashboard'),
+    path('admin-panel/dashboard/cache-stats/', admin_views.admin_dashboard_cache_stats, name='admin_dashboard_cache_stats'),
     path('admin-panel/users/', admin_views.admin_users, name='admin_users'),
     path('admin-panel/users/add/', admin_views.admin_add_user, name='admin_add_user'),
     path('admin-panel/users/<int:user_id>/edit/', admin_views.admin_edit_user, name='admin_edit_user'),
     path('admin-panel/users/<int:user_id>/delete/', admin_views.admin_delete_user, name='admin_delete_user'),
     path('admin-panel/users/<int:user_id>/approve/', admin_views.admin_approve_user, name='admin_approve_user'),
+    path('admin-panel/users/<int:user_id>/reject/', admin_views.admin_reject_user, name='admin_reject_user'),
     path('admin-panel/students/', admin_views.admin_students, name='admin_students'),
     path('admin-panel/counselors/', admin_views.admin_counselors, name='admin_counselors'),
     path('admin-panel/appointments/', admin_views.admin_appointments, name='admin_appointments'),
     path('admin-panel/reports/', admin_views.admin_reports, name='admin_reports'),
     path('admin-panel/settings/', admin_views.admin_settings, name='admin_settings'),
 
+    # Report URLs
+    path('reports/', views.reports_dashboard, name='reports_dashboard'),
+    path('reports/generate/', views.generate_report, name='generate_report'),
+    path('reports/charts/<slug:chart>/', views.chart_data, name='chart_data'),
+    path('search/', views.search_records, name='search_records'),
+    path('reports/<int:report_id>/', views.view_report, name='view_report'),
+    path('reports/<int:report_id>/status/', views.report_status, name='report_status'),
+    path('reports/<int:report_id>/download/', views.download_report, name='download_report'),
+    path('reports/export/csv/', views.export_report_csv, name='export_report_csv'),
+    path('reports/export/excel/', views.export_report_excel, name='export_report_excel'),
+    path('reports/export/pdf/', views.export_report_pdf, name='export_report_pdf'),
+
     # Add more URLs as needed
     path('interview/<int:session_id>/view/', views.view_completed_interview, name='view_completed_interview'),
 
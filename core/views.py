@@ -2,56 +2,62 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.views.generic import ListView, DetailView, UpdateView, TemplateView
+from django.views.generic import ListView, DetailView, UpdateView
 from django.contrib import messages
 from django.urls import reverse
-from django.conf import settings
 from django.utils import timezone
-from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
-from django.db.models import Q, Count
-from django.db.models.functions import TruncMonth
+from django.db.models import Q, Count, Sum
+from django.db.models.functions import Coalesce
 from .forms import UserRegistrationForm, AppointmentForm, InterviewForm
 from .models import (
     Student, Counselor, Appointment, GuidanceSession, 
     FollowUp, Interview, Report
 )
-import json
 from datetime import datetime, timedelta
 import xlsxwriter
 from io import BytesIO
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet
 import os
-import csv
 from django.shortcuts import render, redirect
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.views.generic import ListView, DetailView, UpdateView, TemplateView
+from django.views.generic import ListView, DetailView, UpdateView
 from django.urls import reverse
-from django.conf import settings
 from .forms import UserRegistrationForm, AppointmentForm, InterviewForm
-from .models import Student, Counselor, Appointment, GuidanceSession, FollowUp, Interview, Report
+from .models import Student, Counselor, Appointment, GuidanceSession, FollowUp, Interview, Report, DailySessionStats
 from django.utils import timezone
-from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
-import json
 from django.db.models import Count
-from django.db.models.functions import TruncMonth
 from datetime import datetime, timedelta
 import xlsxwriter
 from django.http import HttpResponse
 from reportlab.pdfgen import canvas
-from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
 import os
-import csv
 from django.db.models import Q
 from django.core.files.base import ContentFile
+from django.utils.dateparse import parse_date
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+import tempfile
+from functools import partial
+from asgiref.sync import sync_to_async
+from .reports import (
+    COUNSELOR_PERFORMANCE_BUCKETS, SESSION_ANALYTICS_BUCKETS, SESSION_EXPORT_HEADERS,
+    counselor_performance_queryset, fetch_custom_sheets, session_export_rows, student_sheet_rows
+)
+from .report_renderers import RENDERERS, PDFTableWriter, stream_csv, write_excel
+from .report_jobs import enqueue_reports
+from .charts import STAFF_CHARTS, chart_response
+from .async_queries import gather_queries
+from .pagination import CursorPaginationMixin, CursorPaginator
+from .count_cache import rollup_estimate
+from .booking import SlotTaken, book_appointment
+from .search import SEARCH_KINDS, search, search_filter
+from .name_index import name_filter
+from .report_cache import data_version, find_cached_report, report_fingerprint
 from django.utils import timezone
 from datetime import datetime, timedelta
 def home(request):
@@ -163,24 +169,19 @@ def dashboard(request):
             # Get counselor profile
             counselor = request.user.counselor_profile
 
-            # Get today's sessions count
-            context['today_sessions_count'] = Appointment.objects.filter(
-                counselor=counselor,
-                date=today,
-                status='approved'
-            ).count()
+            # Today's sessions and pending appointments in one query
+            stats = Appointment.objects.filter(counselor=counselor).aggregate(
+                today_sessions=Count('id', filter=Q(date=today, status='approved')),
+                pending_appointments=Count('id', filter=Q(status='pending')),
+            )
+            context['today_sessions_count'] = stats['today_sessions']
+            context['pending_appointments'] = stats['pending_appointments']
 
             # Get total active students
             context['total_students'] = Student.objects.filter(
                 user__is_active=True
             ).count()
 
-            # Get pending appointments
-            context['pending_appointments'] = Appointment.objects.filter(
-                counselor=counselor,
-                status='pending'
-            ).count()
-
             # Get recent appointments (last 5)
             context['recent_appointments'] = Appointment.objects.filter(
                 counselor=counselor
@@ -203,10 +204,8 @@ def dashboard(request):
                 status='approved'
             ).order_by('date', 'time').first()
 
-            # Get total completed sessions
-            context['total_sessions'] = GuidanceSession.objects.filter(
-                student=student
-            ).count()
+            # Get total sessions, kept on the profile by core/counters.py
+            context['total_sessions'] = student.session_count
 
             # Get pending follow-ups
             context['pending_followups'] = FollowUp.objects.filter(
@@ -236,11 +235,13 @@ def schedule_session(request):
     if request.method == 'POST':
         form = AppointmentForm(request.POST)
         if form.is_valid():
-            appointment = form.save(commit=False)
-            appointment.student = request.user.student_profile
-            appointment.save()
-            messages.success(request, 'Session scheduled successfully! Please wait for counselor confirmation.')
-            return redirect('dashboard')
+            try:
+                book_appointment(request.user.student_profile, **form.cleaned_data)
+            except SlotTaken:
+                form.add_error('time', 'This time slot was just booked. Please select a different time.')
+            else:
+                messages.success(request, 'Session scheduled successfully! Please wait for counselor confirmation.')
+                return redirect('dashboard')
     else:
         form = AppointmentForm()
     
@@ -300,7 +301,6 @@ def session_history(request):
     status_filter = request.GET.get('status', '')
     session_type = request.GET.get('type', '')
     date_filter = request.GET.get('date', '')
-    page = request.GET.get('page', 1)
 
     # Base query
     if request.user.role == 'counselor':
@@ -316,17 +316,10 @@ def session_history(request):
     if date_filter:
         sessions = sessions.filter(date=date_filter)
 
-    # Order by most recent first
-    sessions = sessions.order_by('-created_at')
-
-    # Pagination
-    paginator = Paginator(sessions, 10)  # Show 10 sessions per page
-    try:
-        sessions = paginator.page(page)
-    except PageNotAnInteger:
-        sessions = paginator.page(1)
-    except EmptyPage:
-        sessions = paginator.page(paginator.num_pages)
+    # Most recent first, 10 sessions per page
+    sessions = CursorPaginator(
+        sessions, ('-created_at', '-id'), 10, approximate_count=True
+    ).page(request.GET.get('cursor'))
 
     context = {
         'sessions': sessions,
@@ -425,11 +418,29 @@ def view_interview_form(request, form_id):
         messages.error(request, "Interview form not found.")
         return redirect('admin_students')
 
-class StudentListView(LoginRequiredMixin, ListView):
+class StudentListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Student
     template_name = 'students.html'
     context_object_name = 'students'
     paginate_by = 12
+    cursor_ordering = ('id',)
+
+    def get_queryset(self):
+        queryset = super().get_queryset().select_related('user')
+        search = self.request.GET.get('search', '')
+        year = self.request.GET.get('year', '')
+        course = self.request.GET.get('course', '')
+
+        if search:
+            queryset = queryset.filter(name_filter(search))
+
+        if year.isdigit():
+            queryset = queryset.filter(year=int(year))
+
+        if course:
+            queryset = queryset.filter(course=course)
+
+        return queryset
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -442,10 +453,15 @@ class StudentDetailView(LoginRequiredMixin, DetailView):
     template_name = 'students/student_detail.html'
     context_object_name = 'student'
 
+    def get_queryset(self):
+        return super().get_queryset().select_related('user')
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Get student's counseling sessions
         context['sessions'] = GuidanceSession.objects.filter(student=self.object).order_by('-date')
+        # A list, so the template's emptiness check and loop share one query
+        context['interview_forms'] = list(self.object.interview_forms.all())
         return context
 
 class EditStudentView(LoginRequiredMixin, UpdateView):
@@ -461,23 +477,22 @@ class EditStudentView(LoginRequiredMixin, UpdateView):
         messages.success(self.request, 'Student profile updated successfully.')
         return super().form_valid(form)
 
-class CounselorListView(LoginRequiredMixin, ListView):
+class CounselorListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Counselor
     template_name = 'admin/counselors.html'
     context_object_name = 'counselors'
     paginate_by = 12
+    cursor_ordering = ('id',)
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().select_related('user')
         search = self.request.GET.get('search', '')
         status = self.request.GET.get('status', '')
 
         if search:
-            queryset = queryset.filter(
-                Q(user__first_name__icontains=search) |
-                Q(user__last_name__icontains=search) |
-                Q(user__email__icontains=search)
-            )
+            queryset = queryset.filter(search_filter(
+                'counselor', search, ('user__first_name', 'user__last_name', 'user__email')
+            ))
 
         if status:
             is_active = status == 'active'
@@ -499,19 +514,20 @@ class CounselorListView(LoginRequiredMixin, ListView):
         context['current_page'] = 'counselors'
         return context
 
-class AppointmentListView(LoginRequiredMixin, ListView):
+class AppointmentListView(LoginRequiredMixin, CursorPaginationMixin, ListView):
     model = Appointment
     template_name = 'admin/appointments.html'
     context_object_name = 'appointments'
     paginate_by = 10
+    cursor_ordering = ('-date', '-time', '-id')
 
     def get_queryset(self):
-        queryset = super().get_queryset().order_by('-date', '-time')
+        queryset = super().get_queryset().select_related('student__user', 'counselor__user')
         
         # Apply filters
         status = self.request.GET.get('status', '')
-        date_from = self.request.GET.get('date_from', '')
-        date_to = self.request.GET.get('date_to', '')
+        date_from = self.get_date('date_from')
+        date_to = self.get_date('date_to')
         search = self.request.GET.get('search', '')
 
         if status:
@@ -524,104 +540,120 @@ class AppointmentListView(LoginRequiredMixin, ListView):
             queryset = queryset.filter(date__lte=date_to)
         
         if search:
-            queryset = queryset.filter(
-                Q(student__user__first_name__icontains=search) |
-                Q(student__user__last_name__icontains=search) |
-                Q(counselor__user__first_name__icontains=search) |
-                Q(counselor__user__last_name__icontains=search) |
-                Q(purpose__icontains=search)
-            )
+            queryset = queryset.filter(search_filter('appointment', search, (
+                'student__user__first_name', 'student__user__last_name',
+                'counselor__user__first_name', 'counselor__user__last_name', 'purpose',
+            )))
 
         return queryset
 
+    def get_date(self, name):
+        """Returns the date in the ``name`` query parameter; invalid dates are ignored."""
+        try:
+            return parse_date(self.request.GET.get(name, ''))
+        except ValueError:
+            return None
+
+    def estimate_count(self):
+        # The rollup knows appointments by status and day, but not by text
+        if self.request.GET.get('search'):
+            return None
+        filters = {}
+        if self.request.GET.get('status'):
+            filters['status'] = self.request.GET['status']
+        date_from = self.get_date('date_from')
+        if date_from:
+            filters['day__gte'] = date_from
+        date_to = self.get_date('date_to')
+        if date_to:
+            filters['day__lte'] = date_to
+        return rollup_estimate('appointment', **filters)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['current_page'] = 'appointments'
         return context
 
-class ReportsDashboardView(LoginRequiredMixin, TemplateView):
-    template_name = 'reports/reports_dashboard.html'
-
-    def dispatch(self, request, *args, **kwargs):
-        if not request.user.is_staff:
-            messages.error(request, 'You do not have permission to access this page.')
-            return redirect('dashboard')
-        return super().dispatch(request, *args, **kwargs)
+@login_required
+async def reports_dashboard(request):
+    user = await request.auser()
+    if not user.is_staff:
+        messages.error(request, 'You do not have permission to access this page.')
+        return redirect('dashboard')
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        
-        # Basic statistics
-        context['total_students'] = Student.objects.count()
-        context['total_sessions'] = GuidanceSession.objects.count()
-        context['active_cases'] = GuidanceSession.objects.filter(status='ongoing').count()
-        
-        # Calculate completion rate
-        completed_sessions = GuidanceSession.objects.filter(status='completed').count()
-        total_sessions = context['total_sessions']
-        context['completion_rate'] = round((completed_sessions / total_sessions * 100) if total_sessions > 0 else 0)
-
-        # Get recent reports
-        context['recent_reports'] = Report.objects.all().order_by('-generated_at')[:5]
-
-        # Session types distribution
-        session_types = GuidanceSession.objects.values('session_type').annotate(count=Count('id'))
-        context['session_types_labels'] = json.dumps([st['session_type'] for st in session_types])
-        context['session_types_data'] = json.dumps([st['count'] for st in session_types])
-
-        # Monthly trend (last 6 months)
-        six_months_ago = datetime.now() - timedelta(days=180)
-        monthly_sessions = GuidanceSession.objects.filter(
-            date__gte=six_months_ago
-        ).annotate(
-            month=TruncMonth('date')
-        ).values('month').annotate(
-            count=Count('id')
-        ).order_by('month')
-
-        context['monthly_labels'] = json.dumps([s['month'].strftime('%B %Y') for s in monthly_sessions])
-        context['monthly_data'] = json.dumps([s['count'] for s in monthly_sessions])
-
-        # Course distribution
-        course_distribution = Student.objects.values('course').annotate(count=Count('id'))
-        context['course_labels'] = json.dumps([c['course'] for c in course_distribution])
-        context['course_data'] = json.dumps([c['count'] for c in course_distribution])
-
-        # Recent sessions
-        context['recent_sessions'] = GuidanceSession.objects.select_related(
+    # These reads are independent, so they run concurrently. Session figures
+    # come from the daily rollup, not GuidanceSession; the charts fetch their
+    # own data from chart_data after the page loads.
+    total_students, totals, recent_reports, recent_sessions = await gather_queries(
+        Student.objects.count,
+        partial(
+            DailySessionStats.objects.filter(source='session').aggregate,
+            total=Coalesce(Sum('count'), 0),
+            active=Coalesce(Sum('count', filter=Q(status='in_progress')), 0),
+            completed=Coalesce(Sum('count', filter=Q(status='completed')), 0),
+        ),
+        lambda: list(Report.objects.all().order_by('-generated_at')[:5]),
+        lambda: list(GuidanceSession.objects.select_related(
             'student', 'student__user'
-        ).order_by('-date')[:10]
+        ).order_by('-date')[:10]),
+    )
 
-        return context
+    total_sessions = totals['total']
+    context = {
+        'total_students': total_students,
+        'total_sessions': total_sessions,
+        'active_cases': totals['active'],
+        'completion_rate': round((totals['completed'] / total_sessions * 100) if total_sessions > 0 else 0),
+        'recent_reports': recent_reports,
+        'recent_sessions': recent_sessions,
+    }
+    return await sync_to_async(render)(request, 'reports/reports_dashboard.html', context)
+
+@login_required
+def chart_data(request, chart):
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'You do not have permission to view this chart.'}, status=403)
+    if chart not in STAFF_CHARTS:
+        return JsonResponse({'error': 'Unknown chart.'}, status=404)
+    return chart_response(request, chart, STAFF_CHARTS[chart])
+
+@login_required
+def search_records(request):
+    """Ranked full-text search across counseling records, as JSON."""
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'You do not have permission to search records.'}, status=403)
+    kinds = [kind for kind in request.GET.getlist('kind') if kind in SEARCH_KINDS]
+    hits = search(request.GET.get('q', ''), kinds=kinds or None)
+    return JsonResponse({'results': [hit._asdict() for hit in hits]})
 
 @login_required
 def export_report_excel(request):
     if not request.user.is_staff:
         messages.error(request, 'You do not have permission to access this page.')
         return redirect('dashboard')
-    # Create response
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename=guidance_report.xlsx'
-
-    # Create workbook and worksheet
-    workbook = xlsxwriter.Workbook(response)
-    worksheet = workbook.add_worksheet()
 
-    # Add headers
-    headers = ['Student Name', 'Course', 'Session Type', 'Date', 'Status']
-    for col, header in enumerate(headers):
-        worksheet.write(0, col, header)
-
-    # Add data
-    sessions = GuidanceSession.objects.select_related('student', 'student__user').all()
-    for row, session in enumerate(sessions, start=1):
-        worksheet.write(row, 0, session.student.user.get_full_name())
-        worksheet.write(row, 1, session.student.course)
-        worksheet.write(row, 2, session.session_type)
-        worksheet.write(row, 3, session.date.strftime('%Y-%m-%d'))
-        worksheet.write(row, 4, session.status)
+    # The workbook is spooled to a temporary file (an XLSX is a zip archive,
+    # so it can only be sent once complete) and then streamed from disk.
+    workbook_file = tempfile.TemporaryFile()
+    write_excel(workbook_file, SESSION_EXPORT_HEADERS, session_export_rows())
+    workbook_file.seek(0)
+    return FileResponse(
+        workbook_file,
+        as_attachment=True,
+        filename='guidance_report.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
 
-    workbook.close()
+@login_required
+def export_report_csv(request):
+    if not request.user.is_staff:
+        messages.error(request, 'You do not have permission to access this page.')
+        return redirect('dashboard')
+    response = StreamingHttpResponse(
+        stream_csv(SESSION_EXPORT_HEADERS, session_export_rows()),
+        content_type='text/csv'
+    )
+    response['Content-Disposition'] = 'attachment; filename=guidance_report.csv'
     return response
 
 @login_required
@@ -633,64 +665,48 @@ def export_report_pdf(request):
     response = HttpResponse(content_type='application/pdf')
     response['Content-Disposition'] = 'attachment; filename=guidance_report.pdf'
 
-    # Create PDF document
-    doc = SimpleDocTemplate(response, pagesize=letter)
-    elements = []
-
-    # Add title
-    title = "Guidance Counseling Report"
-    elements.append(Paragraph(title, getSampleStyleSheet()['Title']))
-
-    # Prepare data for table
-    data = [['Student Name', 'Course', 'Session Type', 'Date', 'Status']]
-    sessions = GuidanceSession.objects.select_related('student', 'student__user').all()
-    for session in sessions:
-        data.append([
-            session.student.user.get_full_name(),
-            session.student.course,
-            session.session_type,
-            session.date.strftime('%Y-%m-%d'),
-            session.status
-        ])
-
-    # Create table
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 14),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 12),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    elements.append(table)
-
-    # Build PDF
-    doc.build(elements)
+    # Draw the table page by page straight into the response
+    writer = PDFTableWriter(response, "Guidance Counseling Report", SESSION_EXPORT_HEADERS)
+    for row in session_export_rows():
+        writer.write_row(row)
+    writer.close()
     return response
 
+# The date ranges offered on the reports dashboard
+REPORT_DATE_RANGES = ('this_week', 'this_month', 'last_month', 'this_year', 'custom')
+
 @login_required
 def generate_report(request):
     if request.method == 'POST':
         report_type = request.POST.get('report_type')
         date_range = request.POST.get('date_range')
         format_type = request.POST.get('format')
+        bucket = request.POST.get('group_by')
+        if report_type == 'counselor_performance':
+            if bucket not in COUNSELOR_PERFORMANCE_BUCKETS:
+                bucket = 'total'
+        elif bucket not in SESSION_ANALYTICS_BUCKETS:
+            bucket = 'day'
+
+        if report_type not in dict(Report.REPORT_TYPES):
+            messages.error(request, 'Please choose a valid report type.')
+            return redirect('reports_dashboard')
+        if date_range not in REPORT_DATE_RANGES:
+            messages.error(request, 'Please choose a valid date range.')
+            return redirect('reports_dashboard')
 
         # Handle custom date range
         start_date = None
         end_date = None
         if date_range == 'custom':
-            start_date = request.POST.get('start_date')
-            end_date = request.POST.get('end_date')
+            start_date = parse_date(request.POST.get('start_date') or '')
+            end_date = parse_date(request.POST.get('end_date') or '')
             if not start_date or not end_date:
                 messages.error(request, 'Please provide both start and end dates for custom range.')
                 return redirect('reports_dashboard')
+            if start_date > end_date:
+                messages.error(request, 'The start date must not be after the end date.')
+                return redirect('reports_dashboard')
 
         else:
             # Calculate date range based on selection
@@ -709,31 +725,44 @@ def generate_report(request):
         # Generate report name
         report_name = f"{report_type}_{date_range}_{timezone.now().strftime('%Y%m%d_%H%M%S')}"
 
-        try:
-            # Create report object
-            report = Report.objects.create(
-                name=report_name,
-                report_type=report_type,
-                format=format_type,
-                generated_by=request.user,
-                start_date=start_date,
-                end_date=end_date
-            )
+        # A bundle renders every format from the same query
+        formats = list(RENDERERS) if format_type == 'bundle' else [format_type]
+        if any(f not in RENDERERS for f in formats):
+            messages.error(request, 'Please choose a valid report format.')
+            return redirect('reports_dashboard')
 
-            # Generate report based on type
-            if format_type == 'pdf':
-                file_path = generate_pdf_report(report_type, start_date, end_date)
-            elif format_type == 'excel':
-                file_path = generate_excel_report(report_type, start_date, end_date)
-            else:  # CSV
-                file_path = generate_csv_report(report_type, start_date, end_date)
+        try:
+            # Reuse identical reports built from the same data
+            version = data_version()
+            fingerprints = {
+                f: report_fingerprint(report_type, start_date, end_date, f, bucket, version)
+                for f in formats
+            }
+            reports = {f: find_cached_report(fingerprints[f]) for f in formats}
+            missing = [f for f in formats if reports[f] is None]
+
+            if not missing:
+                messages.info(request, 'This report is unchanged since it was last generated.')
+                return redirect('view_report', report_id=reports[formats[0]].id)
+
+            # Create report objects
+            for f in missing:
+                reports[f] = Report.objects.create(
+                    name=report_name,
+                    report_type=report_type,
+                    format=f,
+                    generated_by=request.user,
+                    start_date=start_date,
+                    end_date=end_date,
+                    status='queued',
+                    fingerprint=fingerprints[f]
+                )
 
-            # Save the generated file to the report object
-            with open(file_path, 'rb') as f:
-                report.file.save(f"{report_name}.{format_type}", f)
+            # The files are rendered by the run_report_worker command
+            enqueue_reports([reports[f] for f in missing], bucket)
 
-            messages.success(request, 'Report generated successfully.')
-            return redirect('view_report', report_id=report.id)
+            messages.success(request, 'Report queued. It will be ready for download shortly.')
+            return redirect('view_report', report_id=reports[formats[0]].id)
 
         except Exception as e:
             messages.error(request, f'Error generating report: {str(e)}')
@@ -744,323 +773,35 @@ def generate_report(request):
 @login_required
 def view_report(request, report_id):
     try:
-        report = Report.objects.get(id=report_id)
+        report = Report.objects.select_related('generated_by').get(id=report_id)
         context = {
             'report': report,
-            'download_url': report.file.url if report.file else None,
+            'download_url': reverse('download_report', args=[report.id]) if report.file else None,
         }
         return render(request, 'reports/view_report.html', context)
     except Report.DoesNotExist:
         messages.error(request, 'Report not found.')
         return redirect('reports_dashboard')
 
-def generate_pdf_report(report_type, start_date, end_date):
-    # Create a temporary file path
-    temp_dir = os.path.join(settings.MEDIA_ROOT, 'temp')
-    os.makedirs(temp_dir, exist_ok=True)
-    temp_file = os.path.join(temp_dir, f'report_{timezone.now().strftime("%Y%m%d_%H%M%S")}.pdf')
-
-    # Create PDF document
-    doc = SimpleDocTemplate(temp_file, pagesize=letter)
-    elements = []
-    styles = getSampleStyleSheet()
-
-    # Add title
-    title = Paragraph(f"Guidance Counseling Report - {report_type}", styles['Title'])
-    elements.append(title)
-    elements.append(Spacer(1, 20))
-
-    # Add date range
-    date_range_text = f"Period: {start_date.strftime('%B %d, %Y')} - {end_date.strftime('%B %d, %Y')}"
-    date_range = Paragraph(date_range_text, styles['Normal'])
-    elements.append(date_range)
-    elements.append(Spacer(1, 20))
-
-    # Generate report data based on type
-    if report_type == 'student_summary':
-        data = [['Student Name', 'Course', 'Year', 'Total Sessions', 'Status']]
-        students = Student.objects.all()
-        for student in students:
-            sessions = GuidanceSession.objects.filter(
-                student=student,
-                date__range=[start_date, end_date]
-            ).count()
-            data.append([
-                f"{student.user.get_full_name()}",
-                student.course,
-                student.year,
-                sessions,
-                'Active' if sessions > 0 else 'Inactive'
-            ])
-
-    elif report_type == 'session_analytics':
-        data = [['Date', 'Total Sessions', 'Completed', 'Ongoing']]
-        sessions = GuidanceSession.objects.filter(date__range=[start_date, end_date])
-        dates = sessions.dates('date', 'day')
-        for date in dates:
-            day_sessions = sessions.filter(date=date)
-            data.append([
-                date.strftime('%Y-%m-%d'),
-                day_sessions.count(),
-                day_sessions.filter(status='completed').count(),
-                day_sessions.filter(status='ongoing').count()
-            ])
-
-    elif report_type == 'counselor_performance':
-        data = [['Counselor Name', 'Total Sessions', 'Completed', 'Success Rate']]
-        counselors = Counselor.objects.all()
-        for counselor in counselors:
-            sessions = GuidanceSession.objects.filter(
-                counselor=counselor,
-                date__range=[start_date, end_date]
-            )
-            total = sessions.count()
-            completed = sessions.filter(status='completed').count()
-            success_rate = (completed / total * 100) if total > 0 else 0
-            data.append([
-                counselor.user.get_full_name(),
-                total,
-                completed,
-                f"{success_rate:.1f}%"
-            ])
-
-    else:  # case_management
-        data = [['Case ID', 'Student', 'Status', 'Sessions', 'Last Updated']]
-        sessions = GuidanceSession.objects.filter(
-            date__range=[start_date, end_date]
-        ).order_by('student')
-        
-        for session in sessions:
-            data.append([
-                f"CASE-{session.id}",
-                session.student.user.get_full_name(),
-                session.status.title(),
-                session.followup_set.count(),
-                session.updated_at.strftime('%Y-%m-%d')
-            ])
-
-    # Create table
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 14),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 12),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    elements.append(table)
-
-    # Build PDF
-    doc.build(elements)
-    return temp_file
-
-def generate_excel_report(report_type, start_date, end_date):
-    # Create a temporary file path
-    temp_dir = os.path.join(settings.MEDIA_ROOT, 'temp')
-    os.makedirs(temp_dir, exist_ok=True)
-    temp_file = os.path.join(temp_dir, f'report_{timezone.now().strftime("%Y%m%d_%H%M%S")}.xlsx')
-
-    # Create workbook and worksheet
-    workbook = xlsxwriter.Workbook(temp_file)
-    worksheet = workbook.add_worksheet()
-
-    # Add formats
-    header_format = workbook.add_format({
-        'bold': True,
-        'bg_color': '#4B5563',
-        'font_color': 'white',
-        'align': 'center',
-        'valign': 'vcenter',
-        'border': 1
-    })
-    cell_format = workbook.add_format({
-        'align': 'center',
-        'valign': 'vcenter',
-        'border': 1
+@login_required
+def report_status(request, report_id):
+    report = get_object_or_404(Report, id=report_id)
+    return JsonResponse({
+        'status': report.status,
+        'progress': report.progress,
+        'download_url': reverse('download_report', args=[report.id]) if report.file else None,
     })
 
-    # Write title
-    worksheet.merge_range('A1:E1', f'Guidance Counseling Report - {report_type}', header_format)
-    worksheet.merge_range('A2:E2', f'Period: {start_date.strftime("%B %d, %Y")} - {end_date.strftime("%B %d, %Y")}', cell_format)
-
-    # Generate report data based on type
-    if report_type == 'student_summary':
-        headers = ['Student Name', 'Course', 'Year', 'Total Sessions', 'Status']
-        row = 3
-        for col, header in enumerate(headers):
-            worksheet.write(row, col, header, header_format)
-
-        students = Student.objects.all()
-        for student in students:
-            row += 1
-            sessions = GuidanceSession.objects.filter(
-                student=student,
-                date__range=[start_date, end_date]
-            ).count()
-            data = [
-                student.user.get_full_name(),
-                student.course,
-                student.year,
-                sessions,
-                'Active' if sessions > 0 else 'Inactive'
-            ]
-            for col, value in enumerate(data):
-                worksheet.write(row, col, value, cell_format)
-
-    elif report_type == 'session_analytics':
-        headers = ['Date', 'Total Sessions', 'Completed', 'Ongoing']
-        row = 3
-        for col, header in enumerate(headers):
-            worksheet.write(row, col, header, header_format)
-
-        sessions = GuidanceSession.objects.filter(date__range=[start_date, end_date])
-        dates = sessions.dates('date', 'day')
-        for date in dates:
-            row += 1
-            day_sessions = sessions.filter(date=date)
-            data = [
-                date.strftime('%Y-%m-%d'),
-                day_sessions.count(),
-                day_sessions.filter(status='completed').count(),
-                day_sessions.filter(status='ongoing').count()
-            ]
-            for col, value in enumerate(data):
-                worksheet.write(row, col, value, cell_format)
-
-    elif report_type == 'counselor_performance':
-        headers = ['Counselor Name', 'Total Sessions', 'Completed', 'Success Rate']
-        row = 3
-        for col, header in enumerate(headers):
-            worksheet.write(row, col, header, header_format)
-
-        counselors = Counselor.objects.all()
-        for counselor in counselors:
-            row += 1
-            sessions = GuidanceSession.objects.filter(
-                counselor=counselor,
-                date__range=[start_date, end_date]
-            )
-            total = sessions.count()
-            completed = sessions.filter(status='completed').count()
-            success_rate = (completed / total * 100) if total > 0 else 0
-            data = [
-                counselor.user.get_full_name(),
-                total,
-                completed,
-                f"{success_rate:.1f}%"
-            ]
-            for col, value in enumerate(data):
-                worksheet.write(row, col, value, cell_format)
-
-    else:  # case_management
-        headers = ['Case ID', 'Student', 'Status', 'Sessions', 'Last Updated']
-        row = 3
-        for col, header in enumerate(headers):
-            worksheet.write(row, col, header, header_format)
-
-        sessions = GuidanceSession.objects.filter(
-            date__range=[start_date, end_date]
-        ).order_by('student')
-        
-        for session in sessions:
-            row += 1
-            data = [
-                f"CASE-{session.id}",
-                session.student.user.get_full_name(),
-                session.status.title(),
-                session.followup_set.count(),
-                session.updated_at.strftime('%Y-%m-%d')
-            ]
-            for col, value in enumerate(data):
-                worksheet.write(row, col, value, cell_format)
-
-    # Auto-adjust column widths
-    for col in range(len(headers)):
-        worksheet.set_column(col, col, 15)
-
-    workbook.close()
-    return temp_file
-
-def generate_csv_report(report_type, start_date, end_date):
-    # Create a temporary file path
-    temp_dir = os.path.join(settings.MEDIA_ROOT, 'temp')
-    os.makedirs(temp_dir, exist_ok=True)
-    temp_file = os.path.join(temp_dir, f'report_{timezone.now().strftime("%Y%m%d_%H%M%S")}.csv')
-
-    with open(temp_file, 'w', newline='') as csvfile:
-        writer = csv.writer(csvfile)
-        
-        # Write headers based on report type
-        if report_type == 'student_summary':
-            writer.writerow(['Student Name', 'Course', 'Year', 'Total Sessions', 'Status'])
-            students = Student.objects.all()
-            for student in students:
-                sessions = GuidanceSession.objects.filter(
-                    student=student,
-                    date__range=[start_date, end_date]
-                ).count()
-                writer.writerow([
-                    student.user.get_full_name(),
-                    student.course,
-                    student.year,
-                    sessions,
-                    'Active' if sessions > 0 else 'Inactive'
-                ])
-
-        elif report_type == 'session_analytics':
-            writer.writerow(['Date', 'Total Sessions', 'Completed', 'Ongoing'])
-            sessions = GuidanceSession.objects.filter(date__range=[start_date, end_date])
-            dates = sessions.dates('date', 'day')
-            for date in dates:
-                day_sessions = sessions.filter(date=date)
-                writer.writerow([
-                    date.strftime('%Y-%m-%d'),
-                    day_sessions.count(),
-                    day_sessions.filter(status='completed').count(),
-                    day_sessions.filter(status='ongoing').count()
-                ])
-
-        elif report_type == 'counselor_performance':
-            writer.writerow(['Counselor Name', 'Total Sessions', 'Completed', 'Success Rate'])
-            counselors = Counselor.objects.all()
-            for counselor in counselors:
-                sessions = GuidanceSession.objects.filter(
-                    counselor=counselor,
-                    date__range=[start_date, end_date]
-                )
-                total = sessions.count()
-                completed = sessions.filter(status='completed').count()
-                success_rate = (completed / total * 100) if total > 0 else 0
-                writer.writerow([
-                    counselor.user.get_full_name(),
-                    total,
-                    completed,
-                    f"{success_rate:.1f}%"
-                ])
-
-        else:  # case_management
-            writer.writerow(['Case ID', 'Student', 'Status', 'Sessions', 'Last Updated'])
-            sessions = GuidanceSession.objects.filter(
-                date__range=[start_date, end_date]
-            ).order_by('student')
-            
-            for session in sessions:
-                writer.writerow([
-                    f"CASE-{session.id}",
-                    session.student.user.get_full_name(),
-                    session.status.title(),
-                    session.followup_set.count(),
-                    session.updated_at.strftime('%Y-%m-%d')
-                ])
-
-    return temp_file
+@login_required
+def download_report(request, report_id):
+    report = get_object_or_404(Report, id=report_id)
+    if report.status != 'completed':
+        messages.info(request, 'This report is not ready yet.')
+        return redirect('view_report', report_id=report.id)
+    if not report.file:
+        messages.info(request, 'The file for this report has expired. Please generate it again.')
+        return redirect('view_report', report_id=report.id)
+    return FileResponse(report.file.open('rb'), as_attachment=True, filename=os.path.basename(report.file.name))
 
 @login_required
 def counselor_dashboard(request):
@@ -1203,11 +944,8 @@ def generate_student_report(request):
         worksheet.write(0, col, header)
     
     # Add data
-    students = Student.objects.all()
-    for row, student in enumerate(students, start=1):
-        worksheet.write(row, 0, student.user.get_full_name())
-        worksheet.write(row, 1, student.year_level)
-        worksheet.write(row, 2, student.course)
+    for row, data in enumerate(student_sheet_rows(), start=1):
+        worksheet.write_row(row, 0, data)
     
     workbook.close()
     output.seek(0)
@@ -1225,7 +963,7 @@ def generate_counselor_report(request):
     counselor_id = request.GET.get('counselor_id')
     
     # Filter counselors
-    counselors = Counselor.objects.all()
+    counselors = counselor_performance_queryset()
     if counselor_id:
         counselors = counselors.filter(id=counselor_id)
     
@@ -1247,10 +985,9 @@ def generate_counselor_report(request):
         worksheet.write(0, col, header)
     
     # Add data
-    for row, counselor in enumerate(counselors, start=1):
-        worksheet.write(row, 0, counselor.user.get_full_name())
-        worksheet.write(row, 1, GuidanceSession.objects.filter(counselor=counselor).count())
-        worksheet.write(row, 2, Student.objects.filter(counselor=counselor).count())
+    counselor_rows = counselors.values_list('counselor_name', 'total', 'students')
+    for row, data in enumerate(counselor_rows, start=1):
+        worksheet.write_row(row, 0, data)
     
     workbook.close()
     output.seek(0)
@@ -1332,38 +1069,12 @@ def generate_custom_report(request):
     output = BytesIO()
     workbook = xlsxwriter.Workbook(output)
     
-    if 'sessions' in metrics:
-        worksheet = workbook.add_worksheet('Sessions')
-        sessions = GuidanceSession.objects.all()
-        worksheet.write(0, 0, 'Date')
-        worksheet.write(0, 1, 'Student')
-        worksheet.write(0, 2, 'Counselor')
-        for row, session in enumerate(sessions, start=1):
-            worksheet.write(row, 0, session.date.strftime('%Y-%m-%d'))
-            worksheet.write(row, 1, session.student.user.get_full_name())
-            worksheet.write(row, 2, session.counselor.user.get_full_name())
-    
-    if 'students' in metrics:
-        worksheet = workbook.add_worksheet('Students')
-        students = Student.objects.all()
-        worksheet.write(0, 0, 'Name')
-        worksheet.write(0, 1, 'Year Level')
-        worksheet.write(0, 2, 'Course')
-        for row, student in enumerate(students, start=1):
-            worksheet.write(row, 0, student.user.get_full_name())
-            worksheet.write(row, 1, student.year_level)
-            worksheet.write(row, 2, student.course)
-    
-    if 'appointments' in metrics:
-        worksheet = workbook.add_worksheet('Appointments')
-        appointments = Appointment.objects.all()
-        worksheet.write(0, 0, 'Date')
-        worksheet.write(0, 1, 'Student')
-        worksheet.write(0, 2, 'Status')
-        for row, appointment in enumerate(appointments, start=1):
-            worksheet.write(row, 0, appointment.date.strftime('%Y-%m-%d'))
-            worksheet.write(row, 1, appointment.student.user.get_full_name())
-            worksheet.write(row, 2, appointment.status)
+    # The sheet queries run concurrently; the workbook is written afterwards
+    for title, headers, rows in fetch_custom_sheets(metrics):
+        worksheet = workbook.add_worksheet(title)
+        worksheet.write_row(0, 0, headers)
+        for row, data in enumerate(rows, start=1):
+            worksheet.write_row(row, 0, data)
     
     workbook.close()
     output.seek(0)
@@ -1394,28 +1105,15 @@ def counselor_reports(request):
     thirty_days_ago = today - timedelta(days=30)
 
     # Calculate real statistics
-    total_sessions = Appointment.objects.filter(counselor=counselor).count()
+    appointment_stats = DailySessionStats.objects.filter(source='appointment', counselor=counselor)
+    totals = appointment_stats.aggregate(
+        total=Coalesce(Sum('count'), 0),
+        completed=Coalesce(Sum('count', filter=Q(status='completed')), 0),
+    )
+    total_sessions = totals['total']
     active_students = Appointment.objects.filter(counselor=counselor).values('student').distinct().count()
-    completed_sessions = Appointment.objects.filter(counselor=counselor, status='Completed').count()
-    completion_rate = int((completed_sessions / total_sessions * 100) if total_sessions > 0 else 0)
+    completion_rate = int((totals['completed'] / total_sessions * 100) if total_sessions > 0 else 0)
     
-    # Monthly sessions data for chart
-    monthly_sessions = (
-        Appointment.objects.filter(counselor=counselor)
-        .annotate(month=TruncMonth('date'))
-        .values('month')
-        .annotate(count=Count('id'))
-        .order_by('month')
-    )
-
-    # Session types distribution
-    session_types = (
-        Appointment.objects.filter(counselor=counselor)
-        .values('purpose')
-        .annotate(count=Count('id'))
-        .order_by('-count')
-    )
-
     # Recent sessions
     recent_sessions = (
         Appointment.objects.filter(counselor=counselor)
@@ -1427,8 +1125,6 @@ def counselor_reports(request):
         'total_sessions': total_sessions,
         'active_students': active_students,
         'completion_rate': completion_rate,
-        'monthly_sessions': list(monthly_sessions),
-        'session_types': list(session_types),
         'recent_sessions': recent_sessions,
     }
 
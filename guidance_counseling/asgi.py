@@ -3,6 +3,9 @@ ASGI config for guidance_counseling project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Set DJANGO_SETTINGS_MODULE=guidance_counseling.settings_asgi to use the
+ASGI deployment profile.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -135,6 +135,43 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Background report generation (see core/report_jobs.py)
+REPORT_WORKER_PROCESSES = 2
+REPORT_JOB_TIMEOUT_MINUTES = 30
+REPORT_CACHE_MAX_AGE_HOURS = 24
+REPORT_CACHE_MAX_BYTES = 500 * 1024 * 1024
+
+# Role dashboards are cached in the 'dashboard' cache (see core/dashboard_cache.py)
+# and paginator totals in 'default' (core/count_cache.py). Local memory is per
+# process, which suits the single-process development server; settings_asgi.py
+# switches both to a cache shared by its worker processes.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'dashboard': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'dashboard',
+    },
+}
+DASHBOARD_CACHE_ALIAS = 'dashboard'
+DASHBOARD_CACHE_TIMEOUT = 300
+
+# Seconds a paginator total is reused for the same filters (core/count_cache.py);
+# writes through the ORM expire it sooner.
+COUNT_CACHE_TIMEOUT = 60
+
+# Threads used by async dashboards to run independent queries concurrently
+# (core/async_queries.py). guidance_counseling/settings_asgi.py is the
+# profile for serving those views under an ASGI server.
+ASYNC_QUERY_THREADS = 8
+
+# In development every request's queries are counted and repeated query
+# shapes (likely N+1s) are logged to 'core.queries' (core/query_budget.py).
+if DEBUG:
+    MIDDLEWARE.append('core.query_budget.query_recorder_middleware')
+QUERY_REPEAT_THRESHOLD = 5
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -0,0 +1,44 @@
+"""
+Settings for serving the project over ASGI.
+
+The dashboards are async views that fan their queries out to a thread pool
+(see core/async_queries.py), so run them under an ASGI server. Create the
+shared cache tables once (see CACHES below), then start the server, e.g.:
+
+    DJANGO_SETTINGS_MODULE=guidance_counseling.settings_asgi \\
+        python manage.py createcachetable
+
+    DJANGO_SETTINGS_MODULE=guidance_counseling.settings_asgi \\
+        uvicorn guidance_counseling.asgi:application --workers 4
+
+or with gunicorn:
+
+    DJANGO_SETTINGS_MODULE=guidance_counseling.settings_asgi \\
+        gunicorn guidance_counseling.asgi:application -k uvicorn.workers.UvicornWorker --workers 4
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+# Each query thread keeps its own connection; reuse it between requests
+# rather than reconnecting for every query, and check it before reuse.
+DATABASES['default']['CONN_MAX_AGE'] = 60
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Threads available for concurrent dashboard queries, per worker process.
+ASYNC_QUERY_THREADS = 16
+
+# Requests are spread over several worker processes, and a write only
+# expires cached dashboards and paginator totals in the cache it can reach,
+# so both caches must be shared by every worker. The database cache needs
+# no extra service; Redis (django.core.cache.backends.redis.RedisCache) or
+# Memcached can replace it with the same aliases.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'cache_default',
+    },
+    'dashboard': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'cache_dashboard',
+    },
+}